@@ -2,6 +2,8 @@ from langchain_community.vectorstores import Chroma
 from langchain_openai import OpenAIEmbeddings
 from langchain_core.documents import Document
 
+from app.services.embedding_cache import CachedEmbeddings
+
 class RAGEngine:
     def __init__(self, units: list, *, collection_name: str = "edu_rag", persist_directory: str | None = None):
         self.documents = [
@@ -15,7 +17,8 @@ class RAGEngine:
             )
             for u in units
         ]
-        self.embeddings = OpenAIEmbeddings()
+        # 교육 자료 청크(적재 시 1회)는 캐시하지 않고 질의 벡터만 공용 캐시에
+        self.embeddings = CachedEmbeddings(OpenAIEmbeddings(), cache_documents=False)
         self.vectorstore = Chroma.from_documents(
             documents=self.documents, 
             embedding=self.embeddings,
@@ -1,12 +1,14 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.messages import AIMessage
-from qdrant_client import models
+from langchain_core.runnables import RunnableConfig
 from app.core.config import settings
-from app.services.qdrant_service import get_vector_store
+from app.services.qdrant_service import get_vector_store, search_documents
 from app.services.openai_service import openai_service
+from app.services.context_packer import PackEntry, guidance_context_packer
 from app.agent.guidance.state import AgentState, AnalysisOutput, GenerateOutput
 from app.agent.guidance.prompts import ANALYZE_PROMPT, QUERY_GEN_PROMPT, GENERATE_PROMPT_TEMPLATE
+from app.utils.partial_json import IncrementalJSONParser
 
 llm = openai_service.get_guidance_model()
 vector_store = get_vector_store()
@@ -82,31 +84,24 @@ async def retrieval_node(state: AgentState):
 
   for category in filter_list:
     # metadata의 category가 state["search_filter"]에 포함된 것만 검색
-    search_filter = models.Filter(
-        must = [
-            models.FieldCondition(
-                key="metadata.category",
-                match=models.MatchValue(value=category)
-            )
-        ]
-    )
-
     print("쿼리 생성 완료 - 검색 중 ==========")
 
-    # 검색 수행
-    category_docs = await vector_store.asimilarity_search(
-      query=search_query,
-      k=2,
-      filter=search_filter
-    )
+    # 검색 수행 (로컬 사본이 준비되어 있으면 네트워크 없이)
+    category_docs = await search_documents(search_query, k=2, category=category)
     all_docs.extend(category_docs)
 
 
-  # 결과 가공
-  retrieved_context = ""
-  for doc in all_docs:
-    category = doc.metadata.get("category", "unknown")
-    retrieved_context += f"[{category}] {doc.page_content}\n\n"
+  # 결과 가공: 유사도 순으로 토큰 예산 안에 담기 (문서별 토큰 수는 packer가 캐시)
+  packer = guidance_context_packer
+  packed = packer.pack([
+      PackEntry(
+          text=f"[{doc.metadata.get('category', 'unknown')}] {packer.truncate(doc.page_content)}",
+          score=score,
+      )
+      for doc, score in all_docs
+  ])
+  retrieved_context = packed.text
+  print(f"context {packed.packed_tokens}/{packed.budget} tokens, dropped {packed.dropped}건 ({packed.dropped_tokens} tokens) ==========")
 
   if not retrieved_context:
     retrieved_context ="관련된 매뉴얼이나 약관 정보를 찾지 못했습니다."
@@ -115,13 +110,50 @@ async def retrieval_node(state: AgentState):
   return {
       **state,
       "context": retrieved_context,
+      "context_tokens": packed.report(),
       "search_query": search_query
   }
 
 
 
 
-async def generate_node(state: AgentState):
+# 스트리밍 시 result_delta로 흘려보낼 GenerateOutput 필드
+STREAM_FIELDS = ("recommended_answer", "work_guide")
+
+
+async def stream_generate_output(prompt, inputs: dict, on_delta) -> dict:
+  """
+  GenerateOutput을 tool call로 강제하고 arguments(JSON) 토큰을 증분 파싱하면서
+  문자열 필드 조각이 도착할 때마다 on_delta로 전달합니다.
+  """
+  chain = prompt | llm.bind_tools([GenerateOutput], tool_choice="GenerateOutput")
+  parser = IncrementalJSONParser()
+
+  async for chunk in chain.astream(inputs):
+    for tool_chunk in getattr(chunk, "tool_call_chunks", None) or []:
+      args = tool_chunk.get("args")
+      if not args:
+        continue
+      for event in parser.feed(args):
+        if event.kind != "delta" or len(event.path) != 1 or event.path[0] not in STREAM_FIELDS:
+          continue
+        try:
+          await on_delta({
+              "agent_type": "guidance",
+              "field": event.path[0],
+              "delta": event.value,
+              "text": parser.get(event.path[0], default=""),
+          })
+        except Exception as e:
+          print(f"result_delta 전송 실패 (무시): {e}")
+
+  result = parser.value
+  if not parser.done or not isinstance(result, dict):
+    raise ValueError("incomplete streamed GenerateOutput")
+  return result
+
+
+async def generate_node(state: AgentState, config: RunnableConfig = None):
   print("추천 멘트, 다음 행동 생성 중 ==========")
   # 최근 대화 5개 가져오기
   if len(state["message"]) > 5:
@@ -135,23 +167,35 @@ async def generate_node(state: AgentState):
       ("human", ""), # 이미 시스템 프롬프트에서 입력 데이터 구조를 정의하고 있어서 빈 문자열임.
   ])
 
-  # LLM 체인 구성
-  chain = (prompt
-           | llm.with_structured_output(GenerateOutput))
-
-  # LLM 호출
-  result = await chain.ainvoke({
+  inputs = {
       "customer_info": state.get("customer_info", {}),
       "context": state.get("context", ""),
       "last_messages": last_messages
-  })
+  }
+
+  # [NEW] 스트리밍 모드: 추천 멘트를 생성되는 대로 모니터에 전달 (Time-to-first-token 단축)
+  on_delta = ((config or {}).get("configurable") or {}).get("on_delta")
+  result = None
+  if settings.GUIDANCE_STREAMING and on_delta is not None:
+    try:
+      result = await stream_generate_output(prompt, inputs, on_delta)
+    except Exception as e:
+      print(f"스트리밍 생성 실패, 일반 호출로 재시도: {e}")
+
+  if result is None:
+    # LLM 체인 구성
+    chain = (prompt
+             | llm.with_structured_output(GenerateOutput))
+
+    # LLM 호출
+    result = await chain.ainvoke(inputs)
 
   # print(f"{result['recommended_answer'][:40]}... ==========")
   # print(f"{result['work_guide'][:40]}... ==========")
 
   return {
       **state,
-      "recommended_answer": result["recommended_answer"].strip(),
-      "work_guide": result["work_guide"].strip(),
+      "recommended_answer": (result.get("recommended_answer") or "").strip(),
+      "work_guide": (result.get("work_guide") or "").strip(),
   }
 
@@ -6,6 +6,7 @@ from langgraph.graph.message import add_messages
 class AgentState(TypedDict):
   message: Annotated[List[BaseMessage], add_messages] # 상담 텍스트
   context: Optional[str] # Qdrant에서 검색된 관련 자료들
+  context_tokens: Optional[dict] # context의 packed/dropped 토큰 수
   customer_info: Optional[dict] # 고객 정보
   reasoning: Optional[str] # AI가 선택한 다음 행동의 근거
   next_step: Literal["retrieve", "generate", "skip"]
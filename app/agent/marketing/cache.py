@@ -1,46 +1,260 @@
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Hashable, List, Optional, Tuple
 from collections import OrderedDict
-import time
-import re
+from dataclasses import dataclass
 import asyncio
+import logging
+import re
+import time
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# (정규화 발화, 정규화 직전 멘트, signature)
+_Key = Tuple[str, str, Hashable]
+
+
+@dataclass
+class _Entry:
+    slot: int
+    value: Dict[str, Any]
+    context_vec: Optional[np.ndarray]  # 직전 상담사 멘트가 없으면 None
+    signature: Hashable
+    expires_at: float
+    latency: float  # 이 결정을 만들 때 걸린 LLM 시간 (적중 시 절약한 시간으로 집계)
+
 
 class SemanticCache:
     """
-    Tier 1.5 Cache (LRU).
-    반복되는 질문(예: "요금제 변경해줘")에 대한 분석 결과를 메모리에 저장하여
-    LLM 호출 비용과 시간을 절약합니다.
+    Tier 1.5 Cache (프로세스 공용, LRU + TTL).
+    고객들이 통화마다 반복하는 발화(예: "요금제 바꾸고 싶어요")에 대한 Gatekeeper.semantic_route 결정을
+    (발화, 직전 상담사 멘트, signature) 기준으로 저장하여 gpt-4o-mini 왕복을 생략합니다.
+    - 정규화 텍스트와 signature가 같으면 임베딩 없이 바로 적중 (signature가 다르면 별도 항목)
+    - 아니면 발화 임베딩 cosine >= threshold 이고 직전 멘트도 context_threshold 이상 비슷해야 적중
+      (둘 다 직전 멘트가 없으면 통과) + 호출부가 준 signature(키워드 카테고리 등)가 같아야 함
+    - min_chars 보다 짧은 발화("네", "아니요")는 의미가 직전 멘트에 달려 있어 정확히 같을 때만 적중
+    - 임베딩 모델을 쓸 수 없는 환경이면 정확히 같은 발화만 적중
     """
-    def __init__(self, max_size: int = 1000):
-        self._cache: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        threshold: float = 0.92,
+        context_threshold: float = 0.85,
+        ttl: float = 3600.0,
+        min_chars: int = 6,
+        embeddings: Any = None,
+    ):
+        self._cache: "OrderedDict[_Key, _Entry]" = OrderedDict()
         self.max_size = max_size
-        self._hits = 0
-        self._misses = 0
+        self.threshold = threshold
+        self.context_threshold = context_threshold
+        self.ttl = ttl
+        self.min_chars = min_chars
+        self._embeddings = embeddings
+        self._embed_disabled = False
+
+        # 발화 벡터는 슬롯 행렬에 보관 -> 조회는 행렬-벡터 곱 한 번
+        self._vectors: Optional[np.ndarray] = None  # (max_size, D), 행 정규화
+        self._valid = np.zeros(max_size, dtype=bool)
+        self._free: List[int] = list(range(max_size - 1, -1, -1))
+        self._slot_keys: List[Optional[_Key]] = [None] * max_size
+
+        self.stats: Dict[str, Any] = {
+            "lookups": 0,
+            "hits_exact": 0,
+            "hits_semantic": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "stores": 0,
+            "embed_calls": 0,
+            "embed_seconds": 0.0,
+            "saved_seconds": 0.0,
+            "llm_seconds": 0.0,
+        }
 
     def _normalize_key(self, text: str) -> str:
         """
         Hit율을 높이기 위해 텍스트 정규화.
         - 공백/특수문자 제거, 소문자 변환.
         """
-        text = re.sub(r"[^\w]", "", text)
+        text = re.sub(r"[^\w]", "", text or "")
         return text.lower()
 
-    async def get(self, text: str) -> Optional[Dict[str, Any]]:
-        key = self._normalize_key(text)
-        if key in self._cache:
-            self._hits += 1
-            # LRU: 최근 사용된 항목을 뒤로 이동 (Move to End)
-            self._cache.move_to_end(key)
-            print(f"[Cache] HIT for '{text}' (key: {key})")
-            return self._cache[key]
-        self._misses += 1
+    # -------------------------
+    # Embedding
+    # -------------------------
+
+    def _get_embeddings(self) -> Any:
+        if self._embeddings is None:
+            # 검색 엔진과 같은 dense 모델 + 프로세스 공용 임베딩 캐시 (같은 발화는 한 번만 임베딩)
+            from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
+            from app.services.embedding_cache import CachedEmbeddings
+
+            self._embeddings = CachedEmbeddings(
+                FastEmbedEmbeddings(model_name=settings.QDRANT_DENSE_EMBEDDING_MODEL, normalize=True)
+            )
+        return self._embeddings
+
+    def _embed_sync(self, texts: List[str]) -> List[np.ndarray]:
+        vectors = self._get_embeddings().embed_documents(texts)
+        out = []
+        for v in vectors:
+            arr = np.asarray(v, dtype=np.float32)
+            norm = float(np.linalg.norm(arr))
+            out.append(arr / norm if norm else arr)
+        return out
+
+    async def _embed(self, text: str, context: str) -> Optional[Tuple[np.ndarray, Optional[np.ndarray]]]:
+        if self._embed_disabled:
+            return None
+        texts = [text, context] if context else [text]
+        t0 = time.perf_counter()
+        try:
+            vectors = await asyncio.to_thread(self._embed_sync, texts)
+        except Exception as e:
+            # 모델을 받을 수 없는 환경 등: 이후로는 정확히 같은 발화만 적중
+            logger.warning(f"[SemanticCache] embeddings unavailable, exact-match only: {e}")
+            self._embed_disabled = True
+            return None
+        self.stats["embed_calls"] += 1
+        self.stats["embed_seconds"] += time.perf_counter() - t0
+        return vectors[0], (vectors[1] if context else None)
+
+    # -------------------------
+    # Get / Set
+    # -------------------------
+
+    def _drop(self, key: _Key) -> None:
+        entry = self._cache.pop(key)
+        self._valid[entry.slot] = False
+        self._slot_keys[entry.slot] = None
+        self._free.append(entry.slot)
+
+    def _hit(self, key: _Key, kind: str) -> Dict[str, Any]:
+        entry = self._cache[key]
+        # LRU: 최근 사용된 항목을 뒤로 이동 (Move to End)
+        self._cache.move_to_end(key)
+        self.stats[kind] += 1
+        self.stats["saved_seconds"] += entry.latency
+        return dict(entry.value)
+
+    async def get(
+        self, text: str, context: str = "", signature: Hashable = None
+    ) -> Optional[Dict[str, Any]]:
+        self.stats["lookups"] += 1
+        now = time.time()
+        key = (self._normalize_key(text), self._normalize_key(context), signature)
+
+        entry = self._cache.get(key)
+        if entry is not None:
+            if entry.expires_at >= now:
+                return self._hit(key, "hits_exact")
+            self.stats["expired"] += 1
+            self._drop(key)
+
+        if len(key[0]) < self.min_chars or self._vectors is None or not self._valid.any():
+            self.stats["misses"] += 1
+            return None
+
+        vecs = await self._embed(text, context)
+        if vecs is None:
+            self.stats["misses"] += 1
+            return None
+        query, context_vec = vecs
+
+        sims = self._vectors @ query
+        sims[~self._valid] = -1.0
+        for slot in np.argsort(-sims):
+            if sims[slot] < self.threshold:
+                break
+            cand_key = self._slot_keys[slot]
+            cand = self._cache[cand_key]
+            if cand.expires_at < now:
+                self.stats["expired"] += 1
+                self._drop(cand_key)
+                continue
+            if cand.signature != signature:
+                continue
+            if (cand.context_vec is None) != (context_vec is None):
+                continue
+            if context_vec is not None and float(cand.context_vec @ context_vec) < self.context_threshold:
+                continue
+            return self._hit(cand_key, "hits_semantic")
+
+        self.stats["misses"] += 1
         return None
 
-    async def set(self, text: str, value: Dict[str, Any]):
-        key = self._normalize_key(text)
+    async def set(
+        self,
+        text: str,
+        value: Dict[str, Any],
+        context: str = "",
+        signature: Hashable = None,
+        latency: float = 0.0,
+    ) -> None:
+        key = (self._normalize_key(text), self._normalize_key(context), signature)
+        if not key[0] or self.max_size <= 0:
+            return
+        self.stats["llm_seconds"] += latency
+
+        # 벡터는 임베딩 캐시에 이미 있는 경우가 대부분 (직전 get에서 계산)
+        vecs = await self._embed(text, context) if len(key[0]) >= self.min_chars else None
+        query, context_vec = vecs if vecs is not None else (None, None)
+
         if key in self._cache:
-            self._cache.move_to_end(key)
-        self._cache[key] = value
-        
+            self._drop(key)
         # Max Size 초과 시 오래된 항목(앞쪽) 제거
-        if len(self._cache) > self.max_size:
-            self._cache.popitem(last=False)
+        while len(self._cache) >= self.max_size:
+            self._drop(next(iter(self._cache)))
+            self.stats["evictions"] += 1
+
+        slot = self._free.pop()
+        if query is not None:
+            if self._vectors is None:
+                self._vectors = np.zeros((self.max_size, query.shape[0]), dtype=np.float32)
+            self._vectors[slot] = query
+            self._valid[slot] = True
+        self._slot_keys[slot] = key
+        self._cache[key] = _Entry(
+            slot=slot,
+            value=dict(value),
+            context_vec=context_vec,
+            signature=signature,
+            expires_at=time.time() + self.ttl,
+            latency=latency,
+        )
+        self.stats["stores"] += 1
+
+    def clear(self) -> None:
+        for key in list(self._cache):
+            self._drop(key)
+
+    def describe(self) -> Dict[str, Any]:
+        s = self.stats
+        hits = s["hits_exact"] + s["hits_semantic"]
+        return {
+            "entries": len(self._cache),
+            "max_size": self.max_size,
+            "threshold": self.threshold,
+            "context_threshold": self.context_threshold,
+            "ttl": self.ttl,
+            "embeddings": "disabled" if self._embed_disabled else "enabled",
+            **{k: (round(v, 3) if isinstance(v, float) else v) for k, v in s.items()},
+            "hit_rate": round(hits / s["lookups"], 4) if s["lookups"] else None,
+            "avg_llm_ms": round(s["llm_seconds"] / s["stores"] * 1000, 1) if s["stores"] else None,
+            "avg_embed_ms": round(s["embed_seconds"] / s["embed_calls"] * 1000, 2) if s["embed_calls"] else None,
+        }
+
+
+# [NEW] Gatekeeper.semantic_route 결정 캐시 (모든 통화/세션 공용)
+semantic_route_cache = SemanticCache(
+    max_size=settings.SEMANTIC_ROUTE_CACHE_SIZE,
+    threshold=settings.SEMANTIC_ROUTE_CACHE_THRESHOLD,
+    context_threshold=settings.SEMANTIC_ROUTE_CACHE_CONTEXT_THRESHOLD,
+    ttl=settings.SEMANTIC_ROUTE_CACHE_TTL,
+)
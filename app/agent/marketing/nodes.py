@@ -1,11 +1,143 @@
 import json
 import time
+from typing import Any, Dict
 from langchain_core.messages import AIMessage, HumanMessage
 from app.agent.marketing.state import MarketingState
 
 # access to session.py resources via state["session_context"]
 
 from langchain_core.runnables import RunnableConfig
+from app.core.config import settings
+from app.utils.keywords import annotate
+
+def build_analysis_prompt(session, last_msg: str) -> str:
+    """
+    Deep Analysis 사용자 프롬프트 (analyze_node / MARKETING_PIPELINE=combined 의 Gatekeeper.route_and_analyze 공용)
+    """
+    # Context - Use full dialogue history for better analysis
+    dialogue_history = session.dialogue_text(last_n=6)
+
+    # Convert signals list to string
+    signals_str = ", ".join(session.customer.signals) if session.customer.signals else "없음"
+
+    return f"""
+    [대화 기록 (최근 상황)]
+    {dialogue_history}
+    
+    [현재 고객 발언]
+    "{last_msg}"
+    
+    [고객 프로필 (Deep Dive)]
+    요금제: {session.customer.mobile_plan}
+    약정상태: {session.customer.contract_remaining_months}개월 남음
+    월납부액: {session.customer.monthly_fee_won}원
+    특이사항(Signals): {signals_str}
+    """
+
+
+def decide_transition(current_stage: str, analysis: dict, hits):
+    """
+    분석 결과(analysis) + 발화 키워드(hits) -> (next_stage, marketing_needed, marketing_type)
+    """
+    # Raw Analysis
+    marketing_needed = analysis.get("marketing_opportunity", False)
+    intent = analysis.get("intent", "neutral")
+    churn_reason = analysis.get("churn_reason", "unknown")
+    objection_reason = analysis.get("objection_reason", "unknown")
+    next_stage = current_stage
+
+    # -----------------------------------------------------
+    # State Transition Table
+    # -----------------------------------------------------
+    marketing_type = "none"
+    
+    if current_stage == "listening":
+        if marketing_needed:
+            next_stage = "proposing"
+            
+            # [Global Price Check] If any signal of price sensitivity
+            is_churn_intent = (hits.has("analyze.churn") or intent == "churn")
+            is_price_sensitive = (churn_reason == "price" or objection_reason == "price" or hits.has("analyze.cheap"))
+
+            if is_churn_intent:
+                # Default: Assume Price Sensitivity unless explicit Quality complaint
+                if churn_reason == "quality": 
+                    marketing_type = "retention" # Pivot to Upsell (Better Quality)
+                else: 
+                    marketing_type = "retention_price" # Safe Downsell (Price/Service)
+            elif is_price_sensitive:
+                marketing_type = "cost_optimization" # [NEW] Pure Cost Saving (No Churn Intent)
+            else: 
+                # Complaint (Quality) or General Marketing Need -> Upsell
+                marketing_type = "upsell"
+        else:
+            next_stage = "listening"
+
+    elif current_stage == "proposing":
+        if intent in ["objection", "question"]:
+            # [Pivot Logic] If objection is specifically about PRICE, treat it as a rejection of this item -> Switch to Downsell (Price Retention)
+            if intent == "objection" and objection_reason == "price":
+                # Check if user wants ALTERNATIVE ("too expensive, show me cheaper") vs just complaining
+                next_stage = "proposing" # Re-propose new
+                marketing_type = "cost_optimization" # Switch to Cost Saving
+                marketing_needed = True
+            else:
+                # Generic objection or question?
+                # Check for "Alternative" triggers manually if LLM classified as question
+                if hits.has("analyze.alternative"):
+                     next_stage = "proposing"
+                     marketing_type = "alternative"
+                     marketing_needed = True
+                else:
+                    next_stage = "negotiating" # Defend
+                    marketing_type = "explanation"
+                    marketing_needed = True
+        elif intent == "alternative":
+            next_stage = "proposing" # Re-propose new item
+            marketing_type = "alternative"
+            marketing_needed = True
+        elif intent == "neutral" and not marketing_needed:
+            # User ignored proposal? Stay proposing or back to listening?
+            # Check for "Alternative" triggers manually even if intent is neutral
+            if hits.has("analyze.alternative"):
+                    next_stage = "proposing"
+                    marketing_type = "alternative"
+                    marketing_needed = True
+            elif marketing_needed:
+                next_stage = "proposing"
+                marketing_type = "upsell"
+            else:
+                 next_stage = "listening"
+
+    elif current_stage == "negotiating":
+        if intent == "alternative":
+            # Negotiation failed, user wants pivot
+            next_stage = "proposing"
+            marketing_type = "alternative"
+            marketing_needed = True
+        elif intent in ["objection", "question"]:
+            # Continued negotiation
+            next_stage = "negotiating"
+            marketing_type = "explanation"
+            marketing_needed = True
+        elif intent == "marketing": 
+            # User might be accepting or asking specifically for sign-up
+            # Ideally, if positive -> Closing
+            # For now, treat as explanation/hybrid
+             next_stage = "closing"
+             marketing_type = "hybrid" # or closing type
+             marketing_needed = True
+    
+    # Fallback / Override for Safety
+    if not marketing_needed:
+        marketing_type = "none"
+        # If we were proposing/negotiating and opportunity vanished, maybe go to closing or listening?
+        # Let's default to listening to be safe.
+        # But if we are in negotiating, we shouldn't just drop it unless explicit 'no'.
+        pass
+
+    return next_stage, marketing_needed, marketing_type
+
 
 async def analyze_node(state: MarketingState, config: RunnableConfig):
     """
@@ -16,8 +148,9 @@ async def analyze_node(state: MarketingState, config: RunnableConfig):
     session = config["configurable"]["session"] # MarketingSession instance
     messages = state["messages"]
     last_msg = messages[-1].content if messages else ""
+    # Gatekeeper/service 라우팅에서 이미 스캔한 발화라면 annotation LRU에서 재사용
+    hits = annotate(last_msg)
     
-    # 1. Check Safety (Gatekeeper Only) - Re-verify just in case
     # 1. Check Safety (Gatekeeper Only) - Re-verify just in case
     should_skip = await session.gatekeeper.should_skip_marketing(last_msg)
     if should_skip: 
@@ -29,140 +162,28 @@ async def analyze_node(state: MarketingState, config: RunnableConfig):
             "generated_reasoning": "Gatekeeper Block (Safety/Abuse/VIP)"
         } 
 
-    # 2. [Deep Analysis] Veteran Mode
-    # Instead of reusing the fast router, we conduct a deep-dive with the main LLM.
-    from app.agent.marketing.prompts import DEEP_ANALYSIS_SYSTEM
-    
-    # Context
-    # Context - Use full dialogue history for better analysis
-    dialogue_history = session.dialogue_text(last_n=6)
-    
-    # Construct Prompt
-    # Convert signals list to string
-    signals_str = ", ".join(session.customer.signals) if session.customer.signals else "없음"
-    
-    user_prompt = f"""
-    [대화 기록 (최근 상황)]
-    {dialogue_history}
-    
-    [현재 고객 발언]
-    "{last_msg}"
-    
-    [고객 프로필 (Deep Dive)]
-    요금제: {session.customer.mobile_plan}
-    약정상태: {session.customer.contract_remaining_months}개월 남음
-    월납부액: {session.customer.monthly_fee_won}원
-    특이사항(Signals): {signals_str}
-    """
-    
     # State Machine Logic
     current_stage = state.get("conversation_stage", "listening")
     next_stage = current_stage
     
-    # Analyze Intent using DEEP_ANALYSIS Logic
     try:
-        print(f"--- [Marketing] Deep Analysis (Stage: {current_stage}) ---")
-        analysis = await session.llm.chat_json(
-            system_prompt=DEEP_ANALYSIS_SYSTEM,
-            user_prompt=user_prompt,
-            temperature=0.0
-        )
-        # Raw Analysis
-        marketing_needed = analysis.get("marketing_opportunity", False)
-        intent = analysis.get("intent", "neutral")
-        churn_reason = analysis.get("churn_reason", "unknown")
-        objection_reason = analysis.get("objection_reason", "unknown")
-        reasoning = analysis.get("reasoning", "No reason provided")
-        
-        # -----------------------------------------------------
-        # State Transition Table
-        # -----------------------------------------------------
-        marketing_type = "none"
-        
-        if current_stage == "listening":
-            if marketing_needed:
-                next_stage = "proposing"
-                
-                # [Global Price Check] If any signal of price sensitivity
-                is_churn_intent = ("해지" in last_msg or "탈퇴" in last_msg or intent == "churn")
-                is_price_sensitive = (churn_reason == "price" or objection_reason == "price" or "싸" in last_msg or "저렴" in last_msg)
-
-                if is_churn_intent:
-                    # Default: Assume Price Sensitivity unless explicit Quality complaint
-                    if churn_reason == "quality": 
-                        marketing_type = "retention" # Pivot to Upsell (Better Quality)
-                    else: 
-                        marketing_type = "retention_price" # Safe Downsell (Price/Service)
-                elif is_price_sensitive:
-                    marketing_type = "cost_optimization" # [NEW] Pure Cost Saving (No Churn Intent)
-                else: 
-                    # Complaint (Quality) or General Marketing Need -> Upsell
-                    marketing_type = "upsell"
-            else:
-                next_stage = "listening"
-
-        elif current_stage == "proposing":
-            if intent in ["objection", "question"]:
-                # [Pivot Logic] If objection is specifically about PRICE, treat it as a rejection of this item -> Switch to Downsell (Price Retention)
-                if intent == "objection" and objection_reason == "price":
-                    # Check if user wants ALTERNATIVE ("too expensive, show me cheaper") vs just complaining
-                    next_stage = "proposing" # Re-propose new
-                    marketing_type = "cost_optimization" # Switch to Cost Saving
-                    marketing_needed = True
-                else:
-                    # Generic objection or question?
-                    # Check for "Alternative" triggers manually if LLM classified as question
-                    if any(x in last_msg for x in ["다른", "딴거", "그거 말고", "제외하고"]):
-                         next_stage = "proposing"
-                         marketing_type = "alternative"
-                         marketing_needed = True
-                    else:
-                        next_stage = "negotiating" # Defend
-                        marketing_type = "explanation"
-                        marketing_needed = True
-            elif intent == "alternative":
-                next_stage = "proposing" # Re-propose new item
-                marketing_type = "alternative"
-                marketing_needed = True
-            elif intent == "neutral" and not marketing_needed:
-                # User ignored proposal? Stay proposing or back to listening?
-                # Check for "Alternative" triggers manually even if intent is neutral
-                if any(x in last_msg for x in ["다른", "딴거", "그거 말고", "제외하고"]):
-                        next_stage = "proposing"
-                        marketing_type = "alternative"
-                        marketing_needed = True
-                elif marketing_needed:
-                    next_stage = "proposing"
-                    marketing_type = "upsell"
-                else:
-                     next_stage = "listening"
+        # [NEW] MARKETING_PIPELINE=combined: 라우팅 단계(Gatekeeper.route_and_analyze)에서 이미 분석함 -> LLM 생략
+        analysis = state.get("precomputed_analysis")
+        if analysis:
+            print(f"--- [Marketing] Using combined route analysis (Stage: {current_stage}) ---")
+        else:
+            # 2. [Deep Analysis] Veteran Mode
+            # Instead of reusing the fast router, we conduct a deep-dive with the main LLM.
+            from app.agent.marketing.prompts import DEEP_ANALYSIS_SYSTEM
 
-        elif current_stage == "negotiating":
-            if intent == "alternative":
-                # Negotiation failed, user wants pivot
-                next_stage = "proposing"
-                marketing_type = "alternative"
-                marketing_needed = True
-            elif intent in ["objection", "question"]:
-                # Continued negotiation
-                next_stage = "negotiating"
-                marketing_type = "explanation"
-                marketing_needed = True
-            elif intent == "marketing": 
-                # User might be accepting or asking specifically for sign-up
-                # Ideally, if positive -> Closing
-                # For now, treat as explanation/hybrid
-                 next_stage = "closing"
-                 marketing_type = "hybrid" # or closing type
-                 marketing_needed = True
-        
-        # Fallback / Override for Safety
-        if not marketing_needed:
-            marketing_type = "none"
-            # If we were proposing/negotiating and opportunity vanished, maybe go to closing or listening?
-            # Let's default to listening to be safe.
-            # But if we are in negotiating, we shouldn't just drop it unless explicit 'no'.
-            pass
+            print(f"--- [Marketing] Deep Analysis (Stage: {current_stage}) ---")
+            analysis = await session.llm.chat_json(
+                system_prompt=DEEP_ANALYSIS_SYSTEM,
+                user_prompt=build_analysis_prompt(session, last_msg),
+                temperature=0.0
+            )
+        reasoning = analysis.get("reasoning", "No reason provided")
+        next_stage, marketing_needed, marketing_type = decide_transition(current_stage, analysis, hits)
 
         print(f"--- [Marketing] State Transition: {current_stage} -> {next_stage} (Type: {marketing_type}) ---")
         
@@ -210,6 +231,8 @@ async def retrieve_node(state: MarketingState, config: RunnableConfig):
     # If we are in 'negotiating' stage (mtype=explanation), we MUST reuse the current proposal.
     if mtype == "explanation" and state.get("current_proposal"):
         print(f"--- [Marketing] Sticky Context Active: Reusing {len(state['current_proposal'])} products ---")
+        # 이번 턴 검색 결과는 쓰지 않음 (speculative 검색이 진행 중이면 취소)
+        session.discard_speculative(session.query_fingerprint())
         return {
             "search_query": query,
             "retrieved_items": [], 
@@ -247,10 +270,20 @@ async def retrieve_node(state: MarketingState, config: RunnableConfig):
         # Boost budget/saving keywords?
         weights = {"marketing": 1.6, "guideline": 1.0}
         
-    q_items = session.qdrant.staged_category_search(
-        query=query, 
-        final_k=8, 
-        categories=cats, 
+    # [NEW] partial 발화 때 미리 가져온 카테고리별 결과가 있고 쿼리 지문이 같으면 재사용
+    # (가중치는 marketing_type이 정해진 지금 적용)
+    from app.agent.marketing.session import RETRIEVAL_STATS
+    RETRIEVAL_STATS["turns"] += 1
+    per_category = await session.take_prefetched(cats)
+    if per_category is None:
+        per_category = await session.qdrant.acategory_search(
+            query, per_category_k=6, categories=cats, fallback_k=8
+        )
+    else:
+        print("--- [Marketing] Using prefetched retrieval ---")
+    q_items = session.qdrant.merge_categories(
+        per_category,
+        final_k=8,
         cat_weights=weights
     )
     
@@ -260,7 +293,11 @@ async def retrieve_node(state: MarketingState, config: RunnableConfig):
 
     # Context Building
     from app.agent.marketing.session import build_context
-    context_text, ev_list = build_context(evidence_items)
+    context_text, ev_list, packed = build_context(evidence_items)
+    print(
+        f"--- [Marketing] Context packed: {packed['packed_tokens']}/{packed['budget']} tokens "
+        f"(dropped {packed['dropped_docs']} docs, {packed['dropped_tokens']} tokens) ---"
+    )
 
     
     # [Price Constraint]
@@ -325,6 +362,7 @@ async def retrieve_node(state: MarketingState, config: RunnableConfig):
         "search_query": query,
         "retrieved_items": ev_list,
         "context_text": context_text,
+        "context_tokens": packed,
         "product_candidates": p_json,
         "rejected_proposals": exclude_names, # Update State
         # If alternative, we effectively cleared current_proposal by searching new ones. 
@@ -334,6 +372,17 @@ async def retrieve_node(state: MarketingState, config: RunnableConfig):
     }
 
 
+# 스트리밍 시 완성되는 즉시 result_delta로 흘려보낼 필드 (대시보드 카드에 먼저 표시)
+STREAM_FIELDS = (("recommended_pitch", "ment"), ("marketing_proposal", "card_title"))
+
+
+async def _emit_delta(on_delta, event: Dict[str, Any]) -> None:
+    try:
+        await on_delta({"agent_type": "marketing", **event})
+    except Exception as e:
+        print(f"[Marketing] result_delta 전송 실패 (무시): {e}")
+
+
 async def generate_node(state: MarketingState, config: RunnableConfig):
     """
     1. Assemble Prompt
@@ -405,15 +454,36 @@ async def generate_node(state: MarketingState, config: RunnableConfig):
     위 정보를 바탕으로 최적의 'recommended_pitch'를 생성하라.
     """
     
+    # [NEW] 스트리밍 모드: 완성된 필드부터 모니터로 (카드 전체 생성을 기다리지 않음)
+    on_delta = config["configurable"].get("on_delta")
+    streaming = (
+        settings.MARKETING_STREAMING
+        and on_delta is not None
+        and hasattr(session.llm, "chat_json_stream")
+    )
+
+    async def on_field(path, value):
+        await _emit_delta(on_delta, {"field": ".".join(path), "text": value, "complete": True})
+
     # Call LLM
     try:
         # Using raw openai client via session wrapper for flexibility, or simple structure
-        result = await session.llm.chat_json(
-            system_prompt=system_prompt, 
-            user_prompt=user_prompt, 
-            temperature=0.3, # Slightly higher for creativity in pitch
-            max_tokens=600
-        )
+        if streaming:
+            result = await session.llm.chat_json_stream(
+                system_prompt=system_prompt,
+                user_prompt=user_prompt,
+                temperature=0.3,
+                max_tokens=600,
+                watch=STREAM_FIELDS,
+                on_field=on_field,
+            )
+        else:
+            result = await session.llm.chat_json(
+                system_prompt=system_prompt, 
+                user_prompt=user_prompt, 
+                temperature=0.3, # Slightly higher for creativity in pitch
+                max_tokens=600
+            )
         
         agent_script = result.get("recommended_pitch", "")
         reasoning = result.get("reasoning", "")
@@ -464,6 +534,15 @@ async def generate_node(state: MarketingState, config: RunnableConfig):
         if result.get("marketing_type") == "alternative" and state.get("product_candidates"):
              new_proposal_state = state.get("product_candidates")
 
+        if streaming:
+            # 검증/보정(fallback 카드)까지 끝난 최종 객체 -> 먼저 보낸 조각을 덮어씀
+            await _emit_delta(on_delta, {
+                "field": "final",
+                "final": True,
+                "recommended_pitch": agent_script,
+                "marketing_proposal": marketing_proposal,
+            })
+
         return {
             "agent_script": agent_script,
             "marketing_type": result.get("marketing_type", m_type_hint),
@@ -1,44 +1,37 @@
-import re
 from typing import Dict, Any, List, Optional
 from dataclasses import dataclass
 import os
 import json
+import time
 from openai import AsyncOpenAI
 
+from app.core.config import settings
+from app.utils.keywords import LEXICONS, annotate, keyword_engine
+
+from .cache import SemanticCache, semantic_route_cache
+
 @dataclass
 class SafetyResult:
     is_safe: bool
     reason: str
     risk_level: str  # "safe", "caution", "block"
 
+
+# route_and_analyze 결과 중 프로세스 공용 캐시에 저장하는 필드 (발화 + 직전 멘트만으로 정해지는 라우팅 결정)
+ROUTE_FIELDS = ("intent", "sentiment", "marketing_opportunity")
+
+
 class Gatekeeper:
     """
     The First Line of Defense.
     Filters out unsafe, angry, or irrelevant contexts BEFORE invoking the LLM.
     """
-    def __init__(self):
-        # 1. Emotion Blacklist (Regex for speed)
-        self.furious_keywords = [
-            r"개새끼", r"미친", r"씨발", r"닥쳐", r"장난해", r"임마", r"자식", r"새끼", r"꺼져",
-            r"팀장", r"상급자", r"책임자", r"소보원", r"고발", r"신고",
-            r"말귀", r"몇 번을 말해", r"안 산다", r"짜증"
-        ]
-        self.furious_pattern = re.compile("|".join(self.furious_keywords), re.IGNORECASE)
-
-        # 2. Topic Blacklist (Sensitive contexts)
-        self.sensitive_keywords = [
-            r"사망", r"별세", r"장례", r"독촉", r"압류", r"파산", 
-            r"소송", r"법적", r"경찰", r"병원", r"응급실"
-        ]
-        self.sensitive_pattern = re.compile("|".join(self.sensitive_keywords), re.IGNORECASE)
-
-        # 3. Whitelist (High Potential)
-        self.opportunity_keywords = [
-            r"요금", r"할인", r"약정", r"만료", r"바꾸", r"변경", 
-            r"인터넷", r"데이터", r"부족", r"느려", r"답답", r"비싸",
-            r"해지", r"탈퇴", r"그만", r"끊어", r"다른"
-        ]
-        self.opportunity_pattern = re.compile("|".join(self.opportunity_keywords), re.IGNORECASE)
+    def __init__(self, cache: Optional[SemanticCache] = None):
+        # 1~3. Emotion Blacklist / Topic Blacklist / Whitelist
+        # 공용 키워드 엔진(app.utils.keywords) 한 번의 스캔으로 판정, 결과는 발화 단위로 공유
+        self.furious_keywords = LEXICONS["gatekeeper.furious"]
+        self.sensitive_keywords = LEXICONS["gatekeeper.sensitive"]
+        self.opportunity_keywords = LEXICONS["gatekeeper.opportunity"]
 
         # [NEW] Tier 2: Fast LLM Client
         api_key = os.environ.get("OPENAI_API_KEY")
@@ -52,6 +45,12 @@ class Gatekeeper:
         # Fast Model Name
         self.fast_model = "gpt-4o-mini" # or "gpt-3.5-turbo"
 
+        # [NEW] Tier 1.5: 프로세스 공용 결정 캐시 (세션마다 만들지 않음)
+        self.cache = cache or semantic_route_cache
+        self._route_bits = 0
+        for cat in ("gatekeeper.furious", "gatekeeper.sensitive", "gatekeeper.opportunity"):
+            self._route_bits |= keyword_engine.bits[cat]
+
     async def check_safety(self, text: str) -> SafetyResult:
         """
         Determines if the input is safe to proceed with marketing.
@@ -60,12 +59,14 @@ class Gatekeeper:
         if not text:
             return SafetyResult(True, "Empty text", "safe")
 
+        hits = annotate(text)
+
         # Check Furious/Abusive
-        if self.furious_pattern.search(text):
+        if hits.has("gatekeeper.furious"):
             return SafetyResult(False, "Detected abusive/furious language", "block")
 
         # Check Sensitive Topics
-        if self.sensitive_pattern.search(text):
+        if hits.has("gatekeeper.sensitive"):
             return SafetyResult(False, "Detected sensitive topic (legal/health/death)", "block")
 
         return SafetyResult(True, "Passed regex filters", "safe")
@@ -75,30 +76,20 @@ class Gatekeeper:
         Classifies the intent into: 'complaint', 'marketing', 'support', 'neutral'
         For Tier 1, we use Regex. For Tier 2, we would use an sLLM here.
         """
-        if self.furious_pattern.search(text):
+        hits = annotate(text)
+        if hits.has("gatekeeper.furious"):
             return "complaint"
         
-        if self.opportunity_pattern.search(text):
+        if hits.has("gatekeeper.opportunity"):
             return "marketing"
             
         return "neutral"
 
-    async def semantic_route(self, text: str, context: str = "") -> Dict[str, Any]:
+    async def _regex_tier(self, text: str) -> Optional[Dict[str, Any]]:
         """
-        [Tier 2] Fast LLM Classification.
-        Returns generic JSON: {"intent": "...", "sentiment": "...", "marketing_opportunity": bool}
+        [Tier 1] LLM 앞단 정규식/길이/안전 필터 (semantic_route, route_and_analyze 공용)
+        Returns: 바로 결정할 수 있으면 결과 dict, LLM 판단이 필요하면 None
         """
-        # 1. Fallback to Regex if client missing
-        if not self.fast_client:
-            topic = await self.classify_topic(text)
-            return {
-                "intent": topic, 
-                "sentiment": "neutral", 
-                "marketing_opportunity": (topic == "marketing")
-            }
-
-        # 2. [Optimization] Zero-Cost Heuristic Checks (Save API Cost)
-        
         # 2-0. Regex Classification (Priority 1)
         # Check explicit markers FIRST.
         regex_topic = await self.classify_topic(text)
@@ -124,6 +115,45 @@ class Gatekeeper:
              print("[Router] ⏩ Skip: Unsafe content")
              return {"intent": "unsafe", "marketing_opportunity": False}
 
+        return None
+
+    async def regex_route(self, text: str) -> Optional[Dict[str, Any]]:
+        """
+        Tier 1만 실행 (LLM 없이 결정되면 source="regex" 결과, 아니면 None).
+        호출부가 Tier 2 전에 할 일(speculative 검색 등)을 LLM이 필요한 턴에만 시작할 때 사용
+        -> 이어서 semantic_route / route_and_analyze 에 tier1_checked=True
+        """
+        shortcut = await self._regex_tier(text)
+        return {**shortcut, "source": "regex"} if shortcut is not None else None
+
+    async def semantic_route(self, text: str, context: str = "", tier1_checked: bool = False) -> Dict[str, Any]:
+        """
+        [Tier 2] Fast LLM Classification.
+        Returns generic JSON: {"intent": "...", "sentiment": "...", "marketing_opportunity": bool}
+        """
+        # 1. Fallback to Regex if client missing
+        if not self.fast_client:
+            topic = await self.classify_topic(text)
+            return {
+                "intent": topic, 
+                "sentiment": "neutral", 
+                "marketing_opportunity": (topic == "marketing")
+            }
+
+        # 2. [Optimization] Zero-Cost Heuristic Checks (Save API Cost)
+        shortcut = None if tier1_checked else await self._regex_tier(text)
+        if shortcut is not None:
+            return shortcut
+
+        # 2-4. [NEW] Semantic Cache: 같은/비슷한 발화 + 직전 상담사 멘트면 LLM 결정을 재사용
+        # (Gatekeeper 키워드 카테고리가 다르면 비슷해 보여도 다른 결정으로 취급)
+        signature = annotate(text).mask & self._route_bits
+        if settings.SEMANTIC_ROUTE_CACHE_ENABLED:
+            cached = await self.cache.get(text, context, signature=signature)
+            if cached is not None:
+                print(f"[Router] ⏩ Cache hit ('{text}')")
+                return cached
+
         # 3. Fast LLM Call (Only for ambiguous cases)
         try:
             prompt = (
@@ -149,7 +179,8 @@ class Gatekeeper:
                 max_tokens=100,
                 response_format={"type": "json_object"}
             )
-            print(f"[Router] ✅ Received response in {time.time()-t0:.2f}s")
+            elapsed = time.time() - t0
+            print(f"[Router] ✅ Received response in {elapsed:.2f}s")
             content = completion.choices[0].message.content.strip()
             # Loose JSON parsing (handle potential markdown fences)
             if content.startswith("```json"):
@@ -157,7 +188,10 @@ class Gatekeeper:
             elif content.startswith("```"):
                 content = content[3:-3]
             
-            return json.loads(content)
+            result = json.loads(content)
+            if settings.SEMANTIC_ROUTE_CACHE_ENABLED and isinstance(result, dict):
+                await self.cache.set(text, result, context=context, signature=signature, latency=elapsed)
+            return result
         except Exception as e:
             print(f"[Router] Fast LLM failed: {e}")
             # Fallback to Regex
@@ -168,6 +202,66 @@ class Gatekeeper:
                 "marketing_opportunity": (topic == "marketing")
             }
 
+    async def route_and_analyze(
+        self, text: str, context: str, llm: Any, analysis_prompt: str, tier1_checked: bool = False
+    ) -> Dict[str, Any]:
+        """
+        [Tier 2, MARKETING_PIPELINE=combined] semantic_route + analyze_node Deep Analysis를 LLM 1회로.
+        Tier 1(정규식/길이/안전)은 그대로 앞에서 short-circuit, 결정 캐시도 같이 사용 (signature로 구분)
+        캐시에는 라우팅 필드(ROUTE_FIELDS)만 저장: 분석은 고객 프로필/대화 이력에 달려 있어 다른 통화에 재사용할 수 없음
+        -> cache 적중이면 라우팅 결과만 있고 분석은 analyze_node Deep Analysis가 수행
+        Returns: {"marketing_opportunity", "intent", "sentiment", "churn_reason", "objection_reason",
+                  "reasoning", "source": "regex" | "cache" | "llm" | "fallback"} (cache는 라우팅 필드만)
+        """
+        shortcut = None if tier1_checked else await self.regex_route(text)
+        if shortcut is not None:
+            return shortcut
+
+        signature = ("combined", annotate(text).mask & self._route_bits)
+        if settings.SEMANTIC_ROUTE_CACHE_ENABLED:
+            cached = await self.cache.get(text, context, signature=signature)
+            if cached is not None:
+                print(f"[Router] ⏩ Cache hit ('{text}')")
+                return {**cached, "source": "cache"}
+
+        from .prompts import ROUTE_ANALYSIS_SYSTEM
+
+        user_prompt = f'[직전 상담사 발화]\n"{context}"\n{analysis_prompt}'
+        t0 = time.perf_counter()
+        try:
+            analysis = await llm.chat_json(
+                system_prompt=ROUTE_ANALYSIS_SYSTEM,
+                user_prompt=user_prompt,
+                temperature=0.0,
+                max_tokens=300,
+            )
+            if not isinstance(analysis, dict) or "marketing_opportunity" not in analysis:
+                raise ValueError(f"unexpected analysis: {str(analysis)[:200]}")
+        except Exception as e:
+            print(f"[Router] Combined route/analysis failed: {e}")
+            # Fallback to Regex (semantic_route와 같은 기준)
+            topic = await self.classify_topic(text)
+            return {
+                "intent": topic,
+                "sentiment": "unknown",
+                "marketing_opportunity": (topic == "marketing"),
+                "reasoning": "Analysis Error",
+                "source": "fallback",
+            }
+        elapsed = time.perf_counter() - t0
+        print(f"[Router] ✅ Combined route/analysis in {elapsed:.2f}s")
+
+        if settings.SEMANTIC_ROUTE_CACHE_ENABLED:
+            route = {k: analysis[k] for k in ROUTE_FIELDS if k in analysis}
+            await self.cache.set(text, route, context=context, signature=signature, latency=elapsed)
+        return {**analysis, "source": "llm"}
+
+    def has_opportunity(self, text: str) -> bool:
+        """
+        Whitelist 키워드 포함 여부 (partial STT prefetch 트리거)
+        """
+        return annotate(text).has("gatekeeper.opportunity")
+
     async def should_skip_marketing(self, text: str) -> bool:
         """
         Quick check for MarketingSession.
@@ -1,21 +1,32 @@
 import os
+import asyncio
+import contextlib
 import re
 import json
 import time
 import glob
-from dataclasses import dataclass, field
-from typing import Any, Dict, List, Optional, Tuple
-from collections import defaultdict
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
 
 import numpy as np
 
 import httpx
 
-from qdrant_client import QdrantClient, models
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
 from langchain_core.documents import Document
-from langchain_qdrant import QdrantVectorStore, RetrievalMode, FastEmbedSparse
+from langchain_qdrant import QdrantVectorStore, FastEmbedSparse
 from langchain_community.embeddings.fastembed import FastEmbedEmbeddings
 
+from app.services.embedding_cache import CachedEmbeddings, CachedSparseEmbeddings
+from app.services.local_index import LocalVectorIndex, UnsupportedQuery, get_local_index
+from app.services.category_catalog import CategoryCatalog, get_category_catalog
+from app.services.context_packer import PackEntry, marketing_context_packer
+from app.services.llm_http import llm_http_client
+from app.core.config import settings
+from app.utils.keywords import LEXICONS, annotate
+from app.utils.partial_json import IncrementalJSONParser
+from app.utils.qdrant_points import document_from_point
+
 from app.agent.marketing.prompts import (
     BASE_SYSTEM,
     STRATEGY_UPSELL,
@@ -28,6 +39,22 @@ from app.agent.marketing.prompts import (
 # -------------------------
 
 
+# 순서대로 적용 (한 alternation으로 합치면 결과가 달라짐: 주소 패턴이 뒤따르는 전화번호까지 삼키는 등).
+# 각 패턴은 (게이트, 정규식, 치환) - 게이트 문자열/숫자가 없으면 그 패턴은 건너뜀
+_PII_RULES = [
+    (None, re.compile(r"\b01[0-9][- ]?\d{3,4}[- ]?\d{4}\b"), "<PHONE>"),
+    (None, re.compile(r"\b\d{6,}\b"), "<NUM>"),
+    (None, re.compile(r"([가-힣]{1,10}(?:로|길)\s*\d+(?:[가-힣0-9\s\-]*)?)"), "<ADDRESS>"),
+    (None, re.compile(r"\b\d+\s*호\b"), "<HO>"),
+    ("성함이", re.compile(r"(성함이)\s*([가-힣]{2,4})"), r"\1 <NAME>"),
+    ("상담사", re.compile(r"(상담사)\s*([가-힣]{2,4})"), r"\1 <NAME>"),
+    ("고객님", re.compile(r"([가-힣]{2,4})\s*고객님"), r"<NAME> 고객님"),
+]
+# 위 패턴 중 하나라도 걸릴 수 있는지 한 번에 확인 (숫자 패턴 4개는 모두 숫자가 있어야 매칭)
+_PII_TRIGGER = re.compile(r"\d|성함이|상담사|고객님")
+_DIGIT = re.compile(r"\d")
+
+
 def mask_pii(text: str) -> str:
     if not text:
         return ""
@@ -37,13 +64,13 @@ def mask_pii(text: str) -> str:
         text = text.get("ment") or text.get("recommendation") or str(text)
 
     t = str(text)  # Ensure string
-    t = re.sub(r"\b01[0-9][- ]?\d{3,4}[- ]?\d{4}\b", "<PHONE>", t)
-    t = re.sub(r"\b\d{6,}\b", "<NUM>", t)
-    t = re.sub(r"([가-힣]{1,10}(?:로|길)\s*\d+(?:[가-힣0-9\s\-]*)?)", "<ADDRESS>", t)
-    t = re.sub(r"\b\d+\s*호\b", "<HO>", t)
-    t = re.sub(r"(성함이)\s*([가-힣]{2,4})", r"\1 <NAME>", t)
-    t = re.sub(r"(상담사)\s*([가-힣]{2,4})", r"\1 <NAME>", t)
-    t = re.sub(r"([가-힣]{2,4})\s*고객님", r"<NAME> 고객님", t)
+    # 대부분의 발화는 여기서 끝남 (정규식 1회)
+    if not _PII_TRIGGER.search(t):
+        return t
+    has_digit = _DIGIT.search(t) is not None
+    for gate, pattern, repl in _PII_RULES:
+        if (has_digit if gate is None else gate in t):
+            t = pattern.sub(repl, t)
     return t
 
 
@@ -227,6 +254,13 @@ class CustomerDB:
 # -------------------------
 
 
+def doc_uid(metadata: Dict[str, Any], page_content: str) -> str:
+    """
+    RRF/중복 제거용 문서 식별자 (같은 문서가 다른 point로 중복 적재된 경우도 하나로 취급)
+    """
+    return f"{safe_str(metadata.get('source'))}||{safe_str(metadata.get('title'))}||{(page_content or '')[:120]}"
+
+
 @dataclass(frozen=True)
 class RetrievedItem:
     doc_id: str
@@ -234,6 +268,14 @@ class RetrievedItem:
     page_content: str
     metadata: Dict[str, Any]
     category: str
+    # 생성 시 한 번만 계산 (fusion/dedup 루프에서 재계산하지 않도록), replace()로 복사하면 그대로 유지
+    uid: str = field(default="", compare=False, repr=False)
+    # packer 이름 -> (잘라낸 본문, 토큰 수). replace() 복사본끼리 공유되어 한 번만 셈
+    token_counts: Dict[str, Tuple[str, int]] = field(default_factory=dict, compare=False, repr=False)
+
+    def __post_init__(self):
+        if not self.uid:
+            object.__setattr__(self, "uid", doc_uid(self.metadata, self.page_content))
 
 
 def _normalize_doc_metadata(meta: Dict[str, Any]) -> Dict[str, Any]:
@@ -246,6 +288,47 @@ def _normalize_doc_metadata(meta: Dict[str, Any]) -> Dict[str, Any]:
     return meta
 
 
+@dataclass(frozen=True)
+class QueryVectors:
+    """
+    검색어 1건의 임베딩 (dense / BM25 sparse). 카테고리 x 모드 검색이 모두 이 벡터를 재사용합니다.
+    """
+
+    dense: Optional[List[float]] = None
+    sparse: Optional[models.SparseVector] = None
+
+
+# 인코더(FastEmbed ONNX) 호출 수 + Qdrant 요청(왕복) 수 - /agent/stats 의 retrieval 항목
+RETRIEVAL_STATS = {
+    "dense_calls": 0,
+    "sparse_calls": 0,
+    "qdrant_requests": 0,
+    "local_queries": 0,
+    "searches": 0,
+    "turns": 0,
+}
+
+# 카테고리 검색의 fusion 위치
+#   client: 카테고리마다 semantic/keyword/hybrid 3회 요청 후 _rrf (기본, 기존 결과)
+#   server: 카테고리마다 query_points 1회 (dense/sparse prefetch + 서버측 RRF/DBSF)
+#   batch : 전체 카테고리를 query_batch_points 1회로
+RETRIEVAL_FUSION = settings.MARKETING_RETRIEVAL_FUSION.strip().lower()
+SERVER_FUSION = settings.MARKETING_SERVER_FUSION.strip().lower()
+
+
+def retrieval_stats() -> Dict[str, Any]:
+    calls = RETRIEVAL_STATS["dense_calls"] + RETRIEVAL_STATS["sparse_calls"]
+    turns = RETRIEVAL_STATS["turns"]
+    return {
+        **RETRIEVAL_STATS,
+        "fusion": RETRIEVAL_FUSION,
+        "encoder_calls_per_turn": round(calls / turns, 2) if turns else None,
+        "qdrant_requests_per_turn": (
+            round(RETRIEVAL_STATS["qdrant_requests"] / turns, 2) if turns else None
+        ),
+    }
+
+
 class QdrantSearchEngine:
     def __init__(
         self,
@@ -254,66 +337,61 @@ class QdrantSearchEngine:
         vector_name: str = "dense",
         sparse_vector_name: str = "sparse",
         category_key: str = "metadata.category",
+        async_client: Optional[AsyncQdrantClient] = None,
+        dense_embeddings: Any = None,
+        sparse_embeddings: Any = None,
+        fusion: Optional[str] = None,
+        server_fusion: Optional[str] = None,
+        local_index: Optional[LocalVectorIndex] = None,
+        category_catalog: Optional[CategoryCatalog] = None,
     ):
         self.client = client
+        # [NEW] 컬렉션 메모리 사본 (ready일 때만 사용, 미지원 요청/적재 전에는 원격 Qdrant)
+        self.local_index = local_index
+        self.fusion = (fusion or RETRIEVAL_FUSION).lower()
+        if self.fusion not in ("client", "server", "batch"):
+            raise ValueError(f"unknown retrieval fusion: {self.fusion}")
+        self.server_fusion = (
+            models.Fusion.DBSF
+            if (server_fusion or SERVER_FUSION).lower() == "dbsf"
+            else models.Fusion.RRF
+        )
+        # [NEW] 이벤트 루프를 막지 않는 검색용 (없으면 async 메서드가 sync 검색을 스레드로 돌림)
+        self.async_client = async_client
         self.collection = collection
         self.vector_name = vector_name
         self.sparse_vector_name = sparse_vector_name
         self.category_key = category_key
 
-        self.dense_embeddings = FastEmbedEmbeddings(
-            model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-            normalize=True,
-        )
-        self.sparse_embeddings = FastEmbedSparse(
-            model_name="Qdrant/bm25",
-            sparse=True,
-        )
-
-        self.vs_dense = QdrantVectorStore(
-            client=client,
-            collection_name=collection,
-            embedding=self.dense_embeddings,
-            sparse_embedding=self.sparse_embeddings,
-            retrieval_mode=RetrievalMode.DENSE,
-            vector_name=vector_name,
-            sparse_vector_name=sparse_vector_name,
-        )
-        self.vs_sparse = QdrantVectorStore(
-            client=client,
-            collection_name=collection,
-            embedding=self.dense_embeddings,
-            sparse_embedding=self.sparse_embeddings,
-            retrieval_mode=RetrievalMode.SPARSE,
-            vector_name=vector_name,
-            sparse_vector_name=sparse_vector_name,
+        # 기본 FastEmbed 모델은 프로세스 공용 임베딩 캐시를 거칩니다 (guidance와 dense 모델 공유)
+        self.dense_embeddings = dense_embeddings or CachedEmbeddings(
+            FastEmbedEmbeddings(
+                model_name="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                normalize=True,
+            )
         )
-        self.vs_hybrid = QdrantVectorStore(
-            client=client,
-            collection_name=collection,
-            embedding=self.dense_embeddings,
-            sparse_embedding=self.sparse_embeddings,
-            retrieval_mode=RetrievalMode.HYBRID,
-            vector_name=vector_name,
-            sparse_vector_name=sparse_vector_name,
+        self.sparse_embeddings = sparse_embeddings or CachedSparseEmbeddings(
+            FastEmbedSparse(
+                model_name="Qdrant/bm25",
+                sparse=True,
+            )
         )
 
-        # sample existing categories so staged search doesn't filter by non-existent values
-        self.existing_categories = self._sample_categories(250)
+        # QdrantVectorStore 와 같은 payload 규약
+        self.content_payload_key = "page_content"
+        self.metadata_payload_key = "metadata"
 
-    def _sample_categories(self, n: int = 250) -> List[str]:
-        cats = set()
-        pts, _ = self.client.scroll(
-            collection_name=self.collection,
-            limit=n,
-            with_payload=True,
-            with_vectors=False,
+        # [NEW] 존재하는 카테고리/문서 수: keyword 인덱스 facet 집계 (실패 시 scroll 샘플링), 백그라운드 갱신
+        self.category_catalog = category_catalog or CategoryCatalog(
+            client, collection, category_key=category_key
         )
-        for p in pts:
-            md = (p.payload or {}).get("metadata", {})
-            if isinstance(md, dict) and md.get("category"):
-                cats.add(md["category"])
-        return sorted(cats)
+        if self.category_catalog.refreshed_at is None:
+            self.category_catalog.refresh()
+
+    @property
+    def existing_categories(self) -> List[str]:
+        # staged search 가 없는 카테고리로 필터링하지 않도록 (문서 0건 카테고리 제외)
+        return self.category_catalog.categories
 
     def _filter(self, category: Optional[str]) -> Optional[models.Filter]:
         if not category:
@@ -341,32 +419,157 @@ class QdrantSearchEngine:
             )
         return out
 
-    def semantic(
-        self, query: str, k: int = 6, category: Optional[str] = None
-    ) -> List[RetrievedItem]:
-        return self._to_items(
-            self.vs_dense.similarity_search_with_score(
-                query=query, k=k, filter=self._filter(category)
+    # -------------------------
+    # Query embedding (검색 1회당 dense/sparse 각 1번) + query_points 요청
+    # -------------------------
+
+    def _embed_dense(self, query: str) -> List[float]:
+        RETRIEVAL_STATS["dense_calls"] += 1
+        return self.dense_embeddings.embed_query(query)
+
+    def _embed_sparse(self, query: str) -> models.SparseVector:
+        RETRIEVAL_STATS["sparse_calls"] += 1
+        emb = self.sparse_embeddings.embed_query(query)
+        return models.SparseVector(indices=emb.indices, values=emb.values)
+
+    def embed_query(
+        self, query: str, dense: bool = True, sparse: bool = True
+    ) -> QueryVectors:
+        return QueryVectors(
+            dense=self._embed_dense(query) if dense else None,
+            sparse=self._embed_sparse(query) if sparse else None,
+        )
+
+    async def aembed_query(self, query: str) -> QueryVectors:
+        # FastEmbed(ONNX)는 동기 CPU 작업 -> 스레드에서 dense/sparse 동시 실행
+        dense, sparse = await asyncio.gather(
+            asyncio.to_thread(self._embed_dense, query),
+            asyncio.to_thread(self._embed_sparse, query),
+        )
+        return QueryVectors(dense=dense, sparse=sparse)
+
+    def _ensure_vectors(
+        self, mode: str, query: str, vectors: Optional[QueryVectors]
+    ) -> QueryVectors:
+        vectors = vectors or QueryVectors()
+        need_dense = mode in ("semantic", "hybrid") and vectors.dense is None
+        need_sparse = mode in ("keyword", "hybrid") and vectors.sparse is None
+        if not (need_dense or need_sparse):
+            return vectors
+        return QueryVectors(
+            dense=self._embed_dense(query) if need_dense else vectors.dense,
+            sparse=self._embed_sparse(query) if need_sparse else vectors.sparse,
+        )
+
+    def _mode_request(
+        self, mode: str, vectors: QueryVectors, k: int, category: Optional[str]
+    ) -> Dict[str, Any]:
+        """
+        mode: "semantic" | "keyword" | "hybrid" -- 예전 vs_dense / vs_sparse / vs_hybrid 와 같은 query_points 요청
+        """
+        flt = self._filter(category)
+        req = dict(
+            collection_name=self.collection,
+            query_filter=flt,
+            limit=k,
+            with_payload=True,
+            with_vectors=False,
+        )
+        if mode == "semantic":
+            req.update(query=vectors.dense, using=self.vector_name)
+        elif mode == "keyword":
+            req.update(query=vectors.sparse, using=self.sparse_vector_name)
+        elif mode == "hybrid":
+            req.update(
+                prefetch=[
+                    models.Prefetch(
+                        using=self.vector_name, query=vectors.dense, filter=flt, limit=k
+                    ),
+                    models.Prefetch(
+                        using=self.sparse_vector_name,
+                        query=vectors.sparse,
+                        filter=flt,
+                        limit=k,
+                    ),
+                ],
+                query=models.FusionQuery(fusion=models.Fusion.RRF),
             )
+        else:
+            raise ValueError(f"unknown retrieval mode: {mode}")
+        return req
+
+    def _point_to_pair(self, point: Any) -> Tuple[Document, float]:
+        # QdrantVectorStore와 같은 Document 변환 (metadata._id / _collection_name 포함)
+        doc = document_from_point(
+            point,
+            self.collection,
+            self.content_payload_key,
+            self.metadata_payload_key,
         )
+        return doc, point.score
+
+    def _search(
+        self,
+        mode: str,
+        query: str,
+        k: int,
+        category: Optional[str],
+        vectors: Optional[QueryVectors] = None,
+    ) -> List[RetrievedItem]:
+        vectors = self._ensure_vectors(mode, query, vectors)
+        req = self._mode_request(mode, vectors, k, category)
+        res = self._local_query(req)
+        if res is None:
+            RETRIEVAL_STATS["qdrant_requests"] += 1
+            res = self.client.query_points(**req)
+        return self._to_items([self._point_to_pair(p) for p in res.points])
+
+    def _local_query(self, req: Dict[str, Any]) -> Optional[Any]:
+        if self.local_index is None or not self.local_index.ready:
+            return None
+        try:
+            res = self.local_index.query_points(**req)
+        except UnsupportedQuery:
+            return None
+        RETRIEVAL_STATS["local_queries"] += 1
+        return res
+
+    def _local_batch(self, requests: List[models.QueryRequest]) -> Optional[List[Any]]:
+        if self.local_index is None or not self.local_index.ready:
+            return None
+        try:
+            responses = self.local_index.query_batch_points(self.collection, requests=requests)
+        except UnsupportedQuery:
+            return None
+        RETRIEVAL_STATS["local_queries"] += len(requests)
+        return responses
+
+    def semantic(
+        self,
+        query: str,
+        k: int = 6,
+        category: Optional[str] = None,
+        vectors: Optional[QueryVectors] = None,
+    ) -> List[RetrievedItem]:
+        return self._search("semantic", query, k, category, vectors)
 
     def keyword(
-        self, query: str, k: int = 6, category: Optional[str] = None
+        self,
+        query: str,
+        k: int = 6,
+        category: Optional[str] = None,
+        vectors: Optional[QueryVectors] = None,
     ) -> List[RetrievedItem]:
-        return self._to_items(
-            self.vs_sparse.similarity_search_with_score(
-                query=query, k=k, filter=self._filter(category)
-            )
-        )
+        return self._search("keyword", query, k, category, vectors)
 
     def hybrid(
-        self, query: str, k: int = 6, category: Optional[str] = None
+        self,
+        query: str,
+        k: int = 6,
+        category: Optional[str] = None,
+        vectors: Optional[QueryVectors] = None,
     ) -> List[RetrievedItem]:
-        return self._to_items(
-            self.vs_hybrid.similarity_search_with_score(
-                query=query, k=k, filter=self._filter(category)
-            )
-        )
+        return self._search("hybrid", query, k, category, vectors)
 
     @staticmethod
     def _rrf(
@@ -375,35 +578,28 @@ class QdrantSearchEngine:
         final_k: int = 10,
         rrf_k: int = 60,
     ) -> List[RetrievedItem]:
-        def uid(it: RetrievedItem) -> str:
-            src = safe_str(it.metadata.get("source"))
-            title = safe_str(it.metadata.get("title"))
-            head = (it.page_content or "")[:120]
-            return f"{src}||{title}||{head}"
-
-        fused = defaultdict(float)
-        best = {}
+        # uid -> 정수 slot, slot별 점수/대표 item은 리스트로 누적 (처음 등장한 순서 = 동점 시 순서)
+        slots: Dict[str, int] = {}
+        fused: List[float] = []
+        best: List[RetrievedItem] = []
         for w, items in zip(weights, lists):
+            w = float(w)
             for rank, it in enumerate(items, start=1):
-                u = uid(it)
-                fused[u] += float(w) / (rrf_k + rank)
-                if (u not in best) or (it.score > best[u].score):
-                    best[u] = it
-
-        ranked = sorted(fused.keys(), key=lambda u: fused[u], reverse=True)
-        out = []
-        for i, u in enumerate(ranked[:final_k], start=1):
-            it = best[u]
-            out.append(
-                RetrievedItem(
-                    doc_id=f"DOC{i}",
-                    score=it.score,
-                    page_content=it.page_content,
-                    metadata=it.metadata,
-                    category=it.category,
-                )
-            )
-        return out
+                s = slots.get(it.uid)
+                if s is None:
+                    slots[it.uid] = len(fused)
+                    fused.append(w / (rrf_k + rank))
+                    best.append(it)
+                else:
+                    fused[s] += w / (rrf_k + rank)
+                    if it.score > best[s].score:
+                        best[s] = it
+
+        ranked = sorted(range(len(fused)), key=fused.__getitem__, reverse=True)
+        return [
+            replace(best[s], doc_id=f"DOC{i}")
+            for i, s in enumerate(ranked[:final_k], start=1)
+        ]
 
     def fused_search(
         self,
@@ -411,10 +607,12 @@ class QdrantSearchEngine:
         final_k: int = 10,
         k_each: int = 8,
         category: Optional[str] = None,
+        vectors: Optional[QueryVectors] = None,
     ) -> List[RetrievedItem]:
-        sem = self.semantic(query, k=k_each, category=category)
-        kw = self.keyword(query, k=k_each, category=category)
-        hy = self.hybrid(query, k=k_each, category=category)
+        vectors = vectors or self.embed_query(query)
+        sem = self.semantic(query, k=k_each, category=category, vectors=vectors)
+        kw = self.keyword(query, k=k_each, category=category, vectors=vectors)
+        hy = self.hybrid(query, k=k_each, category=category, vectors=vectors)
         return self._rrf([sem, kw, hy], [1.0, 1.0, 1.2], final_k=final_k)
 
     def staged_category_search(
@@ -426,7 +624,233 @@ class QdrantSearchEngine:
         cat_weights: Optional[Dict[str, float]] = None,
         always_include: Optional[Dict[str, int]] = None,
     ) -> List[RetrievedItem]:
+        per_category = self.category_search(
+            query, per_category_k=per_category_k, categories=categories, fallback_k=final_k
+        )
+        return self.merge_categories(
+            per_category,
+            final_k=final_k,
+            cat_weights=cat_weights,
+            always_include=always_include,
+        )
+
+    def category_search(
+        self,
+        query: str,
+        per_category_k: int = 6,
+        categories: Optional[List[str]] = None,
+        fallback_k: int = 10,
+    ) -> Dict[str, List[RetrievedItem]]:
+        """
+        [Stage 1] 카테고리별 fused 검색 (가중치와 무관 -> 미리 가져와 두고 나중에 merge 가능)
+        존재하는 카테고리가 없으면 {"*": 전체 검색 결과} 를 반환
+        """
+        plan = self._category_plan(query, per_category_k, categories, fallback_k)
+        vectors = self.embed_query(query)
+        if self.fusion == "client":
+            return {
+                key: self.fused_search(
+                    query, final_k=final_k, k_each=k_each, category=cat, vectors=vectors
+                )
+                for key, cat, final_k, k_each in plan
+            }
+        return self._sync_fusion(plan, vectors)
+
+    def _sync_fusion(
+        self, plan: List[Tuple[str, Optional[str], int, int]], vectors: QueryVectors
+    ) -> Dict[str, List[RetrievedItem]]:
+        requests = [self._fusion_request(vectors, *spec[1:]) for spec in plan]
+        local = self._local_batch(requests)
+        if local is not None:
+            return self._fusion_results(plan, local)
+        if self.fusion == "batch":
+            RETRIEVAL_STATS["qdrant_requests"] += 1
+            responses = self.client.query_batch_points(self.collection, requests=requests)
+        else:
+            RETRIEVAL_STATS["qdrant_requests"] += len(requests)
+            responses = [
+                self.client.query_points(self.collection, **self._request_kwargs(r))
+                for r in requests
+            ]
+        return self._fusion_results(plan, responses)
+
+    # -------------------------
+    # Server-side fusion (Query API prefetch + RRF/DBSF) - fusion="server" | "batch"
+    # -------------------------
+
+    def _category_plan(
+        self,
+        query: str,
+        per_category_k: int,
+        categories: Optional[List[str]],
+        fallback_k: int,
+    ) -> List[Tuple[str, Optional[str], int, int]]:
+        """
+        [(결과 key, 필터 카테고리, final_k, k_each)] - 존재하는 카테고리가 없으면 {"*": 전체 검색} 한 건
+        """
         categories = categories or ["marketing", "guideline", "principle", "terms"]
+        cats = [c for c in categories if c in self.existing_categories]
+        RETRIEVAL_STATS["searches"] += 1
+        if not cats:
+            return [("*", None, fallback_k, max(per_category_k, 6))]
+        return [(c, c, per_category_k, per_category_k) for c in cats]
+
+    def _fusion_request(
+        self,
+        vectors: QueryVectors,
+        category: Optional[str],
+        final_k: int,
+        k_each: int,
+    ) -> models.QueryRequest:
+        flt = self._filter(category)
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(
+                    using=self.vector_name, query=vectors.dense, filter=flt, limit=k_each
+                ),
+                models.Prefetch(
+                    using=self.sparse_vector_name,
+                    query=vectors.sparse,
+                    filter=flt,
+                    limit=k_each,
+                ),
+            ],
+            query=models.FusionQuery(fusion=self.server_fusion),
+            filter=flt,
+            limit=final_k,
+            with_payload=True,
+            with_vector=False,
+        )
+
+    @staticmethod
+    def _request_kwargs(req: models.QueryRequest) -> Dict[str, Any]:
+        return dict(
+            prefetch=req.prefetch,
+            query=req.query,
+            query_filter=req.filter,
+            limit=req.limit,
+            with_payload=req.with_payload,
+            with_vectors=req.with_vector,
+        )
+
+    def _fusion_results(
+        self, plan: List[Tuple[str, Optional[str], int, int]], responses: List[Any]
+    ) -> Dict[str, List[RetrievedItem]]:
+        return {
+            spec[0]: self._to_items([self._point_to_pair(p) for p in res.points])
+            for spec, res in zip(plan, responses)
+        }
+
+    # -------------------------
+    # Async path (AsyncQdrantClient + asyncio.gather)
+    # retrieve_node / prefetch 처럼 이벤트 루프 위에서 부르는 곳은 이쪽을 사용
+    # -------------------------
+
+    async def _aquery(
+        self, mode: str, query: str, k: int, category: Optional[str], vectors: QueryVectors
+    ) -> List[RetrievedItem]:
+        req = self._mode_request(mode, vectors, k, category)
+        res = self._local_query(req)  # 메모리 사본은 sub-ms -> 스레드 없이 바로
+        if res is None:
+            if self.async_client is None:
+                return await asyncio.to_thread(self._search, mode, query, k, category, vectors)
+            RETRIEVAL_STATS["qdrant_requests"] += 1
+            res = await self.async_client.query_points(**req)
+        return self._to_items([self._point_to_pair(p) for p in res.points])
+
+    async def afused_search(
+        self,
+        query: str,
+        final_k: int = 10,
+        k_each: int = 8,
+        category: Optional[str] = None,
+        vectors: Optional[QueryVectors] = None,
+    ) -> List[RetrievedItem]:
+        vectors = vectors or await self.aembed_query(query)
+        sem, kw, hy = await asyncio.gather(
+            self._aquery("semantic", query, k_each, category, vectors),
+            self._aquery("keyword", query, k_each, category, vectors),
+            self._aquery("hybrid", query, k_each, category, vectors),
+        )
+        return self._rrf([sem, kw, hy], [1.0, 1.0, 1.2], final_k=final_k)
+
+    async def acategory_search(
+        self,
+        query: str,
+        per_category_k: int = 6,
+        categories: Optional[List[str]] = None,
+        fallback_k: int = 10,
+    ) -> Dict[str, List[RetrievedItem]]:
+        """
+        category_search 의 async 버전: 카테고리 x 모드 검색을 한 번에 gather (결과 동일)
+        """
+        plan = self._category_plan(query, per_category_k, categories, fallback_k)
+        vectors = await self.aembed_query(query)
+        if self.async_client is None and self.fusion != "client":
+            return await asyncio.to_thread(self._sync_fusion, plan, vectors)
+        if self.fusion == "client":
+            results = await asyncio.gather(
+                *[
+                    self.afused_search(
+                        query, final_k=final_k, k_each=k_each, category=cat, vectors=vectors
+                    )
+                    for _key, cat, final_k, k_each in plan
+                ]
+            )
+            return {spec[0]: items for spec, items in zip(plan, results)}
+
+        requests = [self._fusion_request(vectors, *spec[1:]) for spec in plan]
+        local = self._local_batch(requests)
+        if local is not None:
+            return self._fusion_results(plan, local)
+        if self.fusion == "batch":
+            RETRIEVAL_STATS["qdrant_requests"] += 1
+            responses = await self.async_client.query_batch_points(
+                self.collection, requests=requests
+            )
+        else:
+            RETRIEVAL_STATS["qdrant_requests"] += len(requests)
+            responses = await asyncio.gather(
+                *[
+                    self.async_client.query_points(self.collection, **self._request_kwargs(r))
+                    for r in requests
+                ]
+            )
+        return self._fusion_results(plan, responses)
+
+    async def astaged_category_search(
+        self,
+        query: str,
+        final_k: int = 10,
+        per_category_k: int = 6,
+        categories: Optional[List[str]] = None,
+        cat_weights: Optional[Dict[str, float]] = None,
+        always_include: Optional[Dict[str, int]] = None,
+    ) -> List[RetrievedItem]:
+        per_category = await self.acategory_search(
+            query, per_category_k=per_category_k, categories=categories, fallback_k=final_k
+        )
+        return self.merge_categories(
+            per_category,
+            final_k=final_k,
+            cat_weights=cat_weights,
+            always_include=always_include,
+        )
+
+    async def aclose(self) -> None:
+        if self.async_client is not None:
+            await self.async_client.close()
+
+    def merge_categories(
+        self,
+        per_category: Dict[str, List[RetrievedItem]],
+        final_k: int = 10,
+        cat_weights: Optional[Dict[str, float]] = None,
+        always_include: Optional[Dict[str, int]] = None,
+    ) -> List[RetrievedItem]:
+        """
+        [Stage 2] 카테고리 가중치 RRF + 필수 포함(always_include) 적용
+        """
         cat_weights = cat_weights or {
             "marketing": 1.45,
             "guideline": 1.15,
@@ -435,27 +859,17 @@ class QdrantSearchEngine:
         }
         always_include = always_include or {"terms": 2}
 
-        cats = [c for c in categories if c in self.existing_categories]
-        if not cats:
-            return self.fused_search(
-                query, final_k=final_k, k_each=max(per_category_k, 6), category=None
-            )
+        if "*" in per_category:
+            return self._renumber(per_category["*"][:final_k])
 
         per = []
         ws = []
-        for c in cats:
-            per.append(
-                self.fused_search(
-                    query, final_k=per_category_k, k_each=per_category_k, category=c
-                )
-            )
+        for c, items in per_category.items():
+            per.append(items)
             ws.append(float(cat_weights.get(c, 1.0)))
 
         merged = self._rrf(per, ws, final_k=max(final_k, sum(always_include.values())))
 
-        def uid(it: RetrievedItem) -> str:
-            return f"{safe_str(it.metadata.get('source'))}||{safe_str(it.metadata.get('title'))}||{(it.page_content or '')[:120]}"
-
         # enforce minimum terms etc
         forced = []
         seen_u = set()
@@ -463,14 +877,14 @@ class QdrantSearchEngine:
             if cat not in self.existing_categories:
                 continue
             for it in [x for x in merged if x.category == cat][: int(n)]:
-                u = uid(it)
+                u = it.uid
                 if u not in seen_u:
                     forced.append(it)
                     seen_u.add(u)
 
         final, seen = [], set()
         for it in forced + merged:
-            u = uid(it)
+            u = it.uid
             if u in seen:
                 continue
             final.append(it)
@@ -478,45 +892,53 @@ class QdrantSearchEngine:
             if len(final) >= final_k:
                 break
 
-        out = []
-        for i, it in enumerate(final, start=1):
-            out.append(
-                RetrievedItem(
-                    doc_id=f"DOC{i}",
-                    score=it.score,
-                    page_content=it.page_content,
-                    metadata=it.metadata,
-                    category=it.category,
-                )
-            )
-        return out
+        return self._renumber(final)
+
+    @staticmethod
+    def _renumber(items: List[RetrievedItem]) -> List[RetrievedItem]:
+        return [replace(it, doc_id=f"DOC{i}") for i, it in enumerate(items, start=1)]
 
 
 def build_context(
-    items: List[RetrievedItem], max_chars: int = 8500, per_doc_chars: int = 850
-) -> Tuple[str, List[Dict[str, Any]]]:
-    blocks, ev, used = [], [], 0
-    for it in items:
+    items: List[RetrievedItem], packer=marketing_context_packer
+) -> Tuple[str, List[Dict[str, Any]], Dict[str, int]]:
+    """
+    근거 문서를 토큰 예산(packer.budget) 안에 담습니다. items는 RRF 순위순이므로 순위가 곧 우선순위(score)
+    반환: (context, evidence 목록, packed/dropped 토큰 리포트)
+    """
+    entries = []
+    for rank, it in enumerate(items):
         src = safe_str(it.metadata.get("source"))
         title = safe_str(it.metadata.get("title"))
         cat = safe_str(it.category)
-        txt = re.sub(r"\n{3,}", "\n\n", (it.page_content or "").strip())[:per_doc_chars]
-        block = f"[{it.doc_id}]\n- category: {cat}\n- title: {title}\n- source: {src}\n- content:\n{txt}\n"
-        if used + len(block) > max_chars:
-            break
-        blocks.append(block)
-        used += len(block)
-        ev.append(
-            {
-                "doc_id": it.doc_id,
-                "category": cat,
-                "title": title,
-                "source": src,
-                "excerpt": txt[:240],
-                "score": it.score,
-            }
+        cached = it.token_counts.get(packer.name)
+        if cached is None:
+            txt = packer.truncate(re.sub(r"\n{3,}", "\n\n", (it.page_content or "").strip()))
+            cached = it.token_counts[packer.name] = (txt, packer.count(txt))
+        txt, body_tokens = cached
+        header = f"[{it.doc_id}]\n- category: {cat}\n- title: {title}\n- source: {src}\n- content:\n"
+        entries.append(
+            PackEntry(
+                text=f"{header}{txt}\n",
+                score=-rank,
+                ref=(it, cat, title, src, txt),
+                tokens=packer.count(header) + body_tokens + 1,
+            )
         )
-    return "\n\n".join(blocks).strip(), ev
+
+    packed = packer.pack(entries)
+    ev = [
+        {
+            "doc_id": it.doc_id,
+            "category": cat,
+            "title": title,
+            "source": src,
+            "excerpt": txt[:240],
+            "score": it.score,
+        }
+        for it, cat, title, src, txt in packed.included
+    ]
+    return packed.text, ev, packed.report()
 
 
 # -------------------------
@@ -525,50 +947,27 @@ def build_context(
 
 
 def quick_router(dialogue: str, customer: CustomerProfile) -> Dict[str, Any]:
-    t = dialogue or ""
+    # 키워드 사전은 app.utils.keywords.LEXICONS ("router.*"), 발화 스캔은 1회
+    hits = annotate(dialogue or "")
     reasons = []
 
     stage = "unknown"
-    if any(
-        k in t
-        for k in ["성함", "본인", "명의", "인증", "주소지", "연락주신 번호", "확인"]
-    ):
+    if hits.has("router.verification"):
         stage = "verification"
         reasons.append("본인확인/정보확인 발화 감지")
-    if any(
-        k in t
-        for k in ["동의", "녹취", "개인정보", "위탁", "보관", "약관", "필수적으로 필요"]
-    ):
+    if hits.has("router.consent"):
         stage = "consent"
         reasons.append("동의/고지/약관 발화 감지")
-    if any(k in t for k in ["감사", "좋은 하루", "행복한 하루", "상담사", "종료"]):
+    if hits.has("router.closing"):
         stage = "closing"
         reasons.append("마무리/종결 발화 감지")
 
-    churn_words = ["해지", "해약", "번호이동", "옮기", "탈퇴"]
-    upsell_words = [
-        "요금제",
-        "변경",
-        "업그레이드",
-        "추가",
-        "부가서비스",
-        "데이터",
-        "무제한",
-        "결합",
-        "가족결합",
-        "재결합",
-        "할인",
-        "혜택",
-    ]
-
-    churn = any(w in t for w in churn_words)
-    upsell = any(w in t for w in upsell_words)
+    churn = hits.has("router.churn")
+    upsell = hits.has("router.upsell")
 
+    # 신호 문자열끼리 붙여도 키워드가 줄바꿈을 넘어 매칭되지 않음
     db_signal = (
-        any(
-            any(k in s for k in ["약정 만료", "초과요금", "할인 미적용", "결합"])
-            for s in customer.signals
-        )
+        annotate("\n".join(customer.signals)).has("router.db_signal")
         if customer.signals
         else False
     )
@@ -585,9 +984,7 @@ def quick_router(dialogue: str, customer: CustomerProfile) -> Dict[str, Any]:
         mtype = "upsell"
         reasons.append("요금제/결합/혜택 키워드 또는 DB 신호 감지")
 
-    complaint = any(
-        w in t for w in ["불만", "끊김", "느려", "장애", "환불", "오류", "안돼", "문제"]
-    )
+    complaint = hits.has("router.complaint")
     if complaint and marketing_needed:
         mtype = "hybrid"
         reasons.append("불만/문제 해결 이후 제안이 필요한 상황으로 추정")
@@ -620,7 +1017,7 @@ def quick_router(dialogue: str, customer: CustomerProfile) -> Dict[str, Any]:
 
 
 class OpenAICompatibleLLM:
-    def __init__(self, timeout: int = 60):
+    def __init__(self, timeout: Optional[float] = None):
         self.base_url = (
             os.environ.get("LLM_BASE_URL") or os.environ.get("OPENAI_BASE_URL") or ""
         ).rstrip("/")
@@ -628,6 +1025,7 @@ class OpenAICompatibleLLM:
             os.environ.get("LLM_API_KEY") or os.environ.get("OPENAI_API_KEY") or ""
         )
         self.model = os.environ.get("LLM_MODEL") or os.environ.get("OPENAI_MODEL") or ""
+        # 시도(attempt)당 타임아웃. 커넥션은 프로세스 공용 풀(llm_http_client)을 씀
         self.timeout = timeout
 
         # Optional: allow fallback when response_format is not supported by the upstream.
@@ -702,115 +1100,197 @@ class OpenAICompatibleLLM:
         payload = dict(base_payload)
         payload["response_format"] = {"type": "json_object"}
 
-        async def _post(cx: httpx.AsyncClient, pl: Dict[str, Any]) -> httpx.Response:
-            return await cx.post(
-                f"{self.base_url}/chat/completions", headers=headers, json=pl
+        async def _post(pl: Dict[str, Any], purpose: str) -> httpx.Response:
+            # 공용 HTTP/2 keep-alive 풀 + 429/5xx 지터 백오프 재시도 (purpose별 시도 지연/재시도 집계)
+            return await llm_http_client.post(
+                f"{self.base_url}/chat/completions",
+                headers=headers,
+                payload=pl,
+                purpose=purpose,
+                timeout=self.timeout,
             )
 
-        async with httpx.AsyncClient(timeout=self.timeout) as cx:
-            r = await _post(cx, payload)
+        r = await _post(payload, "initial")
 
-            # If JSON mode is rejected (often 400), optionally fallback if user allowed it.
-            if r.status_code >= 400:
-                if self.allow_fallback:
-                    r = await _post(cx, base_payload)
-                else:
-                    print("HTTP", r.status_code)
-                    print(r.text)
-                    raise RuntimeError(
-                        "LLM이 JSON 응답 모드(response_format=json_object)를 거절했습니다. "
-                        "LLM_MODEL을 JSON 모드를 지원하는 모델로 설정하세요(예: gpt-4o-mini). "
-                        "또는 LLM_ALLOW_FALLBACK=1로 fallback을 허용할 수 있습니다(비권장)."
-                    )
+        # If JSON mode is rejected (often 400), optionally fallback if user allowed it.
+        if r.status_code >= 400:
+            if self.allow_fallback:
+                r = await _post(base_payload, "fallback")
+            else:
+                print("HTTP", r.status_code)
+                print(r.text)
+                raise RuntimeError(
+                    "LLM이 JSON 응답 모드(response_format=json_object)를 거절했습니다. "
+                    "LLM_MODEL을 JSON 모드를 지원하는 모델로 설정하세요(예: gpt-4o-mini). "
+                    "또는 LLM_ALLOW_FALLBACK=1로 fallback을 허용할 수 있습니다(비권장)."
+                )
+
+        try:
+            r.raise_for_status()
+        except Exception:
+            print("HTTP", r.status_code)
+            print(r.text)
+            raise
+
+        data = r.json()
+        choice = (data.get("choices") or [{}])[0]
+        finish_reason = choice.get("finish_reason")
+        content = (((choice.get("message") or {}).get("content")) or "").strip()
+
+        # If truncated by token limit, retry once with stronger compactness instruction (still JSON Mode).
+        if finish_reason == "length":
+            compact_instr = (
+                "직전 출력이 길이 제한으로 잘렸다. 스키마/키 구조는 절대 바꾸지 말고, "
+                "각 문자열/리스트를 더 짧게 요약해서 JSON 단일 객체로 다시 출력하라. "
+                "next_actions는 최대 2개, micro_branches는 최대 2개로 제한하라."
+            )
+            retry_payload = dict(base_payload)
+            retry_payload["messages"] = [
+                {"role": "system", "content": system_prompt},
+                {
+                    "role": "user",
+                    "content": user_prompt + "\n\n[추가 지시]\n" + compact_instr,
+                },
+            ]
+            retry_payload["temperature"] = 0.0
+            retry_payload["max_tokens"] = int(min(max_tokens * 2, 3200))
+            retry_payload["response_format"] = {"type": "json_object"}
 
+            r2 = await _post(retry_payload, "length_retry")
             try:
-                r.raise_for_status()
+                r2.raise_for_status()
             except Exception:
-                print("HTTP", r.status_code)
-                print(r.text)
+                print("HTTP", r2.status_code)
+                print(r2.text)
                 raise
+            data2 = r2.json()
+            choice2 = (data2.get("choices") or [{}])[0]
+            content = (
+                ((choice2.get("message") or {}).get("content")) or ""
+            ).strip()
 
-            data = r.json()
-            choice = (data.get("choices") or [{}])[0]
-            finish_reason = choice.get("finish_reason")
-            content = (((choice.get("message") or {}).get("content")) or "").strip()
-
-            # If truncated by token limit, retry once with stronger compactness instruction (still JSON Mode).
-            if finish_reason == "length":
-                compact_instr = (
-                    "직전 출력이 길이 제한으로 잘렸다. 스키마/키 구조는 절대 바꾸지 말고, "
-                    "각 문자열/리스트를 더 짧게 요약해서 JSON 단일 객체로 다시 출력하라. "
-                    "next_actions는 최대 2개, micro_branches는 최대 2개로 제한하라."
-                )
-                retry_payload = dict(base_payload)
-                retry_payload["messages"] = [
+        # Parse JSON, else repair once (still JSON Mode if possible)
+        try:
+            return self._extract_json(content)
+        except Exception:
+            repair_prompt = (
+                "직전 출력이 JSON 파싱에 실패했다. 오직 JSON 단일 객체만, 스키마 그대로 재출력하라.\n"
+                "다른 텍스트/마크다운/설명 금지.\n"
+                "문자열 내 따옴표/개행은 JSON 규칙에 맞게 이스케이프하라.\n\n"
+                f"직전 출력(일부):\n{content[:6000]}"
+            )
+
+            payload2 = {
+                "model": self.model,
+                "messages": [
                     {"role": "system", "content": system_prompt},
-                    {
-                        "role": "user",
-                        "content": user_prompt + "\n\n[추가 지시]\n" + compact_instr,
-                    },
-                ]
-                retry_payload["temperature"] = 0.0
-                retry_payload["max_tokens"] = int(min(max_tokens * 2, 3200))
-                retry_payload["response_format"] = {"type": "json_object"}
+                    {"role": "user", "content": repair_prompt},
+                ],
+                "temperature": 0.0,
+                "max_tokens": int(min(max_tokens * 2, 3200)),
+                "response_format": {"type": "json_object"},
+            }
+
+            r3 = await _post(payload2, "json_repair")
+
+            # If JSON mode is rejected here and fallback allowed, try without response_format once.
+            if r3.status_code >= 400 and self.allow_fallback:
+                payload2_nf = dict(payload2)
+                payload2_nf.pop("response_format", None)
+                r3 = await _post(payload2_nf, "json_repair_fallback")
 
-                r2 = await _post(cx, retry_payload)
-                try:
-                    r2.raise_for_status()
-                except Exception:
-                    print("HTTP", r2.status_code)
-                    print(r2.text)
-                    raise
-                data2 = r2.json()
-                choice2 = (data2.get("choices") or [{}])[0]
-                content = (
-                    ((choice2.get("message") or {}).get("content")) or ""
-                ).strip()
-
-            # Parse JSON, else repair once (still JSON Mode if possible)
             try:
-                return self._extract_json(content)
+                r3.raise_for_status()
             except Exception:
-                repair_prompt = (
-                    "직전 출력이 JSON 파싱에 실패했다. 오직 JSON 단일 객체만, 스키마 그대로 재출력하라.\n"
-                    "다른 텍스트/마크다운/설명 금지.\n"
-                    "문자열 내 따옴표/개행은 JSON 규칙에 맞게 이스케이프하라.\n\n"
-                    f"직전 출력(일부):\n{content[:6000]}"
-                )
+                print("HTTP", r3.status_code)
+                print(r3.text)
+                raise
 
-                payload2 = {
-                    "model": self.model,
-                    "messages": [
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": repair_prompt},
-                    ],
-                    "temperature": 0.0,
-                    "max_tokens": int(min(max_tokens * 2, 3200)),
-                    "response_format": {"type": "json_object"},
-                }
-
-                r3 = await _post(cx, payload2)
-
-                # If JSON mode is rejected here and fallback allowed, try without response_format once.
-                if r3.status_code >= 400 and self.allow_fallback:
-                    payload2_nf = dict(payload2)
-                    payload2_nf.pop("response_format", None)
-                    r3 = await _post(cx, payload2_nf)
+            data3 = r3.json()
+            choice3 = (data3.get("choices") or [{}])[0]
+            content3 = (
+                ((choice3.get("message") or {}).get("content")) or ""
+            ).strip()
 
-                try:
-                    r3.raise_for_status()
-                except Exception:
-                    print("HTTP", r3.status_code)
-                    print(r3.text)
-                    raise
+            return self._extract_json(content3)
 
-                data3 = r3.json()
-                choice3 = (data3.get("choices") or [{}])[0]
-                content3 = (
-                    ((choice3.get("message") or {}).get("content")) or ""
-                ).strip()
+    async def chat_json_stream(
+        self,
+        system_prompt: str,
+        user_prompt: str,
+        temperature: float = 0.2,
+        max_tokens: int = 1400,
+        watch: Iterable[Tuple[str, ...]] = (),
+        on_field: Optional[Callable[[Tuple[str, ...], Any], Awaitable[None]]] = None,
+    ) -> Dict[str, Any]:
+        """
+        [NEW] chat_json의 스트리밍 버전 (SSE, stream=True).
+        응답 토큰을 IncrementalJSONParser로 증분 파싱하고 watch 경로의 값이 완성되는 즉시 on_field(path, value) 호출.
+        - JSON 앞의 코드펜스/잡음은 첫 "{" 까지 건너뜀
+        - 스트리밍이 실패했거나(HTTP 오류/중간 끊김), 길이 초과로 잘렸거나 객체가 끝나지 않았으면
+          chat_json(length 재시도/JSON 복구 포함)으로 다시 받음 (이미 보낸 필드는 호출부가 최종 결과로 덮어씀)
+        """
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt},
+            ],
+            "temperature": float(temperature),
+            "max_tokens": int(max_tokens),
+            "response_format": {"type": "json_object"},
+            "stream": True,
+        }
+        watch = {tuple(p) for p in watch}
+        parser = IncrementalJSONParser()
+        started = False
+        finish_reason = None
+
+        stream = llm_http_client.stream(
+            f"{self.base_url}/chat/completions",
+            headers=headers,
+            payload=payload,
+            purpose="stream",
+            timeout=self.timeout,
+        )
+        # (객체가 닫히면 남은 스트림을 기다리지 않고 바로 응답을 닫음)
+        # 스트리밍 자체가 실패하면(4xx/스트림 미지원, 중간 끊김, 파싱 오류) chat_json으로 다시 받음.
+        # 취소(CancelledError)는 Exception이 아니므로 그대로 전파
+        try:
+            async with contextlib.aclosing(stream):
+                async for data in stream:
+                    try:
+                        choice = (json.loads(data).get("choices") or [{}])[0]
+                    except ValueError:
+                        continue
+                    finish_reason = choice.get("finish_reason") or finish_reason
+                    piece = (choice.get("delta") or {}).get("content") or ""
+                    if not started:
+                        brace = piece.find("{")
+                        if brace == -1:
+                            continue
+                        piece, started = piece[brace:], True
+                    for event in parser.feed(piece):
+                        if event.kind != "complete" or event.path not in watch or on_field is None:
+                            continue
+                        try:
+                            await on_field(event.path, event.value)
+                        except Exception as e:
+                            print(f"[LLM] on_field callback failed (ignored): {e}")
+                    if parser.done:
+                        break
+        except Exception as e:
+            print(f"[LLM] Streaming failed ({type(e).__name__}: {e}), falling back to chat_json")
+            return await self.chat_json(system_prompt, user_prompt, temperature=temperature, max_tokens=max_tokens)
 
-                return self._extract_json(content3)
+        if finish_reason == "length" or not parser.done or not isinstance(parser.value, dict):
+            print(f"[LLM] Streamed JSON incomplete (finish_reason={finish_reason}), falling back to chat_json")
+            return await self.chat_json(system_prompt, user_prompt, temperature=temperature, max_tokens=max_tokens)
+        return parser.value
 
 
 class MockLLM:
@@ -878,10 +1358,44 @@ class Turn:
     turn_id: int
     speaker: str
     transcript: str
+    # [NEW] 턴 생성 시 한 번만 계산 (마스킹된 발화 / dialogue_text 한 줄, 빈 발화면 "")
+    masked: Optional[str] = None
+    line: str = ""
+
+    def __post_init__(self):
+        if self.masked is None:
+            self.masked = mask_pii(self.transcript or "")
+        role = "고객" if self.speaker == "customer" else "상담원"
+        self.line = f"{role}: {self.masked}" if self.masked.strip() else ""
+
+
+# build_query()에 들어가는 도메인 키워드
+QUERY_KEYWORDS = LEXICONS["query"]
+
+# [NEW] Speculative retrieval (partial STT) 설정
+PREFETCH_TTL_SEC = settings.MARKETING_PREFETCH_TTL
+PREFETCH_CATEGORIES = ["marketing", "guideline", "terms"]
+PREFETCH_PER_CATEGORY_K = 6
+PREFETCH_FALLBACK_K = 8
+PREFETCH_STATS: Dict[str, int] = {
+    "started": 0,
+    "superseded": 0,
+    "hit": 0,
+    "hit_in_flight": 0,
+    "miss_fingerprint": 0,
+    "miss_expired": 0,
+    "failed": 0,
+    # [NEW] 확정 발화 기준 speculative 검색 (분석 LLM과 동시 실행)
+    "speculative_started": 0,
+    "speculative_reused": 0,  # 같은 지문의 partial prefetch가 이미 있어 새로 시작하지 않음
+    "speculative_used": 0,
+    "speculative_wasted": 0,  # 마케팅 불필요/미사용으로 버린 검색
+    "speculative_wasted_ms": 0,  # 버린 검색이 이미 쓴 시간 (진행 중이면 취소 시점까지)
+}
 
 
 from .router import Gatekeeper
-from .cache import SemanticCache
+from .cache import semantic_route_cache
 
 
 class MarketingSession:
@@ -894,7 +1408,7 @@ class MarketingSession:
 
         # [NEW] Gatekeeper & Cache
         self.gatekeeper = Gatekeeper()
-        self.cache = SemanticCache()
+        self.cache = semantic_route_cache  # 프로세스 공용 (Gatekeeper.semantic_route 결정 캐시)
 
         # [NEW] Prefetch Cache
         # Stores Qdrant results for triggers found in fragments
@@ -904,6 +1418,8 @@ class MarketingSession:
         self.current_proposal: Optional[List[Dict[str, Any]]] = None
 
         self.turns: List[Turn] = []
+        # [NEW] dialogue_text 창 캐시: last_n -> (턴 수, 마지막 턴, 렌더링 결과)
+        self._dialogue_cache: Dict[int, Tuple[int, Optional[Turn], str]] = {}
         self.state_prev = {
             "call_stage": "unknown",
             "marketing_needed": False,
@@ -926,50 +1442,202 @@ class MarketingSession:
             Turn(turn_id=turn_id, speaker=sp, transcript=transcript or "")
         )
 
-    async def prefetch(self, trigger_chunk: str) -> None:
+    def _turns_with(self, pending_customer: Optional[str]) -> List[Turn]:
+        if pending_customer is None:
+            return self.turns
+        return self.turns + [
+            Turn(turn_id=-1, speaker="customer", transcript=pending_customer)
+        ]
+
+    def query_fingerprint(self, pending_customer: Optional[str] = None) -> Tuple:
+        """
+        검색 쿼리의 지문: (직전까지 확정된 턴 위치, 실제 검색 쿼리 문자열)
+        - 쿼리에는 마스킹된 대화 전체가 들어가므로, partial 발화의 prefetch는 최종 쿼리와 글자까지 같을 때만 재사용
+        - pending_customer=None이면 마지막 턴이 방금 확정된 고객 발화라고 가정
+        """
+        turns = self._turns_with(pending_customer)
+        history = turns[:-1]
+        anchor = history[-1].turn_id if history else None
+        return (len(history), anchor, self.build_query(pending_customer=pending_customer))
+
+    def start_prefetch(self, partial_text: Optional[str], kind: str = "partial") -> bool:
         """
         [Speculative Execution]
-        Runs Qdrant search in background when a trigger is detected in a fragment.
+        고객이 아직 말하는 중(partial STT)에 트리거가 잡히면 Qdrant 카테고리 검색을 백그라운드로 시작.
+        같은 지문의 prefetch가 이미 진행 중이거나 유효하면 다시 시작하지 않습니다.
+        partial_text=None이면 방금 확정된 마지막 턴 기준 (kind="speculative")
         """
-        print(f"[Session] Prefetching for trigger: '{trigger_chunk}'")
-        # Build a temporary query around the trigger
-        # In reality, we might want more context, but trigger itself is a strong signal
-        query = f"Prefetch: {trigger_chunk}"
-        # Execute search (simplified parameters for speed)
-        cats = ["marketing", "terms"]
-        q_items = self.qdrant.staged_category_search(
-            query=trigger_chunk, final_k=5, categories=cats
+        fingerprint = self.query_fingerprint(pending_customer=partial_text)
+        current = self._prefetch_cache
+        if (
+            current
+            and current["fingerprint"] == fingerprint
+            and time.time() - current["timestamp"] < PREFETCH_TTL_SEC
+        ):
+            return False
+
+        if current and not current["task"].done():
+            current["task"].cancel()
+            PREFETCH_STATS["superseded"] += 1
+
+        query = fingerprint[-1]
+        if partial_text is not None:
+            print(f"[Session] Prefetching for partial: '{partial_text[-40:]}'")
+        task = asyncio.create_task(
+            self.qdrant.acategory_search(
+                query,
+                per_category_k=PREFETCH_PER_CATEGORY_K,
+                categories=PREFETCH_CATEGORIES,
+                fallback_k=PREFETCH_FALLBACK_K,
+            )
         )
-
-        # Store result
+        started = time.perf_counter()
+        task.add_done_callback(lambda t, entry_started=started: self._mark_done(t, entry_started))
         self._prefetch_cache = {
-            "query": trigger_chunk,
-            "items": q_items,
+            "fingerprint": fingerprint,
+            "query": query,
+            "task": task,
             "timestamp": time.time(),
+            "started": started,
+            "kind": kind,
         }
+        PREFETCH_STATS["started" if kind == "partial" else "speculative_started"] += 1
+        return True
 
-    def dialogue_text(self, last_n: int = 14) -> str:
-        part = (
-            self.turns[-last_n:] if last_n and len(self.turns) > last_n else self.turns
-        )
-        lines = []
+    def _mark_done(self, task: asyncio.Task, started: float) -> None:
+        entry = self._prefetch_cache
+        if entry is not None and entry["task"] is task:
+            entry["elapsed"] = time.perf_counter() - started
+
+    def start_speculative_retrieval(self) -> Optional[Tuple]:
+        """
+        [Speculative Execution] 확정된 고객 발화로 기본 가중치 카테고리 검색을 분석(LLM)과 동시에 시작.
+        retrieve_node가 take_prefetched로 가져가 marketing_type 가중치/가격 조건을 그때 적용하고,
+        마케팅이 필요 없으면 discard_speculative()로 버림. Returns: 이번 턴의 쿼리 지문
+        """
+        fingerprint = self.query_fingerprint()
+        if not self.start_prefetch(None, kind="speculative"):
+            PREFETCH_STATS["speculative_reused"] += 1
+        return fingerprint
+
+    def discard_speculative(self, fingerprint: Optional[Tuple]) -> bool:
+        """
+        이번 턴(fingerprint)의 검색이 쓰이지 않고 남아 있으면 취소/폐기하고 낭비로 집계.
+        (그 사이 다음 발화의 partial prefetch로 바뀌었으면 건드리지 않음)
+        """
+        entry = self._prefetch_cache
+        if entry is None or fingerprint is None or entry["fingerprint"] != fingerprint:
+            return False
+        self._prefetch_cache = None
+        if entry["kind"] == "speculative":
+            elapsed = entry.get("elapsed")
+            if elapsed is None:
+                elapsed = time.perf_counter() - entry["started"]
+            PREFETCH_STATS["speculative_wasted"] += 1
+            PREFETCH_STATS["speculative_wasted_ms"] += int(elapsed * 1000)
+        entry["task"].cancel()
+        return True
+
+    async def prefetch(self, trigger_chunk: str) -> None:
+        """
+        start_prefetch + 완료 대기 (기존 호출부 호환)
+        """
+        self.start_prefetch(trigger_chunk)
+        if self._prefetch_cache:
+            await asyncio.wait({self._prefetch_cache["task"]})
+
+    async def take_prefetched(
+        self, categories: List[str]
+    ) -> Optional[Dict[str, List[RetrievedItem]]]:
+        """
+        최종 턴의 쿼리 지문이 prefetch 때와 같으면 (진행 중이면 완료를 기다려) 카테고리별 결과를 반환.
+        한 번 쓰면 비웁니다. 지문이 다르거나 만료/실패하면 None -> 호출부에서 새로 검색.
+        """
+        entry = self._prefetch_cache
+        if entry is None:
+            return None
+        self._prefetch_cache = None
+
+        if set(categories) != set(PREFETCH_CATEGORIES):
+            PREFETCH_STATS["miss_fingerprint"] += 1
+            entry["task"].cancel()
+            return None
+        if time.time() - entry["timestamp"] > PREFETCH_TTL_SEC:
+            PREFETCH_STATS["miss_expired"] += 1
+            entry["task"].cancel()
+            return None
+        if entry["fingerprint"] != self.query_fingerprint():
+            PREFETCH_STATS["miss_fingerprint"] += 1
+            entry["task"].cancel()
+            return None
+
+        in_flight = not entry["task"].done()
+        try:
+            per_category = await entry["task"]
+        except asyncio.CancelledError:
+            if asyncio.current_task().cancelling():
+                raise
+            return None
+        except Exception as e:
+            print(f"[Session] Prefetch failed, falling back: {e}")
+            PREFETCH_STATS["failed"] += 1
+            return None
+
+        if entry["kind"] == "speculative":
+            PREFETCH_STATS["speculative_used"] += 1
+        else:
+            PREFETCH_STATS["hit_in_flight" if in_flight else "hit"] += 1
+        return per_category
+
+    def dialogue_text(self, last_n: int = 14, turns: Optional[List[Turn]] = None) -> str:
+        """
+        최근 last_n 턴의 "고객: ... / 상담원: ..." 대화 (PII 마스킹됨)
+        - 턴별 마스킹/한 줄 렌더링은 Turn 생성 시 1회 (Turn.line)
+        - self.turns 창은 last_n별로 캐시: 턴이 추가되지 않았으면 그대로, 추가됐으면 창만 다시 이어 붙임
+          (통화가 길어져도 턴당 비용은 last_n 줄 join으로 일정)
+        """
+        if turns is None or turns is self.turns:
+            turns = self.turns
+            last = turns[-1] if turns else None
+            cached = self._dialogue_cache.get(last_n)
+            if cached and cached[0] == len(turns) and cached[1] is last:
+                return cached[2]
+            text = self._render_dialogue(turns, last_n)
+            self._dialogue_cache[last_n] = (len(turns), last, text)
+            return text
+        return self._render_dialogue(turns, last_n)
+
+    @staticmethod
+    def _render_dialogue(turns: List[Turn], last_n: int) -> str:
+        part = turns[-last_n:] if last_n and len(turns) > last_n else turns
+        return "\n".join(t.line for t in part if t.line).strip()
+
+    @staticmethod
+    def _query_keywords(turns: List[Turn], last_n: int = 14) -> List[str]:
+        """
+        dialogue_text(turns=turns)에 들어 있는 도메인 키워드 (QUERY_KEYWORDS 순서)
+        턴별 annotation(마스킹된 발화 기준 LRU)의 합집합 - 키워드는 줄을 넘지 않으므로 대화 전체를 훑은 결과와 같음
+        """
+        part = turns[-last_n:] if last_n and len(turns) > last_n else turns
+        found = set()
         for t in part:
-            role = "고객" if t.speaker == "customer" else "상담원"
-            txt = mask_pii(t.transcript or "")
-            if txt.strip():
-                lines.append(f"{role}: {txt}")
-        return "\n".join(lines).strip()
+            found |= annotate(t.masked).found
+        return [k for k in QUERY_KEYWORDS if k in found]
 
-    def build_query(self) -> str:
-        dialog = self.dialogue_text()
+    def build_query(self, pending_customer: Optional[str] = None) -> str:
+        """
+        pending_customer: 아직 확정되지 않은 고객 발화(partial)를 마지막 턴으로 가정하고 쿼리 생성
+        """
+        turns = self._turns_with(pending_customer)
+        dialog = self.dialogue_text(turns=turns)
 
         # [Context Optimization] Extract Product Names from recent dialogue
         # Specifically, check the LAST turn (Agent or Customer) for mentions of ANY known product.
         recent_mentions = []
         last_turn_text = ""
-        if self.turns:
+        if turns:
             # Check last 2 turns (User + Agent)
-            for t in self.turns[-2:]:
+            for t in turns[-2:]:
                 if t.transcript:
                     # [FIX] transcript가 dict일 수 있으므로 문자열 변환
                     last_turn_text += " " + safe_str(t.transcript)
@@ -980,25 +1648,7 @@ class MarketingSession:
         #          if name in last_turn_text:
         #              recent_mentions.append(name)
 
-        kws = []
-        for k in [
-            "해지",
-            "위약금",
-            "약정",
-            "결합",
-            "가족결합",
-            "재결합",
-            "요금제",
-            "변경",
-            "할인",
-            "혜택",
-            "동의",
-            "개인정보",
-            "인터넷",
-            "IPTV",
-        ]:
-            if k in dialog:
-                kws.append(k)
+        kws = self._query_keywords(turns)
 
         # Prioritize recent product mentions in the query
         parts = recent_mentions + kws[:10]
@@ -1117,6 +1767,14 @@ def build_qdrant_client_from_env() -> QdrantClient:
     return QdrantClient(url=url, api_key=key, https=True, verify=False)
 
 
+def build_async_qdrant_client_from_env() -> AsyncQdrantClient:
+    url = os.environ.get("QDRANT_URL")
+    key = os.environ.get("QDRANT_API_KEY")
+    if not url or not key:
+        raise RuntimeError("QDRANT_URL/QDRANT_API_KEY env not set")
+    return AsyncQdrantClient(url=url, api_key=key, https=True, verify=False)
+
+
 def get_shared_qdrant_engine() -> "QdrantSearchEngine":
     global _shared_qdrant_engine
     if _shared_qdrant_engine is not None:
@@ -1135,6 +1793,11 @@ def get_shared_qdrant_engine() -> "QdrantSearchEngine":
         vector_name="dense",
         sparse_vector_name="sparse",
         category_key="metadata.category",
+        async_client=build_async_qdrant_client_from_env(),
+        local_index=get_local_index(client, "cs_guideline"),
+        category_catalog=get_category_catalog(
+            client, "cs_guideline", category_key="metadata.category"
+        ),
     )
     return _shared_qdrant_engine
 
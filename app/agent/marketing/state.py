@@ -18,11 +18,13 @@ class MarketingState(TypedDict):
     conversation_stage: Literal["listening", "proposing", "negotiating", "closing"] # [NEW] Core State
     marketing_needed: bool
     marketing_type: Literal["none", "support_only", "upsell", "retention", "retention_price", "cost_optimization", "hybrid", "explanation", "alternative"]
+    precomputed_analysis: Optional[Dict[str, Any]] # [NEW] MARKETING_PIPELINE=combined: 라우팅 단계에서 받은 분석 결과
     
     # Retrieval
     search_query: Optional[str]
     retrieved_items: List[Dict[str, Any]] # Raw items from Qdrant
     context_text: Optional[str] # Formatted string for LLM
+    context_tokens: Optional[Dict[str, int]] # [NEW] packed/dropped tokens of context_text
     
     # Products
     product_candidates: List[Dict[str, Any]] # Candidates found in THIS turn
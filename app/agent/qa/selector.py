@@ -3,17 +3,14 @@ from __future__ import annotations
 import re
 from typing import Optional
 
+from app.utils.keywords import LEXICONS
+
 from .utils import unique_keep_order
 
 
-KEYWORD_PATTERNS = [
-    r"안녕하세요", r"상담사", r"무엇을\s*도와", r"본인\s*확인",  # 오프닝/확인
-    r"요금", r"청구", r"과금", r"결제", r"소액결제", r"휴대폰\s*결제",
-    r"데이터", r"초과", r"추가\s*요금", r"부가\s*서비스", r"콘텐츠",
-    r"해지", r"환불", r"정지", r"납부", r"미납", r"연체",
-    r"명의", r"가족", r"결합", r"약정",
-    r"요약", r"정리", r"확인해\s*보", r"확인\s*드리", r"마무리", r"도와드릴",
-]
+# 사전은 공용 키워드 엔진(app.utils.keywords, "qa.pick")과 같은 것을 씀.
+# 통화 종료 후 일괄 평가라 공유할 턴 annotation이 없고 여부만 보면 되므로 컴파일된 정규식 search가 더 빠름
+KEYWORD_PATTERNS = LEXICONS["qa.pick"]
 KEYWORD_RE = re.compile("|".join(KEYWORD_PATTERNS))
 
 
@@ -1,16 +1,21 @@
+from app.utils.keywords import annotate
+
+
 def update_understanding_level(state, agent_input):
     lvl = state["understanding_level"]
+    # 단계별 키워드는 공용 키워드 엔진 사전 "rp.level1~4" (발화 1회 스캔)
+    hits = annotate(agent_input)
 
-    if any(k in agent_input for k in ["데이터", "초과", "추가 요금", "추가요금"]):
+    if hits.has("rp.level1"):
         lvl = max(lvl, 1)
 
-    if any(k in agent_input for k in ["GB", "기가", "기준", "까지", "한도"]):
+    if hits.has("rp.level2"):
         lvl = max(lvl, 2)
 
-    if any(k in agent_input for k in ["사용하셨", "초과하셨", "사용량", "이용량", "10GB", "20GB", "5GB"]):
+    if hits.has("rp.level3"):
         lvl = max(lvl, 3)
 
-    if any(k in agent_input for k in ["계산", "청구", "산정", "만원", "원", "요금이 붙"]):
+    if hits.has("rp.level4"):
         lvl = max(lvl, 4)
 
     state["understanding_level"] = lvl
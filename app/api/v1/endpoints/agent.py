@@ -1,21 +1,31 @@
 
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Request
-from typing import List, Optional
-import json
+from typing import Dict, List, Optional
 import uuid
 import asyncio
 import logging
 
 logger = logging.getLogger(__name__)
 
+from app.core.config import settings
 from app.services.guidance_service import handle_guidance_message
-from app.services.marketing_service import handle_marketing_message
+from app.services.marketing_service import handle_marketing_message, handle_partial_transcript, pipeline_stats
+from app.agent.marketing.session import PREFETCH_STATS, retrieval_stats
+from app.agent.marketing.cache import semantic_route_cache
+from app.services.llm_http import llm_http_client
 from app.services.agent_manager import agent_manager
 from app.services.connection_manager import connection_manager
 from app.services.notification_manager import notification_manager
 from app.services.spring_connector import spring_connector
 from app.services.analysis_service import analysis_service
+from app.services.turn_scheduler import turn_schedulers
+from app.services.call_session_registry import call_session_registry
+from app.services.embedding_cache import embedding_cache
+from app.services.local_index import local_indexes
+from app.services.category_catalog import category_catalogs
+from app.services.context_packer import context_packers
 from app.utils.phone_number_generator import get_random_phone_number
+from app.utils import ws_codec
 
 # 에이전트 등록 (서버 시작 시 또는 모듈 로드 시)
 agent_manager.register_agent(handle_guidance_message)
@@ -24,6 +34,37 @@ agent_manager.register_agent(handle_marketing_message) # Marketing Agent 등록
 
 router = APIRouter()
 
+@router.get("/stats")
+async def agent_stats():
+    """
+    실시간 에이전트 처리 현황 (턴 스케줄러 큐/폐기 통계 등)
+    """
+    return {
+        "turn_scheduler": turn_schedulers.stats(),
+        "admission": agent_manager.stats(),
+        "monitors": connection_manager.stats(),
+        "notifications": notification_manager.stats(),
+        "sessions": call_session_registry.memory_report(per_session=False),
+        "broker": connection_manager.broker.describe(),
+        "prefetch": dict(PREFETCH_STATS),
+        "retrieval": retrieval_stats(),
+        "embedding_cache": embedding_cache.describe(),
+        "local_index": {name: index.describe() for name, index in local_indexes.items()},
+        "categories": {name: catalog.describe() for name, catalog in category_catalogs.items()},
+        "context_packing": {name: packer.describe() for name, packer in context_packers.items()},
+        "customer_lookup": spring_connector.cache_stats(),
+        "semantic_route_cache": semantic_route_cache.describe(),
+        "llm_http": llm_http_client.describe(),
+        "marketing_pipeline": pipeline_stats(),
+    }
+
+@router.get("/sessions")
+async def session_report():
+    """
+    call 세션별 상태 메모리 사용량 (서브시스템별 대략치)
+    """
+    return call_session_registry.memory_report()
+
 @router.post("/broadcast")
 async def broadcast_event(request: Request):
     """
@@ -32,7 +73,19 @@ async def broadcast_event(request: Request):
     """
     data = await request.json()
     # print(f"Broadcast request received: {data.get('type')}")
-    await notification_manager.broadcast(data)
+    # [NEW] tenant/상담원/콜 정보가 있으면 관심 있는 소켓에만 라우팅 (없으면 기존처럼 전체 전송)
+    call_id = data.get("callId") or data.get("call_id")
+    tenant_name = data.get("tenantName")
+    member_id = data.get("memberId")
+    if call_id and (tenant_name or member_id):
+        notification_manager.bind_call(call_id, tenant_name=tenant_name, member_id=member_id)
+    # [NEW] Ring 이벤트에 발신 번호가 있으면 통화 연결 전에 고객 정보 캐시를 미리 채움
+    phone_number = data.get("phoneNumber") or data.get("customerNumber") or data.get("callerNumber")
+    if phone_number:
+        spring_connector.warm_customer_info(phone_number, call_id=call_id)
+    await notification_manager.broadcast(
+        data, call_id=call_id, tenant_name=tenant_name, member_id=member_id
+    )
     return {"status": "ok"}
 
 # [NEW] 공통 분석 로직 추출
@@ -40,8 +93,9 @@ async def process_call_analysis(call_id: str):
     """
     전화 종료 시(또는 강제 종료 트리거 시) 분석을 수행하고 Spring으로 전송하는 함수
     """
-    history = connection_manager.get_history(call_id)
-    customer_info = connection_manager.get_customer_info(call_id)
+    # [NEW] 소스가 다른 워커에 있어도 브로커의 공유 이력으로 분석
+    history = await connection_manager.fetch_history(call_id)
+    customer_info = await connection_manager.fetch_customer_info(call_id)
     customer_number = customer_info.get("phoneNumber") if customer_info else None
     
     # [FIX] customer_info 내부에 phoneNumber가 없으면, 랜덤 생성했던 번호를 못 찾을 수도 있음.
@@ -49,7 +103,7 @@ async def process_call_analysis(call_id: str):
     # 만약 customer_info 전체 딕셔너리를 저장했다면 phoneNumber 키가 없을 수도 있음. (Spring 응답 구조 확인 필요)
     # 일단 'customer_number' 별도 저장소 없이 customer_info에 의존.
     
-    member_info = connection_manager.get_member_id(call_id)
+    member_info = await connection_manager.fetch_member_id(call_id)
     member_id = member_info.get("member_id") if member_info else None
     tenant_name = member_info.get("tenant_name") if member_info else None
 
@@ -62,7 +116,7 @@ async def process_call_analysis(call_id: str):
     try:
         # [NEW] 시간 관련 데이터 계산
         from datetime import datetime
-        start_time = connection_manager.get_start_time(call_id)
+        start_time = await connection_manager.fetch_start_time(call_id)
         end_time = datetime.now()
         duration = 0
         billsec = 0
@@ -109,40 +163,102 @@ async def process_call_analysis(call_id: str):
         logger.error(f"Error during call end processing for {call_id}: {e}")
 
 
+# call_id -> 진행 중/완료된 finalize 태스크 (같은 통화를 두 번 분석/정리하지 않도록)
+_finalize_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _bind_source(call_id: str) -> None:
+    # 소스 소켓 수/presence(call:{id}:source)는 connection_manager가 관리 -> 다른 워커의 모니터도 종료를 미룸
+    connection_manager.bind_source(call_id)
+    # 정리가 끝난 통화에 소스가 다시 붙으면(재연결) 이번 연결이 닫힐 때 다시 finalize
+    task = _finalize_tasks.get(call_id)
+    if task is not None and task.done():
+        _finalize_tasks.pop(call_id, None)
+        broker = connection_manager.broker
+        broker.write_behind(broker.delete(f"call:{call_id}:analysis"))
+
+
+def _unbind_source(call_id: str) -> None:
+    connection_manager.unbind_source(call_id)
+
+
+async def finalize_call(call_id: str, analyze: bool = True):
+    """
+    [NEW] 통화 종료 처리: 남은 턴 처리 -> 분석/Spring 전송 -> call 단위 상태 전체 정리
+    (분석이 call_history를 읽으므로 정리는 반드시 분석 이후)
+    """
+    await turn_schedulers.close(call_id, drain=True)
+    # 워커가 여러 개면 모니터 워커와 소스 워커가 모두 여기까지 올 수 있음 -> 분석/Spring 전송은 선점한 한 곳만
+    if analyze and await connection_manager.broker.claim(
+        f"call:{call_id}:analysis", int(settings.BROKER_KEY_TTL or call_session_registry.idle_ttl)
+    ):
+        await process_call_analysis(call_id)
+    await call_session_registry.finalize(call_id)
+
+
+def schedule_finalize(call_id: str, analyze: bool = True) -> asyncio.Task:
+    """
+    finalize_call을 통화당 한 번만 백그라운드로 실행 (이미 시작됐으면 그 태스크를 반환).
+    완료 기록은 세션 idle TTL 동안 유지 -> 늦게 도착한 종료 신호가 빈/부분 이력으로 다시 분석하지 않음
+    """
+    task = _finalize_tasks.get(call_id)
+    if task is not None:
+        logger.info(f"Finalize already scheduled for {call_id}; ignoring duplicate end signal")
+        return task
+    task = asyncio.create_task(finalize_call(call_id, analyze=analyze))
+    _finalize_tasks[call_id] = task
+
+    def _forget(_):
+        asyncio.get_running_loop().call_later(
+            call_session_registry.idle_ttl, lambda: _finalize_tasks.pop(call_id, None)
+        )
+
+    task.add_done_callback(_forget)
+    return task
+
+
 @router.websocket("/monitor/{call_id}")
 async def monitor_endpoint(websocket: WebSocket, call_id: str):
     await connection_manager.connect(websocket, call_id)
+    call_session_registry.touch(call_id)
     
     # [NEW] 통화 시작 시간 기록 (Monitor 연결 기준)
     # 이미 기록된 시간이 없을 때만 기록 (재연결 시 초기화 방지)
-    if not connection_manager.get_start_time(call_id):
+    if not await connection_manager.fetch_start_time(call_id):
         connection_manager.set_start_time(call_id)
         logger.info(f"Call start time recorded for {call_id} (Monitor Connected)")
     
     # [NEW] Frontend에서 메시지를 받을 수 있도록 Loop 추가
+    fmt = ws_codec.negotiate_format(websocket)
     try:
         while True:
-            text = await websocket.receive_text()
-            print(f"Monitor received: {text}")
             try:
-                data = json.loads(text)
+                data = await ws_codec.receive_frame(websocket, fmt)
+            except ValueError:
+                continue
+            print(f"Monitor received: {data}")
+            call_session_registry.touch(call_id)
+            if isinstance(data, dict):
                 if data.get("type") == "CALL_ENDED":
                     logger.info(f"[Frontend Trigger] Explicit Call End for {call_id}")
                     await notification_manager.broadcast({
                         "type": "CALL_ENDED",
                         "callId": call_id
-                    })
-                    # 비동기로 분석 수행
-                    asyncio.create_task(process_call_analysis(call_id))
+                    }, call_id=call_id)
+                    # 소스(/check) 소켓이 (어느 워커에서든) 아직 턴을 보내는 중이면 그 소켓이 닫힐 때 정리
+                    # (여기서 분석하면 부분 이력만 Spring으로 가고, 지우면 이후 턴이 빈 상태로 시작함).
+                    # 소스가 없으면 비동기로 분석 후 call 상태 정리
+                    if await connection_manager.source_active(call_id):
+                        logger.info(f"Source socket still connected for {call_id}; finalize deferred to its close")
+                    else:
+                        schedule_finalize(call_id)
 
                 elif data.get("type") == "IDENTIFY":
                     member_id = data.get("memberId")
                     tenant_name = data.get("tenantName")
                     if member_id:
                         connection_manager.set_member_id(call_id, member_id, tenant_name or "default")
-                        
-            except json.JSONDecodeError:
-                pass
+                        notification_manager.bind_call(call_id, tenant_name=tenant_name, member_id=member_id)
                 
     except WebSocketDisconnect:
         connection_manager.disconnect(websocket, call_id)
@@ -151,10 +267,25 @@ async def monitor_endpoint(websocket: WebSocket, call_id: str):
 @router.websocket("/notifications/{user_id}")
 async def notification_endpoint(websocket: WebSocket, user_id: str):
     await notification_manager.connect(websocket, user_id)
+    fmt = ws_codec.negotiate_format(websocket)
     try:
         while True:
             # Keep connection alive (heartbeat)
-            await websocket.receive_text()
+            # [NEW] 구독 범위 지정 메시지 (그 외 heartbeat 등은 무시)
+            try:
+                data = await ws_codec.receive_frame(websocket, fmt)
+            except ValueError:
+                continue
+            if not isinstance(data, dict):
+                continue
+            if data.get("type") == "SUBSCRIBE":
+                notification_manager.subscribe(
+                    websocket, user_id,
+                    tenant_name=data.get("tenantName"),
+                    call_ids=data.get("callIds") or ([data["callId"]] if data.get("callId") else []),
+                )
+            elif data.get("type") == "UNSUBSCRIBE" and data.get("callId"):
+                notification_manager.unsubscribe_call(websocket, user_id, data["callId"])
     except WebSocketDisconnect:
         notification_manager.disconnect(websocket, user_id)
         print(f"Notification client {user_id} disconnected")
@@ -162,7 +293,9 @@ async def notification_endpoint(websocket: WebSocket, user_id: str):
 @router.websocket("/check")
 async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
+    source_format = ws_codec.negotiate_format(websocket)
     current_session_id = str(uuid.uuid4())
+    _bind_source(current_session_id)
     logger.info(f"Agent WebSocket Connected. Session ID: {current_session_id}")
     
     # [MOVED] 통화 시작 시간 기록은 monitor_endpoint로 이동함
@@ -175,6 +308,43 @@ async def websocket_endpoint(websocket: WebSocket):
     customer_number = None 
     conversation_history = []
     turn_counter = 0 # [NEW] 턴 카운터
+    # [NEW] Call ID -> 백그라운드 고객 조회 태스크 (수신 루프는 Spring 응답을 기다리지 않음)
+    customer_lookups = {}
+
+    async def lookup_customer(session_id, number):
+        logger.info(f"Fetching info for customer: {number}")
+        fetched_info = await spring_connector.get_customer_info(number)
+        if not fetched_info:
+            logger.warning("Customer info fetch failed.")
+            return None
+        info = fetched_info.model_dump()
+        info["phoneNumber"] = number
+        connection_manager.set_customer_info(session_id, info)
+        await notification_manager.broadcast({
+            "type": "CALL_UPDATED",
+            "callId": session_id,
+            "customer_info": info
+        }, call_id=session_id)
+        return info
+
+    def start_customer_lookup(session_id, number):
+        task = customer_lookups.get(session_id)
+        if task is None:
+            task = asyncio.create_task(lookup_customer(session_id, number))
+            customer_lookups[session_id] = task
+        return task
+
+    async def resolve_customer_info(session_id, fallback):
+        """
+        첫 턴의 에이전트 실행 직전에 고객 조회 결과를 잠깐(SPRING_LOOKUP_WAIT) 기다림 -> 없으면 기본값
+        """
+        task = customer_lookups.get(session_id)
+        if task is not None and not task.done():
+            try:
+                await asyncio.wait_for(asyncio.shield(task), timeout=settings.SPRING_LOOKUP_WAIT)
+            except asyncio.TimeoutError:
+                logger.info(f"Customer lookup still pending for {session_id}; using default info")
+        return connection_manager.get_customer_info(session_id) or fallback
 
     # [NEW] Background task for processing turns non-blocking
     async def process_turn_background(turn_data, session_id, customer_info_arg, turn_id):
@@ -193,10 +363,19 @@ async def websocket_endpoint(websocket: WebSocket):
             #     pass
             await connection_manager.broadcast(processing_event, call_id=session_id)
 
+            # [NEW] 생성 중인 추천 멘트 조각을 모니터로 스트리밍 (최종 result 이벤트가 뒤따름)
+            async def on_delta(delta_event):
+                await connection_manager.broadcast({
+                    "type": "result_delta",
+                    "turn_id": turn_id,
+                    **delta_event
+                }, call_id=session_id)
+
             async for result in agent_manager.process_turn(
                 turn=turn_data,
                 session_id=session_id,
-                customer_info=customer_info_arg
+                customer_info=customer_info_arg,
+                on_delta=on_delta
             ):
                 response = {
                     "type": "result",
@@ -228,6 +407,29 @@ async def websocket_endpoint(websocket: WebSocket):
         except Exception as e:
              logger.error(f"Error in background processing for turn {turn_id}: {e}")
 
+    # [NEW] 통화별 턴 스케줄러: 순서 보장 + 새 고객 발화가 오면 이전 턴의 에이전트 실행 폐기
+    async def get_scheduler(session_id):
+        async def run(turn_data, customer_info_arg):
+            if customer_info_arg is not None:
+                customer_info_arg = await resolve_customer_info(session_id, customer_info_arg)
+            await process_turn_background(turn_data, session_id, customer_info_arg, turn_data.get("turn_id"))
+
+        async def record(turn_data, customer_info_arg):
+            if customer_info_arg is not None:
+                customer_info_arg = connection_manager.get_customer_info(session_id) or customer_info_arg
+            await agent_manager.record_turn(turn=turn_data, session_id=session_id, customer_info=customer_info_arg)
+
+        async def notify_superseded(job):
+            await connection_manager.broadcast({
+                "type": "superseded",
+                "turn_id": job.turn_id,
+            }, call_id=session_id)
+
+        # (같은 call_id의 이전 스케줄러가 finalize_call에서 drain 중이면 끝날 때까지 기다림 -> 턴 순서 보장)
+        return await turn_schedulers.acquire(
+            session_id, runner=run, recorder=record, on_superseded=notify_superseded
+        )
+
     try:
         while True:
             try:
@@ -236,16 +438,14 @@ async def websocket_endpoint(websocket: WebSocket):
                 raw_text = message.get("text")
                 raw_bytes = message.get("bytes")
 
-                if raw_text is not None:
+                if raw_text is not None or raw_bytes is not None:
+                    # [NEW] orjson 디코딩 (바이너리 프레임은 ?format=msgpack 으로 협상한 소스만 허용)
                     try:
-                        data = json.loads(raw_text)
-                    except json.JSONDecodeError:
-                        logger.warning("Received non-JSON data")
+                        data = ws_codec.decode_frame(raw_text, raw_bytes, source_format)
+                    except ValueError:
+                        logger.warning("Received undecodable frame")
                         await websocket.close(code=1003)
                         break
-                elif raw_bytes is not None:
-                    await websocket.close(code=1003)
-                    break
                 elif message_type == "websocket.disconnect":
                     raise WebSocketDisconnect
                 else:
@@ -258,7 +458,13 @@ async def websocket_endpoint(websocket: WebSocket):
                     
                     if received_call_id != current_session_id:
                         logger.info(f"New session detected ({current_session_id} -> {received_call_id}). Resetting state.")
+                        # 이전 세션의 남은 턴 처리는 더 이상 의미가 없으므로 취소
+                        await turn_schedulers.close(current_session_id)
+                        asyncio.create_task(call_session_registry.finalize(current_session_id, reason="replaced"))
+                        customer_lookups.pop(current_session_id, None)
+                        _unbind_source(current_session_id)
                         current_session_id = received_call_id
+                        _bind_source(current_session_id)
                         turn_counter = 0
                         conversation_history = []
                         is_first_turn = True
@@ -270,33 +476,35 @@ async def websocket_endpoint(websocket: WebSocket):
                         conversation_history = []
                         is_first_turn = True
                         has_broadcast_start = False # 리셋 시 플래그 초기화
+
+                    call_session_registry.touch(current_session_id)
+
+                    # [NEW] 소스(Asterisk)가 tenant 정보를 주면 알림을 해당 tenant 구독자에게만 라우팅
+                    if data.get("tenantName"):
+                        notification_manager.bind_call(current_session_id, tenant_name=data.get("tenantName"))
                         
                     if not has_broadcast_start:
                         await notification_manager.broadcast({
                             "type": "CALL_STARTED",
                             "callId": current_session_id,
                             "customer_info": {"name": "로딩중...", "rate_plan": "확인중..."} 
-                        })
+                        }, call_id=current_session_id)
                         has_broadcast_start = True
 
-                    customer_number = get_random_phone_number()
-                    logger.info(f"[DEMO] Selected Random Customer Number: {customer_number}")
+                    # 소스/Ring 이벤트가 준 발신 번호 우선, 없으면 데모용 랜덤 번호
+                    customer_number = (
+                        data.get("phoneNumber")
+                        or data.get("customerNumber")
+                        or spring_connector.number_for_call(current_session_id)
+                    )
+                    if not customer_number:
+                        customer_number = get_random_phone_number()
+                        logger.info(f"[DEMO] Selected Random Customer Number: {customer_number}")
 
                     if customer_number:
-                         logger.info(f"Fetching info for customer: {customer_number}")
-                         fetched_info = await spring_connector.get_customer_info(customer_number)
-                         if fetched_info:
-                             customer_info = fetched_info.model_dump()
-                             customer_info["phoneNumber"] = customer_number
-                             connection_manager.set_customer_info(current_session_id, customer_info)
-                             
-                             await notification_manager.broadcast({
-                                "type": "CALL_UPDATED", 
-                                "callId": current_session_id,
-                                "customer_info": customer_info
-                            })
-                         else:
-                             logger.warning("Customer info fetch failed.")
+                         # [NEW] 백그라운드 조회: 완료 시 CALL_UPDATED 발행, 수신 루프는 다음 프레임을 바로 처리
+                         customer_lookups.pop(current_session_id, None)
+                         start_customer_lookup(current_session_id, customer_number)
                     
                     response_metadata = {"status": "received", "type": "metadata", "callId": current_session_id}
                     await connection_manager.broadcast({
@@ -305,6 +513,16 @@ async def websocket_endpoint(websocket: WebSocket):
                     }, call_id=current_session_id)
                     continue
                 
+                # [NEW] Interim (partial) STT frame: 턴으로 확정하지 않고 speculative retrieval만 트리거
+                if "transcript" in data and (data.get("is_final") is False or data.get("type") in ("partial", "interim")):
+                    call_session_registry.touch(current_session_id)
+                    if data.get("transcript") and data.get("speaker"):
+                        handle_partial_transcript(
+                            {"speaker": data["speaker"], "transcript": data["transcript"]},
+                            current_session_id,
+                        )
+                    continue
+
                 # 2. Turn (Conversation turn)
                 if "transcript" in data and "speaker" in data:
                     transcript = data["transcript"]
@@ -319,18 +537,14 @@ async def websocket_endpoint(websocket: WebSocket):
                          logger.info(f"First turn received. Executing fallback customer lookup.")
                          if not customer_number:
                              customer_number = get_random_phone_number()
-                             fetched_info = await spring_connector.get_customer_info(customer_number)
-                             if fetched_info:
-                                 customer_info = fetched_info.model_dump()
-                                 customer_info["phoneNumber"] = customer_number
-                                 connection_manager.set_customer_info(current_session_id, customer_info)
+                             start_customer_lookup(current_session_id, customer_number)
 
                          if not has_broadcast_start:
                              await notification_manager.broadcast({
                                 "type": "CALL_STARTED",
                                 "callId": current_session_id,
-                                "customer_info": customer_info
-                            })
+                                "customer_info": connection_manager.get_customer_info(current_session_id) or customer_info
+                            }, call_id=current_session_id)
                              has_broadcast_start = True
 
                     if not transcript or not speaker:
@@ -339,6 +553,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     current_turn_obj = {"speaker": speaker, "transcript": transcript}   
                     conversation_history.append(current_turn_obj)
                     connection_manager.add_transcript(current_session_id, current_turn_obj)
+                    call_session_registry.touch(current_session_id)
                     
                     await connection_manager.broadcast({
                         "type": "transcript_update",
@@ -351,12 +566,7 @@ async def websocket_endpoint(websocket: WebSocket):
                     turn_data = {"speaker": speaker, "transcript": transcript, "turn_id": turn_id}
                     info_to_send = customer_info if is_first_turn else None
                     
-                    asyncio.create_task(process_turn_background(
-                        turn_data, 
-                        current_session_id, 
-                        info_to_send,
-                        turn_id
-                    ))
+                    (await get_scheduler(current_session_id)).submit(turn_data, info_to_send)
                     is_first_turn = False
                 
                 else:
@@ -379,11 +589,17 @@ async def websocket_endpoint(websocket: WebSocket):
         await notification_manager.broadcast({
             "type": "CALL_ENDED",
             "callId": current_session_id
-        })
+        }, call_id=current_session_id)
+        notification_manager.unbind_call(current_session_id)
+        # 끝나지 않은 고객 조회는 결과를 기록하지 않도록 취소 (Spring 응답은 캐시에는 적재됨)
+        for task in customer_lookups.values():
+            task.cancel()
         
+        # 이미 받은 턴은 끝까지 처리하고 분석 후 call 상태를 정리 (수신 루프는 막지 않도록 백그라운드)
         if conversation_history:
              logger.info(f"[Cleanup] Triggering analysis for {current_session_id}")
-             asyncio.create_task(process_call_analysis(current_session_id))
+        _unbind_source(current_session_id)
+        schedule_finalize(current_session_id, analyze=bool(conversation_history))
         
         try:
             await websocket.close()
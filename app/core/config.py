@@ -14,14 +14,98 @@ class Settings(BaseSettings):
     )
     QDRANT_SPARSE_EMBEDDING_MODEL: str = "Qdrant/bm25"
 
+    # Embedding Cache (guidance / marketing / edu 공용, (모델, 정규화 텍스트) -> 벡터 LRU)
+    EMBEDDING_CACHE_SIZE: int = 10000
+    EMBEDDING_CACHE_PATH: str | None = None  # 예: /data/embedding_cache.json (종료 시 저장, 시작 시 로드)
+
+    # Local Mirror Index (cs_guideline 사본을 메모리에 두고 네트워크 없이 검색, 실패/미지원 요청은 원격 Qdrant)
+    LOCAL_INDEX_ENABLED: bool = False
+    LOCAL_INDEX_REFRESH_INTERVAL: float = 600.0
+    LOCAL_INDEX_MAX_POINTS: int = 50000
+
+    # Category Catalog (metadata.category keyword 인덱스 facet 집계로 카테고리/문서 수 조회, 주기적 갱신)
+    CATEGORY_REFRESH_INTERVAL: float = 300.0
+    # 인덱스가 없으면 첫 조회 때 생성 (운영 컬렉션 스키마 변경이라 기본 off, 인덱스 없으면 facet 실패 -> scroll 샘플링)
+    CATEGORY_INDEX_AUTO_CREATE: bool = False
+
     # Spring Backend Configuration
     SPRING_API_KEY: str
     SPRING_API_URL: str = "http://localhost:8080/api/v1/calls/end"
     SPRING_CUSTOMER_API_URL: str = "http://localhost:8080/api/v1/customers/search"
+    SPRING_HTTP_MAX_CONNECTIONS: int = 20
+    SPRING_CUSTOMER_CACHE_TTL: float = 300.0
+    SPRING_CUSTOMER_NEGATIVE_TTL: float = 30.0
+    SPRING_CUSTOMER_CACHE_SIZE: int = 4096
+    SPRING_LOOKUP_WAIT: float = 1.5  # 첫 턴 처리 시 고객 조회 완료를 기다리는 최대 시간
 
     # LLM Configuration
     LLM_BASE_URL: str = "https://api.openai.com/v1"
     LLM_MODEL: str = "gpt-4o-mini"
+    GUIDANCE_LLM_MODEL: str = "gpt-4o-mini"  # openai_service.get_guidance_model (guidance 그래프)
+    # OpenAICompatibleLLM 공용 HTTP 풀 (HTTP/2 keep-alive) / 시도별 타임아웃 / 429·5xx 재시도
+    # 호출 하나(시도 + 백오프 전체)는 LLM_CALL_DEADLINE 안에서 끝남
+    LLM_HTTP2: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 50
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_CONNECT_TIMEOUT: float = 5.0
+    LLM_ATTEMPT_TIMEOUT: float = 30.0
+    LLM_CALL_DEADLINE: float = 45.0
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BACKOFF: float = 0.5  # full jitter: 0 ~ min(MAX, BACKOFF * 2^attempt)
+    LLM_RETRY_BACKOFF_MAX: float = 8.0
+
+    # Context Packing (근거 문서 토큰 예산, tiktoken 기준) - 턴마다 프롬프트 크기를 일정하게
+    CONTEXT_MARKETING_TOKENS: int = 3000
+    CONTEXT_MARKETING_DOC_TOKENS: int = 450
+    CONTEXT_GUIDANCE_TOKENS: int = 1500
+    CONTEXT_GUIDANCE_DOC_TOKENS: int = 500
+
+    # Marketing Pipeline: legacy = semantic_route(LLM) -> analyze_node Deep Analysis(LLM) -> generate
+    #                     combined = 라우팅+분석을 LLM 1회(Gatekeeper.route_and_analyze) -> generate
+    MARKETING_PIPELINE: str = "legacy"
+    # 마케팅 카테고리 검색 fusion 위치 (client | server | batch) / server·batch 의 서버측 fusion (rrf | dbsf)
+    MARKETING_RETRIEVAL_FUSION: str = "client"
+    MARKETING_SERVER_FUSION: str = "rrf"
+    # partial STT/speculative 검색 결과 재사용 유효 시간 (초)
+    MARKETING_PREFETCH_TTL: float = 8.0
+    # 확정 고객 발화로 기본 가중치 카테고리 검색을 라우팅/분석 LLM과 동시에 시작 (retrieve_node가 재가중/재사용,
+    # 마케팅이 필요 없으면 버리고 /agent/stats prefetch.speculative_wasted* 로 집계)
+    MARKETING_SPECULATIVE_RETRIEVAL: bool = True
+
+    # Semantic Route Cache (Gatekeeper.semantic_route 결정을 발화+직전 상담사 멘트 임베딩 유사도로 재사용, 프로세스 공용)
+    SEMANTIC_ROUTE_CACHE_ENABLED: bool = True
+    SEMANTIC_ROUTE_CACHE_SIZE: int = 2000
+    SEMANTIC_ROUTE_CACHE_THRESHOLD: float = 0.92
+    SEMANTIC_ROUTE_CACHE_CONTEXT_THRESHOLD: float = 0.85
+    SEMANTIC_ROUTE_CACHE_TTL: float = 3600.0
+
+    # Guidance Agent: 추천 멘트를 토큰 단위로 모니터에 스트리밍 (result_delta 이벤트)
+    GUIDANCE_STREAMING: bool = True
+    # Marketing Agent: generate_node 응답(JSON)을 스트리밍으로 받아 완성된 필드(recommended_pitch.ment,
+    # marketing_proposal.card_title)부터 result_delta로 전달, 검증된 최종 객체는 final 이벤트로
+    MARKETING_STREAMING: bool = True
+
+    # Agent Admission Control (AgentManager)
+    AGENT_MAX_CONCURRENCY: int = 16
+    AGENT_PER_AGENT_MAX_CONCURRENCY: int = 10
+    AGENT_MAX_QUEUE_DEPTH: int = 64
+    AGENT_ADMISSION_TIMEOUT: float = 8.0
+
+    # WebSocket Outbound Queue (per connection)
+    WS_SEND_QUEUE_SIZE: int = 256
+    WS_MAX_DROPS: int = 512
+    WS_SEND_TIMEOUT: float = 5.0
+
+    # Call Session Lifecycle (idle TTL eviction of per-call state)
+    CALL_SESSION_IDLE_TTL: float = 1800.0
+    CALL_SESSION_SWEEP_INTERVAL: float = 60.0
+
+    # Pub/Sub Broker (inprocess:// = single worker, redis://host:6379/0 = multi worker/pod)
+    BROKER_URL: str = "inprocess://"
+    BROKER_KEY_TTL: int = 7200
+    # /check 소스 소켓 presence 키(call:{id}:source) TTL, TTL/3 마다 갱신 -> 소스 워커가 죽으면 만료
+    CALL_SOURCE_TTL: int = 30
 
     # CORS Configuration
     BACKEND_CORS_ORIGINS: list[str] = [
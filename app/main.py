@@ -69,6 +69,103 @@ async def preload_marketing_resources():
         print(f"[Startup] Marketing preload failed: {e}")
 
 
+@app.on_event("startup")
+async def warm_token_encodings():
+    from app.services.context_packer import warm_context_packers
+
+    encodings = await warm_context_packers()
+    print(f"[Startup] Context packer encodings: {encodings}")
+
+
+@app.on_event("startup")
+async def start_local_mirror_indexes():
+    from app.services.local_index import start_local_indexes
+
+    await start_local_indexes()
+
+
+@app.on_event("startup")
+async def start_category_refresh():
+    from app.services.category_catalog import start_category_catalogs
+
+    await start_category_catalogs()
+
+
+@app.on_event("startup")
+async def start_call_session_sweeper():
+    from app.services.call_session_registry import call_session_registry
+
+    call_session_registry.start()
+
+
+@app.on_event("startup")
+async def start_broker():
+    # 매니저들이 import 시점에 등록한 채널(monitor/notify) 구독 시작
+    from app.services.broker import broker
+
+    await broker.start()
+    print(f"[Startup] Broker ready: {broker.describe()['backend']} (worker {broker.worker_id})")
+
+
+@app.on_event("shutdown")
+async def stop_call_session_sweeper():
+    from app.services.call_session_registry import call_session_registry
+
+    await call_session_registry.stop()
+
+
+@app.on_event("shutdown")
+async def stop_broker():
+    from app.services.broker import broker
+
+    await broker.close()
+
+
+@app.on_event("shutdown")
+async def close_spring_client():
+    from app.services.spring_connector import spring_connector
+
+    await spring_connector.aclose()
+
+
+@app.on_event("shutdown")
+async def close_llm_http_client():
+    from app.services.llm_http import llm_http_client
+
+    await llm_http_client.aclose()
+
+
+@app.on_event("shutdown")
+async def stop_local_mirror_indexes():
+    from app.services.local_index import stop_local_indexes
+
+    await stop_local_indexes()
+
+
+@app.on_event("shutdown")
+async def stop_category_refresh():
+    from app.services.category_catalog import stop_category_catalogs
+
+    await stop_category_catalogs()
+
+
+@app.on_event("shutdown")
+async def save_embedding_cache():
+    from app.services.embedding_cache import embedding_cache
+
+    saved = embedding_cache.save()
+    if saved:
+        print(f"[Shutdown] Embedding cache saved ({saved} entries)")
+
+
+@app.on_event("shutdown")
+async def close_marketing_qdrant():
+    from app.agent.marketing import session as marketing_session
+
+    if marketing_session._shared_qdrant_engine is not None:
+        await marketing_session._shared_qdrant_engine.aclose()
+
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to FastAPI AI Service"}
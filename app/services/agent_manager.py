@@ -1,16 +1,195 @@
 import asyncio
-from typing import List, Callable, Any, Dict
+import logging
+import time
+from collections import deque
+from typing import List, Callable, Any, Dict, Deque, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 우선순위 레인: 고객 발화(LLM 실행)가 상담사 발화보다 먼저 슬롯을 받음
+LANE_CUSTOMER = 0
+LANE_AGENT = 1
+LANE_NAMES = {LANE_CUSTOMER: "customer", LANE_AGENT: "agent"}
+
+
+class _Waiter:
+    __slots__ = ("agent_name", "future", "enqueued_at")
+
+    def __init__(self, agent_name: str, future: asyncio.Future):
+        self.agent_name = agent_name
+        self.future = future
+        self.enqueued_at = time.monotonic()
+
+
+class AdmissionController:
+    """
+    전역 동시 실행 예산 + 에이전트별 상한 + 우선순위 레인 기반 입장 제어.
+    - 슬롯이 없으면 레인별 대기열에서 기다리고, 반납 시 높은 우선순위 레인부터 배정합니다.
+    - 대기열이 가득 찼거나 대기 시간이 admission_timeout을 넘으면 해당 턴의 에이전트 실행을 건너뜁니다(shed).
+      → 과부하 시 모든 요청이 함께 타임아웃되는 대신, 일부만 포기하고 나머지는 정상 속도로 처리
+    """
+
+    def __init__(self, max_concurrency: int, max_queue_depth: int, admission_timeout: float):
+        self.max_concurrency = max_concurrency
+        self.max_queue_depth = max_queue_depth
+        self.admission_timeout = admission_timeout
+
+        self.agent_caps: Dict[str, int] = {}
+        self.in_flight = 0
+        self.in_flight_by_agent: Dict[str, int] = {}
+        self.lanes: Dict[int, Deque[_Waiter]] = {LANE_CUSTOMER: deque(), LANE_AGENT: deque()}
+
+        self.metrics: Dict[int, Dict[str, float]] = {
+            lane: {"admitted": 0, "shed": 0, "waited": 0, "wait_sec_total": 0.0, "wait_sec_max": 0.0}
+            for lane in self.lanes
+        }
+
+    def set_agent_cap(self, agent_name: str, cap: int):
+        self.agent_caps[agent_name] = cap
+
+    def _can_run(self, agent_name: str) -> bool:
+        if self.in_flight >= self.max_concurrency:
+            return False
+        cap = self.agent_caps.get(agent_name)
+        return cap is None or self.in_flight_by_agent.get(agent_name, 0) < cap
+
+    def _grant(self, agent_name: str):
+        self.in_flight += 1
+        self.in_flight_by_agent[agent_name] = self.in_flight_by_agent.get(agent_name, 0) + 1
+
+    async def acquire(self, agent_name: str, lane: int) -> bool:
+        """
+        슬롯을 얻으면 True, 포기(shed)하면 False. True인 경우 반드시 release()를 호출해야 합니다.
+        """
+        m = self.metrics[lane]
+        # release() 시점마다 _dispatch()가 배정 가능한 대기자를 모두 처리하므로,
+        # 지금 슬롯이 비어 있다면 이 에이전트보다 앞서야 할 대기자는 없음
+        if self._can_run(agent_name):
+            self._grant(agent_name)
+            m["admitted"] += 1
+            return True
+
+        queue = self.lanes[lane]
+        if len(queue) >= self.max_queue_depth:
+            m["shed"] += 1
+            return False
+
+        waiter = _Waiter(agent_name, asyncio.get_running_loop().create_future())
+        queue.append(waiter)
+        try:
+            await asyncio.wait({waiter.future}, timeout=self.admission_timeout)
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                self.release(agent_name)
+            else:
+                waiter.future.cancel()
+                self._remove(queue, waiter)
+            raise
+
+        waited = time.monotonic() - waiter.enqueued_at
+        m["waited"] += 1
+        m["wait_sec_total"] += waited
+        m["wait_sec_max"] = max(m["wait_sec_max"], waited)
+
+        if waiter.future.done() and not waiter.future.cancelled():
+            m["admitted"] += 1
+            return True
+
+        waiter.future.cancel()
+        self._remove(queue, waiter)
+        m["shed"] += 1
+        return False
+
+    def release(self, agent_name: str):
+        self.in_flight -= 1
+        self.in_flight_by_agent[agent_name] = self.in_flight_by_agent.get(agent_name, 1) - 1
+        self._dispatch()
+
+    def _dispatch(self):
+        for lane in sorted(self.lanes):
+            queue = self.lanes[lane]
+            for waiter in list(queue):
+                if self.in_flight >= self.max_concurrency:
+                    return
+                if waiter.future.done():
+                    self._remove(queue, waiter)
+                    continue
+                if self._can_run(waiter.agent_name):
+                    self._remove(queue, waiter)
+                    self._grant(waiter.agent_name)
+                    waiter.future.set_result(True)
+
+    @staticmethod
+    def _remove(queue: Deque[_Waiter], waiter: _Waiter):
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            pass
+
+    def stats(self) -> Dict[str, Any]:
+        lanes = {}
+        for lane, m in self.metrics.items():
+            lanes[LANE_NAMES[lane]] = {
+                **m,
+                "queue_depth": len(self.lanes[lane]),
+                "wait_sec_avg": (m["wait_sec_total"] / m["waited"]) if m["waited"] else 0.0,
+            }
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "in_flight_by_agent": dict(self.in_flight_by_agent),
+            "agent_caps": dict(self.agent_caps),
+            "lanes": lanes,
+        }
+
 
 class AgentManager:
     def __init__(self):
         self.agents: List[Callable] = []
+        # [NEW] 전역 입장 제어 (OpenAI/Qdrant 폭주 방지)
+        self.admission = AdmissionController(
+            max_concurrency=settings.AGENT_MAX_CONCURRENCY,
+            max_queue_depth=settings.AGENT_MAX_QUEUE_DEPTH,
+            admission_timeout=settings.AGENT_ADMISSION_TIMEOUT,
+        )
 
-    def register_agent(self, agent_handler: Callable):
+    def register_agent(self, agent_handler: Callable, max_concurrency: Optional[int] = None):
         """
         에이전트 처리 함수를 등록합니다.
         해당 함수는 (turn: dict, session_id: str, **kwargs) 시그니처를 가져야 합니다.
+        max_concurrency: 해당 에이전트의 동시 실행 상한 (미지정 시 AGENT_PER_AGENT_MAX_CONCURRENCY)
         """
         self.agents.append(agent_handler)
+        cap = max_concurrency or settings.AGENT_PER_AGENT_MAX_CONCURRENCY
+        if cap:
+            self.admission.set_agent_cap(self._agent_name(agent_handler), cap)
+
+    @staticmethod
+    def _agent_name(agent_handler: Callable) -> str:
+        return getattr(agent_handler, "__name__", repr(agent_handler))
+
+    async def _run_admitted(self, agent: Callable, turn: dict, session_id: str, **kwargs):
+        name = self._agent_name(agent)
+        lane = LANE_CUSTOMER if turn.get("speaker") == "customer" else LANE_AGENT
+        if not await self.admission.acquire(name, lane):
+            logger.warning(f"[AgentManager] {name} shed for turn {turn.get('turn_id')} (overloaded)")
+            # 실행은 건너뛰어도 대화 이력(체크포인트/세션 turns)에는 적재해야 이후 턴의 맥락이 맞음
+            # (superseded 턴과 같은 record_only 경로, 가벼운 작업이라 admission 예산 밖에서 실행)
+            kwargs.pop("on_delta", None)
+            try:
+                await agent(turn, session_id, record_only=True, **kwargs)
+            except Exception as e:
+                logger.error(f"[AgentManager] {name} failed to record shed turn {turn.get('turn_id')}: {e}")
+            return {"next_step": "skip", "reasoning": "Admission: overloaded"}
+        try:
+            return await agent(turn, session_id, **kwargs)
+        finally:
+            self.admission.release(name)
+
+    def stats(self) -> Dict[str, Any]:
+        return self.admission.stats()
 
     async def process_turn(self, turn: dict, session_id: str, **kwargs):
         """
@@ -20,25 +199,46 @@ class AgentManager:
             return
 
         # 모든 에이전트 작업을 병렬로 생성
-        tasks = [agent(turn, session_id, **kwargs) for agent in self.agents]
+        # [NEW] Task로 직접 생성해두어야, 상위(TurnScheduler)에서 턴이 취소될 때 함께 취소할 수 있음
+        tasks = [
+            asyncio.create_task(self._run_admitted(agent, turn, session_id, **kwargs))
+            for agent in self.agents
+        ]
         
-        # 완료되는 대로 결과 반환 (as_completed)
-        for completed_task in asyncio.as_completed(tasks):
-            try:
-                res = await completed_task
+        try:
+            # 완료되는 대로 결과 반환 (as_completed)
+            for completed_task in asyncio.as_completed(tasks):
+                try:
+                    res = await completed_task
+                    
+                    # None이 아니고 'skip'이 아닌 유효한 결과만 yield
+                    # 대규님 만약 마케팅 관련 내용을 생성한다면 state에 next_step 속성을 추가하셔야 할 것 같습니다.
+                    # 일단 추가 안해도 되도록 구현했습니다. 이해가 안되면 편하게 말씀해주세요
+                    # 만약 다른 방법이 있다면 알려주세요.
+                    if res and res.get("next_step", "generate") != "skip":
+                        yield res
+                    else:
+                        agent_type = res.get("agent_type") if res else None
+                        print(f"[{agent_type}] skip되어 프론트로 안 넘어감") # 디버깅용
                 
-                # None이 아니고 'skip'이 아닌 유효한 결과만 yield
-                # 대규님 만약 마케팅 관련 내용을 생성한다면 state에 next_step 속성을 추가하셔야 할 것 같습니다.
-                # 일단 추가 안해도 되도록 구현했습니다. 이해가 안되면 편하게 말씀해주세요
-                # 만약 다른 방법이 있다면 알려주세요.
-                if res and res.get("next_step", "generate") != "skip":
-                    yield res
-                else:
-                    print(f"[{res.get("agent_type")}] skip되어 프론트로 안 넘어감") # 디버깅용
-            
+                except Exception as e:
+                    print(f"Agent execution error: {e}")
+                    continue
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def record_turn(self, turn: dict, session_id: str, **kwargs):
+        """
+        [NEW] 에이전트를 실행하지 않고 각 에이전트의 대화 상태에 턴만 적재합니다.
+        (TurnScheduler가 stale 턴을 폐기할 때 사용)
+        """
+        for agent in self.agents:
+            try:
+                await agent(turn, session_id, record_only=True, **kwargs)
             except Exception as e:
-                print(f"Agent execution error: {e}")
-                continue
+                print(f"Agent record error: {e}")
 
     async def process_turn_stream(self, turn: dict, session_id: str, **kwargs):
         """
@@ -49,7 +249,7 @@ class AgentManager:
             return
 
         # 모든 에이전트를 병렬로 실행
-        tasks = [agent(turn, session_id, **kwargs) for agent in self.agents]
+        tasks = [self._run_admitted(agent, turn, session_id, **kwargs) for agent in self.agents]
         
         # 완료되는 순서대로 처리
         for future in asyncio.as_completed(tasks):
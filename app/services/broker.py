@@ -0,0 +1,381 @@
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import time
+import uuid
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.utils import ws_codec
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class Broker(ABC):
+    """
+    ConnectionManager / NotificationManager 뒤에 놓이는 pub/sub + 공유 저장소 추상화.
+    - publish(): 모든 워커(자기 자신 포함)의 subscribe 핸들러로 envelope(dict)를 전달
+    - list_* / get_json / set_json: 통화 이력 등 워커 간 공유 상태
+    - claim(): 워커 간 1회성 작업(통화 종료 분석 등)의 선점 (Redis SET NX)
+    shared=False(단일 프로세스)면 매니저들은 로컬 dict만으로 동작하고 공유 저장소를 건너뜁니다.
+    """
+
+    shared = False
+
+    def __init__(self):
+        self.worker_id = uuid.uuid4().hex[:12]
+        self._handlers: Dict[str, List[Handler]] = defaultdict(list)
+        self._writes: Optional[asyncio.Queue] = None
+        self._write_task: Optional[asyncio.Task] = None
+        self.stats = {"published": 0, "delivered_local": 0, "received_remote": 0, "handler_errors": 0}
+
+    def subscribe(self, channel: str, handler: Handler) -> None:
+        self._handlers[channel].append(handler)
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def write_behind(self, coro: Awaitable[Any]) -> None:
+        """
+        동기 코드(add_transcript 등)에서 공유 저장소 쓰기를 예약. 한 워커 안에서는 발행 순서대로 적용됩니다.
+        """
+        if self._writes is None:
+            self._writes = asyncio.Queue()
+        if self._write_task is None or self._write_task.done():
+            self._write_task = asyncio.create_task(self._run_writes())
+        self._writes.put_nowait(coro)
+
+    async def _run_writes(self) -> None:
+        while True:
+            coro = await self._writes.get()
+            try:
+                await coro
+            except Exception as e:
+                logger.error(f"[Broker] shared-state write failed: {e}")
+
+    async def _dispatch(self, channel: str, envelope: Dict[str, Any]) -> None:
+        for handler in self._handlers.get(channel, []):
+            try:
+                await handler(envelope)
+            except Exception as e:
+                self.stats["handler_errors"] += 1
+                logger.error(f"[Broker] handler error on '{channel}': {e}")
+
+    @abstractmethod
+    async def publish(self, channel: str, envelope: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def list_append(self, key: str, item: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def list_range(self, key: str) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set_json(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        """
+        ttl(초)을 주면 그 키만 해당 시간 후 만료 (소스 presence 등 갱신형 키), 없으면 브로커 기본
+        """
+
+    @abstractmethod
+    async def get_json(self, key: str) -> Any:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def claim(self, key: str, ttl: int) -> bool:
+        """
+        key를 ttl초 동안 이 워커가 선점. 이미 다른 워커(또는 자신)가 선점했으면 False
+        """
+
+    def describe(self) -> Dict[str, Any]:
+        return {"backend": type(self).__name__, "worker_id": self.worker_id, "shared": self.shared, **self.stats}
+
+
+class InProcessBroker(Broker):
+    """
+    단일 워커용: 직렬화 없이 핸들러를 바로 호출 (기존 동작과 동일한 비용)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.clock = clock
+        self._lists: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._values: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+        self._claims: Dict[str, float] = {}
+
+    async def publish(self, channel: str, envelope: Dict[str, Any]) -> None:
+        self.stats["published"] += 1
+        self.stats["delivered_local"] += 1
+        await self._dispatch(channel, envelope)
+
+    async def list_append(self, key: str, item: Dict[str, Any]) -> None:
+        self._lists[key].append(item)
+
+    async def list_range(self, key: str) -> List[Dict[str, Any]]:
+        return list(self._lists.get(key, []))
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        self._values[key] = value
+        if ttl:
+            self._expires[key] = self.clock() + ttl
+        else:
+            self._expires.pop(key, None)
+
+    async def get_json(self, key: str) -> Any:
+        if self._expires.get(key, float("inf")) <= self.clock():
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+        return self._values.get(key)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._lists.pop(key, None)
+            self._values.pop(key, None)
+            self._expires.pop(key, None)
+            self._claims.pop(key, None)
+
+    async def claim(self, key: str, ttl: int) -> bool:
+        now = self.clock()
+        if self._claims.get(key, 0.0) > now:
+            return False
+        self._claims[key] = now + ttl
+        return True
+
+
+class RedisBroker(Broker):
+    """
+    Redis pub/sub + list/string 기반 멀티 워커/멀티 파드 브로커.
+    - 자기 워커가 발행한 메시지는 즉시 로컬 전달하고, pub/sub으로 되돌아온 사본은 origin으로 걸러냅니다.
+    - 공유 키에는 key_ttl을 걸어 종료 신호를 놓친 통화도 Redis에 남지 않도록 합니다.
+    """
+
+    shared = True
+
+    def __init__(self, client: Any, key_prefix: str = "cs:", key_ttl: Optional[int] = None):
+        super().__init__()
+        self.client = client
+        self.key_prefix = key_prefix
+        self.key_ttl = key_ttl
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisBroker":
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as e:
+            raise RuntimeError("BROKER_URL uses redis:// but the 'redis' package is not installed") from e
+        return cls(aioredis.from_url(url, decode_responses=True), **kwargs)
+
+    def _key(self, key: str) -> str:
+        return f"{self.key_prefix}{key}"
+
+    async def start(self) -> None:
+        if self._listener is not None or not self._handlers:
+            return
+        self._pubsub = self.client.pubsub()
+        await self._pubsub.subscribe(*[self._key(ch) for ch in self._handlers])
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"[RedisBroker] worker {self.worker_id} subscribed to {sorted(self._handlers)}")
+
+    async def close(self) -> None:
+        if self._write_task is not None:
+            # 남은 쓰기를 흘려보낸 뒤 종료
+            while self._writes is not None and not self._writes.empty():
+                await asyncio.sleep(0.01)
+            self._write_task.cancel()
+            self._write_task = None
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.wait({self._listener})
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        await self.client.aclose()
+
+    async def _listen(self) -> None:
+        prefix_len = len(self.key_prefix)
+        while True:
+            try:
+                async for raw in self._pubsub.listen():
+                    if raw.get("type") != "message":
+                        continue
+                    try:
+                        packet = ws_codec.loads(raw["data"])
+                    except (TypeError, ValueError):
+                        continue
+                    if packet.get("origin") == self.worker_id:
+                        continue
+                    self.stats["received_remote"] += 1
+                    await self._dispatch(raw["channel"][prefix_len:], packet["envelope"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"[RedisBroker] listener error, resubscribing: {e}")
+                await asyncio.sleep(1.0)
+
+    async def publish(self, channel: str, envelope: Dict[str, Any]) -> None:
+        self.stats["published"] += 1
+        self.stats["delivered_local"] += 1
+        await self._dispatch(channel, envelope)
+        packet = ws_codec.dumps({"origin": self.worker_id, "envelope": envelope})
+        try:
+            await self.client.publish(self._key(channel), packet)
+        except Exception as e:
+            logger.error(f"[RedisBroker] publish to '{channel}' failed: {e}")
+
+    async def _expire(self, key: str) -> None:
+        if self.key_ttl:
+            await self.client.expire(key, self.key_ttl)
+
+    async def list_append(self, key: str, item: Dict[str, Any]) -> None:
+        key = self._key(key)
+        await self.client.rpush(key, ws_codec.dumps(item))
+        await self._expire(key)
+
+    async def list_range(self, key: str) -> List[Dict[str, Any]]:
+        return [ws_codec.loads(v) for v in await self.client.lrange(self._key(key), 0, -1)]
+
+    async def set_json(self, key: str, value: Any, ttl: Optional[int] = None) -> None:
+        await self.client.set(
+            self._key(key), ws_codec.dumps(value), ex=ttl or self.key_ttl or None
+        )
+
+    async def get_json(self, key: str) -> Any:
+        raw = await self.client.get(self._key(key))
+        return ws_codec.loads(raw) if raw is not None else None
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*[self._key(k) for k in keys])
+
+    async def claim(self, key: str, ttl: int) -> bool:
+        # 삭제(delete)되는 call 키와 별개로 ttl 동안 유지 -> 늦게 온 종료 신호도 중복 처리하지 않음
+        return bool(await self.client.set(self._key(key), self.worker_id, ex=ttl, nx=True))
+
+
+# -------------------------
+# Local Redis stand-in (tests / local multi-worker simulation)
+# -------------------------
+
+class LocalRedisPubSub:
+    def __init__(self, server: "LocalRedis"):
+        self._server = server
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self.channels: Set[str] = set()
+
+    async def subscribe(self, *channels: str) -> None:
+        for channel in channels:
+            self.channels.add(channel)
+            self._server._subscribers[channel].add(self)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def aclose(self) -> None:
+        for channel in self.channels:
+            self._server._subscribers[channel].discard(self)
+        self.channels.clear()
+
+
+class LocalRedis:
+    """
+    redis.asyncio 클라이언트 중 RedisBroker가 쓰는 부분만 구현한 in-memory 대역.
+    여러 RedisBroker가 같은 LocalRedis를 공유하면 워커 여러 개를 한 프로세스에서 재현할 수 있습니다.
+    키 만료는 clock 기준 (테스트는 가짜 clock을 넘겨 TTL을 재현)
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._subscribers: Dict[str, Set[LocalRedisPubSub]] = defaultdict(set)
+        self._data: Dict[str, Any] = {}
+        self._expires: Dict[str, float] = {}
+
+    def _alive(self, key: str) -> bool:
+        deadline = self._expires.get(key)
+        if deadline is not None and self.clock() >= deadline:
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    def pubsub(self) -> LocalRedisPubSub:
+        return LocalRedisPubSub(self)
+
+    async def publish(self, channel: str, data: str) -> int:
+        subscribers = list(self._subscribers.get(channel, ()))
+        for ps in subscribers:
+            ps._queue.put_nowait({"type": "message", "channel": channel, "data": data})
+        return len(subscribers)
+
+    async def rpush(self, key: str, *values: str) -> int:
+        if not self._alive(key):
+            self._data[key] = []
+        self._data[key].extend(values)
+        return len(self._data[key])
+
+    async def lrange(self, key: str, start: int, end: int) -> List[str]:
+        if not self._alive(key):
+            return []
+        items = self._data[key]
+        return items[start:] if end == -1 else items[start:end + 1]
+
+    async def set(self, key: str, value: str, ex: Optional[int] = None, nx: bool = False) -> Optional[bool]:
+        if nx and self._alive(key):
+            return None
+        self._data[key] = value
+        self._expires.pop(key, None)
+        if ex:
+            self._expires[key] = self.clock() + ex
+        return True
+
+    async def get(self, key: str) -> Optional[str]:
+        return self._data[key] if self._alive(key) else None
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._alive(key):
+            return False
+        self._expires[key] = self.clock() + seconds
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def aclose(self) -> None:
+        pass
+
+
+def create_broker(url: str) -> Broker:
+    """
+    inprocess:// (기본, 단일 워커) | redis://... / rediss://... | localredis:// (테스트용 대역)
+    """
+    scheme = (url or "inprocess://").split("://", 1)[0]
+    key_ttl = int(settings.BROKER_KEY_TTL) if settings.BROKER_KEY_TTL else None
+    if scheme in ("redis", "rediss", "unix"):
+        return RedisBroker.from_url(url, key_ttl=key_ttl)
+    if scheme == "localredis":
+        return RedisBroker(LocalRedis(), key_ttl=key_ttl)
+    return InProcessBroker()
+
+
+broker = create_broker(settings.BROKER_URL)
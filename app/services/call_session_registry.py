@@ -0,0 +1,203 @@
+import asyncio
+import inspect
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def approx_size(obj: Any, _seen: Optional[set] = None, _depth: int = 0) -> int:
+    """
+    객체 그래프의 대략적인 메모리 사용량(bytes). 리포트 용도라 정확도보다 안전성을 우선합니다.
+    """
+    if _seen is None:
+        _seen = set()
+    if id(obj) in _seen or _depth > 12:
+        return 0
+    _seen.add(id(obj))
+
+    size = sys.getsizeof(obj, 0)
+    if isinstance(obj, (str, bytes, bytearray, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += approx_size(k, _seen, _depth + 1) + approx_size(v, _seen, _depth + 1)
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        for v in obj:
+            size += approx_size(v, _seen, _depth + 1)
+    elif hasattr(obj, "__dict__"):
+        size += approx_size(vars(obj), _seen, _depth + 1)
+    elif hasattr(obj, "__slots__"):
+        for name in obj.__slots__:
+            if hasattr(obj, name):
+                size += approx_size(getattr(obj, name), _seen, _depth + 1)
+    return size
+
+
+def checkpointer_thread_size(checkpointer: Any, thread_id: str) -> int:
+    """
+    LangGraph MemorySaver(InMemorySaver)에 쌓인 특정 thread의 체크포인트 크기
+    """
+    total = 0
+    storage = getattr(checkpointer, "storage", None)
+    if storage is not None and thread_id in storage:
+        total += approx_size(storage[thread_id])
+    for attr in ("writes", "blobs"):
+        table = getattr(checkpointer, attr, None) or {}
+        for key, value in list(table.items()):
+            if isinstance(key, tuple) and key and key[0] == thread_id:
+                total += approx_size(value)
+    return total
+
+
+def delete_checkpointer_thread(checkpointer: Any, thread_id: str) -> None:
+    if checkpointer is not None and hasattr(checkpointer, "delete_thread"):
+        checkpointer.delete_thread(thread_id)
+
+
+@dataclass
+class CallSession:
+    call_id: str
+    created_at: float = field(default_factory=time.monotonic)
+    last_seen: float = field(default_factory=time.monotonic)
+
+
+@dataclass
+class _Subsystem:
+    cleanup: Callable[[str], Any]
+    size_probe: Optional[Callable[[str], int]] = None
+    is_active: Optional[Callable[[str], bool]] = None
+
+
+class CallSessionRegistry:
+    """
+    통화(call) 단위 상태의 수명 관리자.
+    - 각 서브시스템(ConnectionManager, 마케팅 세션, LangGraph 체크포인트 등)은 import 시점에
+      cleanup 훅(과 선택적으로 size probe)을 등록합니다.
+    - CALL_ENDED 시 finalize()로 명시적으로 정리하고, 끝 신호를 놓친 통화는 idle TTL로 회수합니다.
+      (서브시스템의 is_active 훅이 True인 통화(이 워커에 소스/모니터 소켓이 열려 있음)는 오래 조용해도 회수하지 않음)
+    """
+
+    def __init__(self, idle_ttl: float, sweep_interval: float):
+        self.idle_ttl = idle_ttl
+        self.sweep_interval = sweep_interval
+        self.sessions: Dict[str, CallSession] = {}
+        self.subsystems: Dict[str, _Subsystem] = {}
+        self._sweeper: Optional[asyncio.Task] = None
+        self.stats = {"finalized": 0, "evicted_idle": 0, "skipped_active": 0, "cleanup_errors": 0}
+
+    def register(
+        self,
+        name: str,
+        cleanup: Callable[[str], Any],
+        size_probe: Optional[Callable[[str], int]] = None,
+        is_active: Optional[Callable[[str], bool]] = None,
+    ) -> None:
+        self.subsystems[name] = _Subsystem(cleanup=cleanup, size_probe=size_probe, is_active=is_active)
+
+    def touch(self, call_id: str) -> None:
+        if not call_id:
+            return
+        session = self.sessions.get(call_id)
+        if session is None:
+            self.sessions[call_id] = CallSession(call_id=call_id)
+        else:
+            session.last_seen = time.monotonic()
+
+    async def finalize(self, call_id: str, reason: str = "ended") -> None:
+        """
+        등록된 모든 서브시스템에서 해당 call의 상태를 제거합니다. (여러 번 호출해도 안전)
+        """
+        self.sessions.pop(call_id, None)
+        for name, subsystem in self.subsystems.items():
+            try:
+                result = subsystem.cleanup(call_id)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.stats["cleanup_errors"] += 1
+                logger.error(f"[CallSessionRegistry] cleanup '{name}' failed for {call_id}: {e}")
+        self.stats["finalized"] += 1
+        logger.info(f"[CallSessionRegistry] Session {call_id} finalized ({reason})")
+
+    def _active(self, call_id: str) -> bool:
+        for name, subsystem in self.subsystems.items():
+            if subsystem.is_active is None:
+                continue
+            try:
+                if subsystem.is_active(call_id):
+                    return True
+            except Exception as e:
+                logger.error(f"[CallSessionRegistry] is_active '{name}' failed for {call_id}: {e}")
+        return False
+
+    async def sweep(self) -> int:
+        now = time.monotonic()
+        expired = []
+        for call_id, s in list(self.sessions.items()):
+            if now - s.last_seen <= self.idle_ttl:
+                continue
+            if self._active(call_id):
+                # 긴 보류 등으로 조용한 통화: 소켓이 닫히면 그쪽 종료 처리가 정리함
+                self.stats["skipped_active"] += 1
+                continue
+            expired.append(call_id)
+        for call_id in expired:
+            await self.finalize(call_id, reason="idle_ttl")
+            self.stats["evicted_idle"] += 1
+        return len(expired)
+
+    def start(self) -> None:
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            await asyncio.wait({self._sweeper})
+            self._sweeper = None
+
+    async def _run_sweeper(self) -> None:
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"[CallSessionRegistry] sweep failed: {e}")
+
+    def memory_report(self, per_session: bool = True) -> Dict[str, Any]:
+        now = time.monotonic()
+        sessions = {}
+        for call_id, session in (self.sessions.items() if per_session else ()):
+            usage = {}
+            for name, subsystem in self.subsystems.items():
+                if subsystem.size_probe is None:
+                    continue
+                try:
+                    usage[name] = subsystem.size_probe(call_id)
+                except Exception:
+                    usage[name] = None
+            sessions[call_id] = {
+                "age_sec": round(now - session.created_at, 1),
+                "idle_sec": round(now - session.last_seen, 1),
+                "bytes": usage,
+                "total_bytes": sum(v for v in usage.values() if v),
+            }
+        return {
+            "idle_ttl_sec": self.idle_ttl,
+            "active_sessions": len(self.sessions),
+            "subsystems": sorted(self.subsystems),
+            "stats": dict(self.stats),
+            **({"sessions": sessions} if per_session else {}),
+        }
+
+
+call_session_registry = CallSessionRegistry(
+    idle_ttl=settings.CALL_SESSION_IDLE_TTL,
+    sweep_interval=settings.CALL_SESSION_SWEEP_INTERVAL,
+)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+from qdrant_client import models
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class CategoryCatalog:
+    """
+    컬렉션에 실제로 있는 카테고리와 카테고리별 문서 수.
+    - metadata.category keyword payload 인덱스 + facet 집계 (payload를 내려받지 않음, 전체 컬렉션 기준)
+      인덱스 생성은 스키마 변경이라 기본으로 하지 않음 (create_index / CATEGORY_INDEX_AUTO_CREATE)
+    - facet 실패(구버전 서버/인덱스 없음/권한) 시 scroll 샘플링으로 대체
+    - start() 이후 refresh_interval 마다 백그라운드 갱신 (문서 추가/삭제 반영)
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        collection: str,
+        category_key: str = "metadata.category",
+        refresh_interval: float = 300.0,
+        facet_limit: int = 100,
+        sample_size: int = 250,
+        create_index: bool = False,
+    ):
+        self.client = client
+        self.collection = collection
+        self.category_key = category_key
+        self.refresh_interval = refresh_interval
+        self.facet_limit = facet_limit
+        self.sample_size = sample_size
+        self.create_index = create_index
+
+        self.counts: Dict[str, int] = {}
+        self.source: Optional[str] = None  # "facet" | "scroll"
+        self.refreshed_at: Optional[float] = None
+        self._index_checked = False
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"refreshes": 0, "refresh_errors": 0, "fallbacks": 0, "index_errors": 0, "refresh_ms_total": 0.0}
+
+    @property
+    def categories(self) -> List[str]:
+        # 문서가 0건인 카테고리는 검색 대상에서 제외
+        return sorted(c for c, n in self.counts.items() if n > 0)
+
+    def count(self, category: str) -> int:
+        return self.counts.get(category, 0)
+
+    # -------------------------
+    # Discovery
+    # -------------------------
+
+    def ensure_index(self) -> bool:
+        """
+        create_index=True(CATEGORY_INDEX_AUTO_CREATE, 운영 작업으로 명시적으로 켤 때만)이면
+        category_key 에 keyword payload 인덱스가 없을 때 생성 (이미 있으면 아무것도 하지 않음).
+        확인/생성은 성공/실패와 상관없이 한 번만 시도 (읽기 전용 키로 갱신마다 재시도/경고하지 않도록)
+        """
+        if self._index_checked or not self.create_index:
+            return True
+        self._index_checked = True
+        try:
+            schema = self.client.get_collection(self.collection).payload_schema or {}
+            if self.category_key not in schema:
+                self.client.create_payload_index(
+                    collection_name=self.collection,
+                    field_name=self.category_key,
+                    field_schema=models.PayloadSchemaType.KEYWORD,
+                    wait=True,
+                )
+                logger.info(f"[CategoryCatalog] created keyword index {self.collection}.{self.category_key}")
+        except Exception as e:
+            self.stats["index_errors"] += 1
+            logger.warning(
+                f"[CategoryCatalog] could not ensure index {self.collection}.{self.category_key} "
+                f"(not retried): {e}"
+            )
+            return False
+        return True
+
+    def _facet_counts(self) -> Dict[str, int]:
+        self.ensure_index()
+        res = self.client.facet(
+            collection_name=self.collection,
+            key=self.category_key,
+            limit=self.facet_limit,
+        )
+        return {str(hit.value): int(hit.count) for hit in res.hits}
+
+    def _sample_counts(self) -> Dict[str, int]:
+        pts, _ = self.client.scroll(
+            collection_name=self.collection,
+            limit=self.sample_size,
+            with_payload=[self.category_key],
+            with_vectors=False,
+        )
+        counts: Dict[str, int] = {}
+        for p in pts:
+            node: Any = p.payload or {}
+            for part in self.category_key.split("."):
+                node = node.get(part) if isinstance(node, dict) else None
+            if node:
+                counts[str(node)] = counts.get(str(node), 0) + 1
+        return counts
+
+    def refresh(self) -> Dict[str, int]:
+        t0 = time.perf_counter()
+        try:
+            counts, source = self._facet_counts(), "facet"
+        except Exception as e:
+            # 인덱스 없음/권한 문제는 갱신마다 반복되므로 경고는 처음 한 번만
+            log = logger.debug if self.stats["fallbacks"] else logger.warning
+            log(f"[CategoryCatalog] facet failed on {self.collection}, sampling instead: {e}")
+            self.stats["fallbacks"] += 1
+            counts, source = self._sample_counts(), "scroll"
+        self.counts, self.source, self.refreshed_at = counts, source, time.time()
+        self.stats["refreshes"] += 1
+        self.stats["refresh_ms_total"] += (time.perf_counter() - t0) * 1000
+        return counts
+
+    # -------------------------
+    # Background refresh
+    # -------------------------
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait({self._task})
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 직전 목록을 그대로 사용
+                self.stats["refresh_errors"] += 1
+                logger.warning(f"[CategoryCatalog] '{self.collection}' refresh failed: {e}")
+
+    def describe(self) -> Dict[str, Any]:
+        refreshes = self.stats["refreshes"]
+        return {
+            "source": self.source,
+            "categories": dict(sorted(self.counts.items())),
+            "refreshed_at": self.refreshed_at,
+            "refresh_interval": self.refresh_interval,
+            **{k: v for k, v in self.stats.items() if k != "refresh_ms_total"},
+            "avg_refresh_ms": round(self.stats["refresh_ms_total"] / refreshes, 2) if refreshes else None,
+        }
+
+
+# collection 이름 -> 카탈로그
+category_catalogs: Dict[str, CategoryCatalog] = {}
+
+
+def get_category_catalog(client: Any, collection: str, **kwargs: Any) -> CategoryCatalog:
+    catalog = category_catalogs.get(collection)
+    if catalog is None:
+        catalog = category_catalogs[collection] = CategoryCatalog(
+            client,
+            collection,
+            refresh_interval=settings.CATEGORY_REFRESH_INTERVAL,
+            create_index=settings.CATEGORY_INDEX_AUTO_CREATE,
+            **kwargs,
+        )
+    return catalog
+
+
+async def start_category_catalogs() -> None:
+    for catalog in category_catalogs.values():
+        await catalog.start()
+
+
+async def stop_category_catalogs() -> None:
+    for catalog in category_catalogs.values():
+        await catalog.stop()
@@ -1,10 +1,19 @@
-from typing import List, Dict, Optional
+import asyncio
+from typing import List, Dict, Optional, Set
 from fastapi import WebSocket
+from app.core.config import settings
+from app.services.socket_sender import SocketSender
+from app.services.call_session_registry import call_session_registry, approx_size
+from app.services.broker import Broker, broker as default_broker
+from app.utils.ws_codec import EncodedFrame, negotiate_format
 
 class ConnectionManager:
-    def __init__(self):
-        # Call ID를 키로 하고 연결된 웹소켓 리스트를 값으로 저장
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, broker: Optional[Broker] = None):
+        # [NEW] 브로드캐스트/통화 이력은 브로커를 거침 -> 소스와 모니터가 다른 워커에 있어도 동작
+        self.broker = broker or default_broker
+        self.broker.subscribe("monitor", self._on_monitor_event)
+        # Call ID를 키로 하고 연결된 웹소켓(전용 송신 큐) 리스트를 값으로 저장
+        self.active_connections: Dict[str, List[SocketSender]] = {}
         # [NEW] Call ID별 대화 이력 및 고객 정보 저장 (분석 로직 트리거용)
         self.call_history: Dict[str, List[Dict]] = {}
         self.call_customer_info: Dict[str, Dict] = {}
@@ -12,24 +21,42 @@ class ConnectionManager:
         self.call_member_id: Dict[str, Dict] = {}
         # [NEW] Call ID별 시작 시간 저장
         self.call_start_times: Dict[str, object] = {}
+        # [NEW] 이 워커에 붙은 /check 소스 소켓 수. 공유 브로커면 call:{id}:source 키(TTL, 주기 갱신)로 다른 워커에도 알림
+        self.source_sockets: Dict[str, int] = {}
+        self._source_heartbeats: Dict[str, asyncio.Task] = {}
+        # 소스를 받은 워커만 공유 키(history/customer/member/start_time)를 지움 (clear_call 때까지 유지)
+        self._source_owned: Set[str] = set()
 
     async def connect(self, websocket: WebSocket, call_id: str):
         await websocket.accept()
         if call_id not in self.active_connections:
             self.active_connections[call_id] = []
-        self.active_connections[call_id].append(websocket)
+
+        async def on_close(sender: SocketSender):
+            self._remove_sender(sender, call_id)
+
+        sender = SocketSender(
+            websocket, label=f"monitor:{call_id}", on_close=on_close, fmt=negotiate_format(websocket)
+        ).start()
+        self.active_connections[call_id].append(sender)
         print(f"Monitor connected to call {call_id}. Active sessions: {list(self.active_connections.keys())}")
 
     def add_transcript(self, call_id: str, transcript_data: dict):
         if call_id not in self.call_history:
             self.call_history[call_id] = []
         self.call_history[call_id].append(transcript_data)
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.list_append(f"call:{call_id}:history", transcript_data))
 
     def set_customer_info(self, call_id: str, info: dict):
         self.call_customer_info[call_id] = info
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.set_json(f"call:{call_id}:customer", info))
 
     def set_member_id(self, call_id: str, member_id: int, tenant_name: str = "default"):
         self.call_member_id[call_id] = {"member_id": member_id, "tenant_name": tenant_name}
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.set_json(f"call:{call_id}:member", self.call_member_id[call_id]))
         print(f"[ConnectionManager] Member mapped: Call {call_id} -> Member {member_id} (Tenant: {tenant_name})")
 
     def get_history(self, call_id: str) -> List[Dict]:
@@ -41,11 +68,82 @@ class ConnectionManager:
     def get_member_id(self, call_id: str) -> Optional[Dict]:
         return self.call_member_id.get(call_id)
 
+    # [NEW] 다른 워커가 기록한 상태까지 조회 (로컬에 있으면 로컬 우선)
+    async def fetch_history(self, call_id: str) -> List[Dict]:
+        if call_id in self.call_history or not self.broker.shared:
+            return self.get_history(call_id)
+        return await self.broker.list_range(f"call:{call_id}:history")
+
+    async def fetch_customer_info(self, call_id: str) -> Optional[Dict]:
+        if call_id in self.call_customer_info or not self.broker.shared:
+            return self.get_customer_info(call_id)
+        return await self.broker.get_json(f"call:{call_id}:customer")
+
+    async def fetch_member_id(self, call_id: str) -> Optional[Dict]:
+        if call_id in self.call_member_id or not self.broker.shared:
+            return self.get_member_id(call_id)
+        return await self.broker.get_json(f"call:{call_id}:member")
+
+    async def fetch_start_time(self, call_id: str):
+        if call_id in self.call_start_times or not self.broker.shared:
+            return self.get_start_time(call_id)
+        from datetime import datetime
+        value = await self.broker.get_json(f"call:{call_id}:start_time")
+        return datetime.fromisoformat(value) if value else None
+
+
+    # [NEW] /check 소스 소켓 presence
+    def bind_source(self, call_id: str):
+        self.source_sockets[call_id] = self.source_sockets.get(call_id, 0) + 1
+        self._source_owned.add(call_id)
+        if self.broker.shared and call_id not in self._source_heartbeats:
+            self._source_heartbeats[call_id] = asyncio.create_task(self._source_heartbeat(call_id))
+
+    def unbind_source(self, call_id: str):
+        remaining = self.source_sockets.get(call_id, 0) - 1
+        if remaining > 0:
+            self.source_sockets[call_id] = remaining
+            return
+        self.source_sockets.pop(call_id, None)
+        task = self._source_heartbeats.pop(call_id, None)
+        if task is not None:
+            task.cancel()
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.delete(f"call:{call_id}:source"))
+
+    async def _source_heartbeat(self, call_id: str):
+        ttl = settings.CALL_SOURCE_TTL
+        while True:
+            try:
+                await self.broker.set_json(f"call:{call_id}:source", self.broker.worker_id, ttl=ttl)
+            except Exception as e:
+                print(f"[ConnectionManager] source presence refresh failed for {call_id}: {e}")
+            await asyncio.sleep(ttl / 3)
+
+    async def source_active(self, call_id: str) -> bool:
+        """
+        어느 워커든 이 통화의 /check 소스 소켓이 아직 연결되어 있으면 True
+        """
+        if call_id in self.source_sockets:
+            return True
+        if not self.broker.shared:
+            return False
+        return await self.broker.get_json(f"call:{call_id}:source") is not None
+
+    def has_local_sockets(self, call_id: str) -> bool:
+        # 이 워커에 소스(/check) 또는 모니터 소켓이 열려 있는 통화 (유휴 TTL 회수 대상에서 제외)
+        return call_id in self.source_sockets or call_id in self.active_connections
 
     def disconnect(self, websocket: WebSocket, call_id: str):
+        for sender in self.active_connections.get(call_id, [])[:]:
+            if sender.websocket is websocket:
+                sender.detach()
+                self._remove_sender(sender, call_id)
+
+    def _remove_sender(self, sender: SocketSender, call_id: str):
         if call_id in self.active_connections:
-            if websocket in self.active_connections[call_id]:
-                self.active_connections[call_id].remove(websocket)
+            if sender in self.active_connections[call_id]:
+                self.active_connections[call_id].remove(sender)
             
             # 더 이상 연결된 관리자가 없으면 키 삭제
             if not self.active_connections[call_id]:
@@ -53,23 +151,65 @@ class ConnectionManager:
                 print(f"Call {call_id} session cleared.")
 
     async def broadcast(self, message: dict, call_id: str):
+        # [NEW] 브로커로 발행 -> 모니터 소켓을 가진 모든 워커에서 로컬 전달
+        await self.broker.publish("monitor", {"call_id": call_id, "message": message})
+
+    async def _on_monitor_event(self, envelope: dict):
+        # 소켓별 송신 큐에 넣기만 함 -> 느린 모니터가 다른 모니터/에이전트 태스크를 막지 않음
+        call_id = envelope.get("call_id")
+        # 소스가 다른 워커에 있으면 이 워커의 세션은 브로커 이벤트로만 활동이 보임 -> 유휴 TTL 갱신
+        if call_id in call_session_registry.sessions:
+            call_session_registry.touch(call_id)
         if call_id in self.active_connections:
-            # 연결 리스트 복사하여 순회 (도중에 연결 끊김 처리가 발생할 수 있으므로)
-            for connection in self.active_connections[call_id][:]:
-                try:
-                    await connection.send_json(message)
-                except Exception as e:
-                    print(f"Error broadcasting to client in {call_id}: {e}")
-                    # 여기서 끊는 로직을 넣을 수도 있지만, disconnect 호출되는 흐름에 맡김
-                    # 필요하다면 self.disconnect(connection, call_id) 호출
+            frame = EncodedFrame(envelope["message"])
+            for sender in self.active_connections[call_id][:]:
+                sender.send(frame)
+
+    def stats(self) -> Dict[str, List[Dict]]:
+        return {
+            call_id: [sender.stats() for sender in senders]
+            for call_id, senders in self.active_connections.items()
+        }
 
     # [NEW] 통화 시작 시간 관리
     def set_start_time(self, call_id: str):
         from datetime import datetime
         self.call_start_times[call_id] = datetime.now()
+        if self.broker.shared:
+            self.broker.write_behind(
+                self.broker.set_json(f"call:{call_id}:start_time", self.call_start_times[call_id].isoformat())
+            )
         print(f"Call {call_id} started at {self.call_start_times[call_id]}")
 
     def get_start_time(self, call_id: str):
         return self.call_start_times.get(call_id)
 
+    # [NEW] 통화 종료/유휴 만료 시 call 단위 상태 정리 (모니터 소켓은 각자 disconnect로 정리됨)
+    def clear_call(self, call_id: str):
+        self.call_history.pop(call_id, None)
+        self.call_customer_info.pop(call_id, None)
+        self.call_member_id.pop(call_id, None)
+        self.call_start_times.pop(call_id, None)
+        owned = call_id in self._source_owned and call_id not in self.source_sockets
+        if owned:
+            self._source_owned.discard(call_id)
+        if self.broker.shared and owned:
+            # 공유 키는 소스 워커만 삭제 (모니터 워커가 지우면 소스가 쓰는 중인 이력이 사라짐)
+            # 앞서 예약된 쓰기 뒤에 삭제되도록 같은 write-behind 큐 사용
+            keys = [f"call:{call_id}:{k}" for k in ("history", "customer", "member", "start_time")]
+            self.broker.write_behind(self.broker.delete(*keys))
+
+    def call_state_size(self, call_id: str) -> int:
+        return sum(
+            approx_size(store[call_id])
+            for store in (self.call_history, self.call_customer_info, self.call_member_id, self.call_start_times)
+            if call_id in store
+        )
+
 connection_manager = ConnectionManager()
+call_session_registry.register(
+    "connection_manager",
+    connection_manager.clear_call,
+    size_probe=connection_manager.call_state_size,
+    is_active=connection_manager.has_local_sockets,
+)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+import tiktoken
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODING = "o200k_base"  # gpt-4o 계열; tiktoken이 모르는 모델명(사내 호환 LLM 등)도 이걸로 셈
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: Optional[str]) -> Optional["tiktoken.Encoding"]:
+    """
+    모델에 맞는 tiktoken 인코딩. BPE 파일을 받을 수 없는 환경(오프라인 컨테이너)이면 None -> 근사치로 계산
+    """
+    try:
+        try:
+            return tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            return tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        logger.warning(f"[ContextPacker] tiktoken encoding unavailable for {model!r}, estimating tokens: {e}")
+        return None
+
+
+def _estimate(text: str) -> int:
+    # 한글 1글자(UTF-8 3바이트) ~ 1토큰, 영문 ~4글자/토큰 보다 약간 넉넉하게
+    return math.ceil(len(text.encode("utf-8")) / 3)
+
+
+@lru_cache(maxsize=8192)
+def _count(model: Optional[str], text: str) -> int:
+    enc = get_encoding(model)
+    if enc is None:
+        return _estimate(text)
+    return len(enc.encode(text, disallowed_special=()))
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    return _count(model, text or "")
+
+
+def truncate_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    enc = get_encoding(model)
+    if enc is None:
+        # 근사치 기준: 바이트 예산 안에서 글자 단위로 자름
+        out, used = [], 0
+        for ch in text:
+            used += len(ch.encode("utf-8"))
+            if used > max_tokens * 3:
+                break
+            out.append(ch)
+        return "".join(out)
+    return enc.decode(enc.encode(text, disallowed_special=())[:max_tokens])
+
+
+@dataclass
+class PackEntry:
+    """
+    pack() 입력 1건: score가 높은 것부터 예산 안에 넣고, 출력은 원래 순서를 유지
+    """
+
+    text: str
+    score: float
+    ref: Any = None
+    tokens: Optional[int] = None  # 이미 센 값이 있으면 재계산하지 않음
+
+
+@dataclass
+class PackedContext:
+    text: str
+    included: List[Any]
+    packed_tokens: int
+    dropped_tokens: int
+    dropped: int
+    budget: int
+
+    def report(self) -> Dict[str, int]:
+        return {
+            "packed_tokens": self.packed_tokens,
+            "dropped_tokens": self.dropped_tokens,
+            "dropped_docs": self.dropped,
+            "budget": self.budget,
+        }
+
+
+@dataclass
+class ContextPacker:
+    """
+    근거 문서를 토큰 예산 안에 담는 공용 packer (marketing build_context / guidance retrieval_node)
+    - 문서별 토큰 수는 tiktoken으로 세고 (text 기준 LRU), 호출부가 항목 옆에 보관해 두면 재사용
+    - score 내림차순 greedy: 들어가지 않는 문서는 건너뛰고 더 작은 다음 문서를 시도
+    - 턴마다 packed/dropped 토큰을 누적 (/agent/stats context_packing)
+    """
+
+    name: str
+    model: Optional[str]
+    budget: int
+    per_doc_tokens: int
+    separator: str = "\n\n"
+    stats: Dict[str, Any] = field(
+        default_factory=lambda: {
+            "turns": 0,
+            "packed_tokens": 0,
+            "dropped_tokens": 0,
+            "dropped_docs": 0,
+            "over_budget_turns": 0,
+            "last": None,
+        }
+    )
+
+    def warm(self) -> Optional[str]:
+        """
+        인코딩 로드 (첫 사용 시 BPE 파일을 blocking HTTP로 받음) -> 이벤트 루프 밖에서 미리 호출
+        """
+        return getattr(get_encoding(self.model), "name", None)
+
+    def count(self, text: str) -> int:
+        return count_tokens(text, self.model)
+
+    def truncate(self, text: str) -> str:
+        return truncate_tokens(text, self.per_doc_tokens, self.model)
+
+    def pack(self, entries: Sequence[PackEntry]) -> PackedContext:
+        sep_tokens = self.count(self.separator)
+        for e in entries:
+            if e.tokens is None:
+                e.tokens = self.count(e.text)
+
+        order = sorted(range(len(entries)), key=lambda i: entries[i].score, reverse=True)
+        chosen, used, dropped_tokens = set(), 0, 0
+        for i in order:
+            cost = entries[i].tokens + (sep_tokens if chosen else 0)
+            if used + cost > self.budget:
+                dropped_tokens += entries[i].tokens
+                continue
+            chosen.add(i)
+            used += cost
+
+        kept = [e for i, e in enumerate(entries) if i in chosen]
+        packed = PackedContext(
+            text=self.separator.join(e.text for e in kept).strip(),
+            included=[e.ref for e in kept],
+            packed_tokens=used,
+            dropped_tokens=dropped_tokens,
+            dropped=len(entries) - len(kept),
+            budget=self.budget,
+        )
+        self.stats["turns"] += 1
+        self.stats["packed_tokens"] += packed.packed_tokens
+        self.stats["dropped_tokens"] += packed.dropped_tokens
+        self.stats["dropped_docs"] += packed.dropped
+        if packed.dropped:
+            self.stats["over_budget_turns"] += 1
+        self.stats["last"] = packed.report()
+        return packed
+
+    def describe(self) -> Dict[str, Any]:
+        turns = self.stats["turns"]
+        return {
+            "model": self.model,
+            "encoding": getattr(get_encoding(self.model), "name", "estimate"),
+            "budget": self.budget,
+            "per_doc_tokens": self.per_doc_tokens,
+            **self.stats,
+            "avg_packed_tokens": round(self.stats["packed_tokens"] / turns, 1) if turns else None,
+        }
+
+
+marketing_context_packer = ContextPacker(
+    name="marketing",
+    model=settings.LLM_MODEL,
+    budget=settings.CONTEXT_MARKETING_TOKENS,
+    per_doc_tokens=settings.CONTEXT_MARKETING_DOC_TOKENS,
+)
+guidance_context_packer = ContextPacker(
+    name="guidance",
+    model=settings.GUIDANCE_LLM_MODEL,  # openai_service.get_guidance_model 과 같은 설정
+    budget=settings.CONTEXT_GUIDANCE_TOKENS,
+    per_doc_tokens=settings.CONTEXT_GUIDANCE_DOC_TOKENS,
+)
+
+# 이름 -> packer (/agent/stats 노출용)
+context_packers: Dict[str, ContextPacker] = {
+    p.name: p for p in (marketing_context_packer, guidance_context_packer)
+}
+
+
+async def warm_context_packers() -> Dict[str, Optional[str]]:
+    """
+    startup 훅: 모든 packer의 tiktoken 인코딩을 스레드에서 로드 (첫 턴에 이벤트 루프가 다운로드로 막히지 않도록)
+    """
+    return {name: await asyncio.to_thread(p.warm) for name, p in context_packers.items()}
@@ -0,0 +1,220 @@
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_qdrant.sparse_embeddings import SparseEmbeddings, SparseVector
+
+from app.core.config import settings
+from app.utils import ws_codec
+
+logger = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str]
+
+
+def normalize_text(text: str) -> str:
+    """
+    캐시 키용 정규화: 유니코드 NFC + 공백 정리 (STT가 만드는 공백/조합형 차이로 캐시가 갈라지지 않도록)
+    """
+    return " ".join(unicodedata.normalize("NFC", text or "").split())
+
+
+class EmbeddingCache:
+    """
+    프로세스 공용 임베딩 캐시 (key = (모델 이름, 정규화된 텍스트), LRU 크기 제한)
+    - dense 벡터는 float32 ndarray, sparse 벡터는 (indices, values) 튜플로 보관
+    - persist_path가 있으면 시작 시 읽고 save() 때 기록 (warm start)
+    - FastEmbed 호출이 asyncio.to_thread 에서도 일어나므로 lock으로 보호
+    """
+
+    def __init__(self, max_entries: int = 10000, persist_path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self._data: "OrderedDict[CacheKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._dirty = False
+        self.stats: Dict[str, Dict[str, int]] = {}
+
+    def _counter(self, model: str) -> Dict[str, int]:
+        counter = self.stats.get(model)
+        if counter is None:
+            counter = self.stats[model] = {"hits": 0, "misses": 0}
+        return counter
+
+    def get(self, model: str, text: str) -> Any:
+        key = (model, normalize_text(text))
+        with self._lock:
+            value = self._data.get(key)
+            counter = self._counter(model)
+            if value is None:
+                counter["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            counter["hits"] += 1
+            return value
+
+    def put(self, model: str, text: str, value: Any) -> None:
+        key = (model, normalize_text(text))
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+            self._dirty = True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._dirty = True
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            per_model = {m: dict(c) for m, c in self.stats.items()}
+            size = len(self._data)
+        hits = sum(c["hits"] for c in per_model.values())
+        misses = sum(c["misses"] for c in per_model.values())
+        return {
+            "entries": size,
+            "max_entries": self.max_entries,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "persist_path": self.persist_path,
+            "models": per_model,
+        }
+
+    # -------------------------
+    # Disk persistence
+    # -------------------------
+
+    def load(self) -> int:
+        if not self.persist_path or not os.path.exists(self.persist_path):
+            return 0
+        try:
+            with open(self.persist_path, "rb") as f:
+                rows = ws_codec.loads(f.read())
+        except Exception as e:
+            logger.warning(f"[EmbeddingCache] failed to load {self.persist_path}: {e}")
+            return 0
+        with self._lock:
+            for model, text, kind, payload in rows[-self.max_entries:]:
+                if kind == "sparse":
+                    value = (tuple(payload[0]), tuple(payload[1]))
+                else:
+                    value = np.asarray(payload, dtype=np.float32)
+                self._data[(model, text)] = value
+            self._dirty = False
+        logger.info(f"[EmbeddingCache] loaded {len(rows)} embeddings from {self.persist_path}")
+        return len(rows)
+
+    def save(self) -> int:
+        if not self.persist_path or not self._dirty:
+            return 0
+        with self._lock:
+            rows = [
+                (model, text, "sparse", value) if isinstance(value, tuple) else (model, text, "dense", value)
+                for (model, text), value in self._data.items()
+            ]
+            self._dirty = False
+        directory = os.path.dirname(self.persist_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.persist_path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(ws_codec.dumps(rows))
+        os.replace(tmp, self.persist_path)
+        return len(rows)
+
+
+def _model_name(embeddings: Any) -> str:
+    name = getattr(embeddings, "model_name", None) or getattr(embeddings, "model", None)
+    return f"{type(embeddings).__name__}:{name or 'default'}"
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    LangChain Embeddings 래퍼 - 벡터스토어/검색 엔진에 그대로 넘기면 모든 호출부가 캐시를 탑니다.
+    cache_documents=False: 문서 적재(ingestion)용 embed_documents는 캐시를 거치지 않음
+    (한 번 쓰고 마는 청크 벡터가 자주 쓰는 쿼리 벡터를 LRU에서 밀어내지 않도록, 쿼리만 캐시)
+    """
+
+    def __init__(self, inner: Embeddings, cache: Optional[EmbeddingCache] = None, cache_documents: bool = True):
+        self.inner = inner
+        self.cache = cache or embedding_cache
+        self.model_name = _model_name(inner)
+        self.cache_documents = cache_documents
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if not self.cache_documents:
+            return self.inner.embed_documents(texts)
+        out: List[Optional[List[float]]] = []
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            hit = self.cache.get(self.model_name, text)
+            out.append(hit.tolist() if hit is not None else None)
+            if hit is None:
+                missing.append(i)
+        if missing:
+            vectors = self.inner.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                out[i] = self._store(texts[i], vector)
+        return out
+
+    def embed_query(self, text: str) -> List[float]:
+        hit = self.cache.get(self.model_name, text)
+        if hit is not None:
+            return hit.tolist()
+        return self._store(text, self.inner.embed_query(text))
+
+    def _store(self, text: str, vector: List[float]) -> List[float]:
+        # 캐시 적중 여부와 상관없이 같은 값을 돌려주도록 float32 로 맞춘 값을 반환
+        arr = np.asarray(vector, dtype=np.float32)
+        self.cache.put(self.model_name, text, arr)
+        return arr.tolist()
+
+
+class CachedSparseEmbeddings(SparseEmbeddings):
+    def __init__(self, inner: SparseEmbeddings, cache: Optional[EmbeddingCache] = None):
+        self.inner = inner
+        self.cache = cache or embedding_cache
+        self.model_name = _model_name(inner)
+
+    def _store(self, text: str, vector: SparseVector) -> None:
+        self.cache.put(self.model_name, text, (tuple(vector.indices), tuple(vector.values)))
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        out: List[Optional[SparseVector]] = []
+        missing: List[int] = []
+        for i, text in enumerate(texts):
+            hit = self.cache.get(self.model_name, text)
+            out.append(
+                SparseVector(indices=list(hit[0]), values=list(hit[1])) if hit is not None else None
+            )
+            if hit is None:
+                missing.append(i)
+        if missing:
+            vectors = self.inner.embed_documents([texts[i] for i in missing])
+            for i, vector in zip(missing, vectors):
+                self._store(texts[i], vector)
+                out[i] = vector
+        return out
+
+    def embed_query(self, text: str) -> SparseVector:
+        hit = self.cache.get(self.model_name, text)
+        if hit is not None:
+            return SparseVector(indices=list(hit[0]), values=list(hit[1]))
+        vector = self.inner.embed_query(text)
+        self._store(text, vector)
+        return vector
+
+
+embedding_cache = EmbeddingCache(
+    max_entries=settings.EMBEDDING_CACHE_SIZE,
+    persist_path=settings.EMBEDDING_CACHE_PATH,
+)
+embedding_cache.load()
@@ -1,16 +1,30 @@
 from langchain_core.messages import HumanMessage, AIMessage, BaseMessage
 from app.agent.guidance.graph import build_graph
+from app.services.call_session_registry import (
+    call_session_registry,
+    checkpointer_thread_size,
+    delete_checkpointer_thread,
+)
 
 # 그래프 초기화 (서버 시작 시 1회)
 graph = build_graph()
 
-async def handle_guidance_message(turn: dict, session_id: str, customer_info: dict = None):
+# [NEW] 통화 종료/유휴 만료 시 MemorySaver thread 정리
+call_session_registry.register(
+    "guidance",
+    lambda session_id: delete_checkpointer_thread(graph.checkpointer, session_id),
+    size_probe=lambda session_id: checkpointer_thread_size(graph.checkpointer, session_id),
+)
+
+async def handle_guidance_message(turn: dict, session_id: str, customer_info: dict = None, record_only: bool = False, on_delta=None):
     """
     Guidance Agent 그래프를 실행하거나 받아온 메시지로 상태를 업데이트합니다.
     Args:
         turn: 단일 턴 데이터 {"speaker": "...", "transcript": "...", "turn_id": ...}
         session_id: 대화 세션 ID (thread_id로 사용)
         customer_info: 고객 정보 (첫 턴에만 전달됨)
+        record_only: True면 그래프를 실행하지 않고 State에만 적재 (stale 턴 폐기 시)
+        on_delta: 추천 멘트 스트리밍 콜백 (async, result_delta 이벤트 dict를 받음)
     """
     speaker = turn.get("speaker")
     transcript = turn.get("transcript", "")
@@ -36,8 +50,9 @@ async def handle_guidance_message(turn: dict, session_id: str, customer_info: di
     config = {"configurable": {"thread_id": session_id}}
 
     # 로직 분기
-    if speaker == "agent":
+    if speaker == "agent" or record_only:
         # 상담사 발화는 분석하지 않고 State에만 적재 (비용/속도 효율)
+        # [NEW] 폐기된 고객 턴도 동일하게 적재만 함 (message id가 turn_id라 중복 적재되지 않음)
         state_update = {"message": [message_obj]}
         if customer_info:
              state_update["customer_info"] = customer_info
@@ -64,6 +79,8 @@ async def handle_guidance_message(turn: dict, session_id: str, customer_info: di
         if customer_info:
             inputs["customer_info"] = customer_info
             
+        if on_delta is not None:
+            config["configurable"]["on_delta"] = on_delta
         result = await graph.ainvoke(inputs, config=config)
         
         # [DEBUG] 메시지 적재 확인
@@ -0,0 +1,283 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional, Set
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:  # HTTP/2는 h2 패키지가 있어야 함 (requirements.txt), 없으면 HTTP/1.1 keep-alive 풀로 동작
+    import h2  # noqa: F401
+
+    _H2_AVAILABLE = True
+except ImportError:
+    _H2_AVAILABLE = False
+
+
+def _retryable(status: int) -> bool:
+    return status == 429 or status >= 500
+
+
+class LLMHttpClient:
+    """
+    OpenAI 호환 LLM 엔드포인트용 프로세스 공용 HTTP 클라이언트
+    - 장수명 httpx.AsyncClient (HTTP/2 + keep-alive 풀): chat_json의 본 요청/length 재시도/JSON 복구가
+      같은 커넥션을 재사용 (호출마다 TCP/TLS 핸드셰이크 없음)
+    - 시도마다 별도 타임아웃, 429/5xx/전송 오류는 지터 지수 백오프로 재시도 (Retry-After 우선)
+    - 호출 전체(시도 + 백오프)는 LLM_CALL_DEADLINE 안에서 끝남: 남은 시간이 시도 타임아웃을 줄이고,
+      백오프 후 남는 시간이 없으면 재시도하지 않음
+    - purpose(initial / length_retry / json_repair / fallback ...)별 시도 지연/재시도 수 집계 (/agent/stats llm_http)
+    """
+
+    def __init__(self):
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.http2 = settings.LLM_HTTP2 and _H2_AVAILABLE
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._closing: Set[asyncio.Task] = set()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._loop is not loop:
+            # (다른 이벤트 루프에서 만든 커넥션은 재사용할 수 없음: 스크립트/벤치마크의 asyncio.run 반복)
+            if self._client is not None and not self._client.is_closed:
+                self._discard(self._client, self._loop)
+            self._client = httpx.AsyncClient(
+                http2=self.http2,
+                timeout=httpx.Timeout(settings.LLM_ATTEMPT_TIMEOUT, connect=settings.LLM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+            self._loop = loop
+        return self._client
+
+    def _discard(self, client: httpx.AsyncClient, loop: Optional[asyncio.AbstractEventLoop]):
+        """
+        이전 루프에서 만든 클라이언트 정리. 그 루프가 (다른 스레드에서) 돌고 있으면 거기서 닫고,
+        이미 끝난 루프면 현재 루프에서 닫되 죽은 루프에 묶인 소켓 정리 오류는 무시
+        """
+        if loop is not None and loop.is_running() and not loop.is_closed():
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop)
+            return
+
+        async def close():
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.debug(f"[LLMHttp] closing client from a finished loop: {e}")
+
+        task = asyncio.get_running_loop().create_task(close())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _counter(self, purpose: str) -> Dict[str, Any]:
+        counter = self.stats.get(purpose)
+        if counter is None:
+            counter = self.stats[purpose] = {
+                "calls": 0,
+                "attempts": 0,
+                "retries": 0,
+                "timeouts": 0,
+                "errors": 0,
+                "deadline_exceeded": 0,
+                "status": {},
+                "total_ms": 0.0,
+                "max_ms": 0.0,
+            }
+            self._latencies[purpose] = deque(maxlen=512)
+        return counter
+
+    def _record(self, purpose: str, elapsed: float, status: Optional[int] = None, error: Optional[str] = None):
+        counter = self._counter(purpose)
+        ms = elapsed * 1000
+        counter["attempts"] += 1
+        counter["total_ms"] += ms
+        counter["max_ms"] = max(counter["max_ms"], ms)
+        self._latencies[purpose].append(ms)
+        if status is not None:
+            key = str(status)
+            counter["status"][key] = counter["status"].get(key, 0) + 1
+        if error == "timeout":
+            counter["timeouts"] += 1
+        elif error:
+            counter["errors"] += 1
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response]) -> float:
+        if response is not None:
+            retry_after = response.headers.get("retry-after")
+            try:
+                if retry_after is not None:
+                    return min(float(retry_after), settings.LLM_RETRY_BACKOFF_MAX)
+            except ValueError:
+                pass
+        # full jitter: 0 ~ min(max, base * 2^attempt)
+        cap = min(settings.LLM_RETRY_BACKOFF_MAX, settings.LLM_RETRY_BACKOFF * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def _retry_delay(
+        self, purpose: str, attempt: int, response: Optional[httpx.Response], deadline: float
+    ) -> Optional[float]:
+        """다음 시도 전 대기 시간. 대기 후 호출 deadline까지 남는 시간이 없으면 None (재시도 포기)"""
+        delay = self._backoff(attempt, response)
+        if time.monotonic() + delay >= deadline:
+            self.stats[purpose]["deadline_exceeded"] += 1
+            return None
+        return delay
+
+    @staticmethod
+    def _attempt_timeout(timeout: float, deadline: float) -> float:
+        return max(0.001, min(timeout, deadline - time.monotonic()))
+
+    async def post(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        purpose: str = "initial",
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> httpx.Response:
+        """
+        재시도 가능한 실패(429/5xx/타임아웃/전송 오류)는 백오프 후 다시 보냄.
+        마지막 시도의 응답은 상태 코드와 상관없이 그대로 반환 (호출부가 기존처럼 raise_for_status).
+        deadline(기본 LLM_CALL_DEADLINE)을 넘겨 재시도할 수 없으면 그 시점의 결과가 마지막 시도
+        """
+        cx = self._get_client()
+        timeout = timeout or settings.LLM_ATTEMPT_TIMEOUT
+        deadline = time.monotonic() + (deadline or settings.LLM_CALL_DEADLINE)
+        retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._counter(purpose)["calls"] += 1
+
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            if attempt:
+                self.stats[purpose]["retries"] += 1
+            t0 = time.perf_counter()
+            try:
+                r = await asyncio.wait_for(
+                    cx.post(url, headers=headers, json=payload), self._attempt_timeout(timeout, deadline)
+                )
+            except (asyncio.TimeoutError, httpx.TransportError) as e:
+                error = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                self._record(purpose, time.perf_counter() - t0, error=error)
+                delay = None if last else self._retry_delay(purpose, attempt, None, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            self._record(purpose, time.perf_counter() - t0, status=r.status_code)
+            if last or not _retryable(r.status_code):
+                return r
+            delay = self._retry_delay(purpose, attempt, r, deadline)
+            if delay is None:
+                return r
+            logger.warning(f"[LLMHttp] {purpose} HTTP {r.status_code}, retry {attempt + 1}/{retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+    async def stream(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        payload: Dict[str, Any],
+        purpose: str = "stream",
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """
+        SSE 스트리밍 응답(payload["stream"]=True)의 data: 줄 내용을 순서대로 yield ("[DONE]"에서 종료).
+        응답 헤더를 받기 전까지만 post()와 같은 재시도, 시도 지연은 첫 바이트(헤더)까지로 집계.
+        스트림 중간의 끊김은 그대로 raise (이미 흘려보낸 조각이 있어 재시도하지 않음).
+        deadline(기본 LLM_CALL_DEADLINE)은 헤더를 받기까지에만 적용 (본문은 시도 타임아웃이 읽기마다 적용)
+        """
+        cx = self._get_client()
+        timeout = timeout or settings.LLM_ATTEMPT_TIMEOUT
+        deadline = time.monotonic() + (deadline or settings.LLM_CALL_DEADLINE)
+        retries = settings.LLM_MAX_RETRIES if max_retries is None else max_retries
+        self._counter(purpose)["calls"] += 1
+
+        r: Optional[httpx.Response] = None
+        for attempt in range(retries + 1):
+            last = attempt == retries
+            if attempt:
+                self.stats[purpose]["retries"] += 1
+            t0 = time.perf_counter()
+            request = cx.build_request("POST", url, headers=headers, json=payload)
+            try:
+                r = await asyncio.wait_for(cx.send(request, stream=True), self._attempt_timeout(timeout, deadline))
+            except (asyncio.TimeoutError, httpx.TransportError) as e:
+                error = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                self._record(purpose, time.perf_counter() - t0, error=error)
+                delay = None if last else self._retry_delay(purpose, attempt, None, deadline)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+
+            self._record(purpose, time.perf_counter() - t0, status=r.status_code)
+            if last or not _retryable(r.status_code):
+                break
+            delay = self._retry_delay(purpose, attempt, r, deadline)
+            if delay is None:
+                break
+            await r.aclose()
+            logger.warning(f"[LLMHttp] {purpose} HTTP {r.status_code}, retry {attempt + 1}/{retries} in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+        try:
+            if r.status_code >= 400:
+                await r.aread()
+                r.raise_for_status()
+            async for line in r.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                if data:
+                    yield data
+        finally:
+            await r.aclose()
+
+    def describe(self) -> Dict[str, Any]:
+        purposes = {}
+        for purpose, counter in self.stats.items():
+            lat = sorted(self._latencies[purpose])
+            attempts = counter["attempts"]
+            purposes[purpose] = {
+                **counter,
+                "total_ms": round(counter["total_ms"], 1),
+                "max_ms": round(counter["max_ms"], 1),
+                "avg_ms": round(counter["total_ms"] / attempts, 1) if attempts else None,
+                "p50_ms": round(lat[len(lat) // 2], 1) if lat else None,
+                "p95_ms": round(lat[int(len(lat) * 0.95)], 1) if lat else None,
+            }
+        return {
+            "http2": self.http2,
+            "max_connections": settings.LLM_HTTP_MAX_CONNECTIONS,
+            "max_keepalive": settings.LLM_HTTP_MAX_KEEPALIVE,
+            "attempt_timeout": settings.LLM_ATTEMPT_TIMEOUT,
+            "call_deadline": settings.LLM_CALL_DEADLINE,
+            "max_retries": settings.LLM_MAX_RETRIES,
+            "purposes": purposes,
+        }
+
+
+llm_http_client = LLMHttpClient()
@@ -0,0 +1,385 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client import models
+from qdrant_client.http.models import QueryResponse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedQuery(Exception):
+    """
+    로컬 인덱스가 처리하지 않는 요청 (다른 필터/거리 함수 등) -> 호출부가 원격 Qdrant로 대체
+    """
+
+
+@dataclass
+class _Snapshot:
+    ids: List[Any]
+    payloads: List[Dict[str, Any]]
+    dense: Optional[np.ndarray]  # (N, D) float32, Cosine이면 행 정규화 상태
+    distance: Optional[models.Distance]
+    postings: Dict[int, Tuple[np.ndarray, np.ndarray]]  # term id -> (doc idx, value)
+    idf: Optional[Dict[int, float]]  # sparse modifier=IDF 일 때만
+    categories: Dict[str, np.ndarray]  # category -> doc idx
+    loaded_at: float = field(default_factory=time.time)
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+
+def _payload_value(payload: Dict[str, Any], dotted_key: str) -> Any:
+    node: Any = payload
+    for part in dotted_key.split("."):
+        if not isinstance(node, dict):
+            return None
+        node = node.get(part)
+    return node
+
+
+def _top_k(idx: np.ndarray, scores: np.ndarray, k: int) -> List[Tuple[int, float]]:
+    if k <= 0 or idx.size == 0:
+        return []
+    if idx.size > k:
+        part = np.argpartition(-scores, k - 1)[:k]
+        idx, scores = idx[part], scores[part]
+    order = np.lexsort((idx, -scores))  # 점수 내림차순, 동점이면 적재 순서
+    return [(int(idx[i]), float(scores[i])) for i in order]
+
+
+class LocalVectorIndex:
+    """
+    작은 정적 컬렉션(cs_guideline)의 프로세스 내 사본.
+    - dense: NumPy 행렬 내적 (Cosine/Dot)
+    - sparse: term -> posting 역색인 + (modifier=IDF면) Qdrant와 같은 BM25 IDF
+    - 필터는 category_key 단일 MatchValue만 지원, 나머지는 UnsupportedQuery -> 원격 Qdrant
+    query_points()는 QdrantClient.query_points 와 같은 인자/응답 형태라 검색 엔진이 그대로 바꿔 끼울 수 있습니다.
+    """
+
+    RRF_K = 2  # qdrant 기본 ranking constant
+
+    def __init__(
+        self,
+        client: Any,
+        collection: str,
+        vector_name: str = "dense",
+        sparse_vector_name: str = "sparse",
+        category_key: str = "metadata.category",
+        refresh_interval: float = 600.0,
+        max_points: int = 50000,
+    ):
+        self.client = client
+        self.collection = collection
+        self.vector_name = vector_name
+        self.sparse_vector_name = sparse_vector_name
+        self.category_key = category_key
+        self.refresh_interval = refresh_interval
+        self.max_points = max_points
+        self._snapshot: Optional[_Snapshot] = None
+        self._task: Optional[asyncio.Task] = None
+        self.stats = {"loads": 0, "load_errors": 0, "queries": 0, "unsupported": 0, "query_ms_total": 0.0}
+
+    @property
+    def ready(self) -> bool:
+        return self._snapshot is not None
+
+    # -------------------------
+    # Snapshot (scroll 전체 -> 새 스냅샷을 만든 뒤 한 번에 교체)
+    # -------------------------
+
+    def load(self) -> int:
+        info = self.client.get_collection(self.collection)
+        params = info.config.params
+        vectors_cfg = params.vectors if isinstance(params.vectors, dict) else {"": params.vectors}
+        dense_cfg = vectors_cfg.get(self.vector_name)
+        sparse_cfg = (params.sparse_vectors or {}).get(self.sparse_vector_name)
+
+        wanted = [n for n, cfg in ((self.vector_name, dense_cfg), (self.sparse_vector_name, sparse_cfg)) if cfg]
+        ids, payloads, dense_rows = [], [], []
+        term_docs: Dict[int, List[int]] = {}
+        term_vals: Dict[int, List[float]] = {}
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.collection,
+                limit=512,
+                offset=offset,
+                with_payload=True,
+                with_vectors=wanted or False,
+            )
+            for p in points:
+                i = len(ids)
+                ids.append(p.id)
+                payloads.append(p.payload or {})
+                vec = p.vector or {}
+                if dense_cfg is not None:
+                    dense_rows.append(vec.get(self.vector_name) or [0.0] * dense_cfg.size)
+                sv = vec.get(self.sparse_vector_name) if sparse_cfg is not None else None
+                if sv is not None:
+                    for t, v in zip(sv.indices, sv.values):
+                        term_docs.setdefault(t, []).append(i)
+                        term_vals.setdefault(t, []).append(v)
+            if len(ids) > self.max_points:
+                raise RuntimeError(f"collection too large to mirror ({len(ids)} > {self.max_points})")
+            if offset is None:
+                break
+
+        dense = None
+        if dense_cfg is not None and dense_rows:
+            dense = np.asarray(dense_rows, dtype=np.float32)
+            if dense_cfg.distance == models.Distance.COSINE:
+                norms = np.linalg.norm(dense, axis=1, keepdims=True)
+                dense = dense / np.where(norms == 0, 1.0, norms)
+
+        postings = {
+            t: (np.asarray(term_docs[t], dtype=np.int64), np.asarray(term_vals[t], dtype=np.float32))
+            for t in term_docs
+        }
+        idf = None
+        if sparse_cfg is not None and sparse_cfg.modifier == models.Modifier.IDF:
+            n = len(ids)
+            idf = {t: float(np.log((n - len(d) + 0.5) / (len(d) + 0.5) + 1.0)) for t, d in term_docs.items()}
+
+        by_cat: Dict[str, List[int]] = {}
+        for i, payload in enumerate(payloads):
+            cat = _payload_value(payload, self.category_key)
+            if isinstance(cat, str):
+                by_cat.setdefault(cat, []).append(i)
+
+        self._snapshot = _Snapshot(
+            ids=ids,
+            payloads=payloads,
+            dense=dense,
+            distance=dense_cfg.distance if dense_cfg is not None else None,
+            postings=postings,
+            idf=idf,
+            categories={c: np.asarray(v, dtype=np.int64) for c, v in by_cat.items()},
+        )
+        self.stats["loads"] += 1
+        return len(ids)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.wait({self._task})
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                n = await asyncio.to_thread(self.load)
+                logger.info(f"[LocalIndex] '{self.collection}' mirrored ({n} points)")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # 이전 스냅샷이 있으면 그대로 사용, 없으면 원격 Qdrant로 계속 검색
+                self.stats["load_errors"] += 1
+                logger.warning(f"[LocalIndex] '{self.collection}' refresh failed: {e}")
+            await asyncio.sleep(self.refresh_interval)
+
+    # -------------------------
+    # Query
+    # -------------------------
+
+    def _candidates(self, snap: _Snapshot, flt: Optional[models.Filter]) -> Optional[np.ndarray]:
+        if flt is None:
+            return None
+        conds = flt.must if isinstance(flt.must, list) else [flt.must]
+        if flt.should or flt.must_not or len(conds) != 1:
+            raise UnsupportedQuery("only a single category filter is mirrored")
+        cond = conds[0]
+        if (
+            not isinstance(cond, models.FieldCondition)
+            or cond.key != self.category_key
+            or not isinstance(cond.match, models.MatchValue)
+        ):
+            raise UnsupportedQuery(f"unsupported filter condition: {cond}")
+        return snap.categories.get(cond.match.value, np.empty(0, dtype=np.int64))
+
+    def _dense(self, snap: _Snapshot, query: Sequence[float], cand: Optional[np.ndarray], k: int):
+        if snap.dense is None or snap.distance not in (models.Distance.COSINE, models.Distance.DOT):
+            raise UnsupportedQuery(f"dense distance not mirrored: {snap.distance}")
+        q = np.asarray(query, dtype=np.float32)
+        if snap.distance == models.Distance.COSINE:
+            norm = float(np.linalg.norm(q))
+            q = q / norm if norm else q
+        idx = np.arange(snap.size) if cand is None else cand
+        matrix = snap.dense if cand is None else snap.dense[cand]
+        return _top_k(idx, matrix @ q, k)
+
+    def _sparse(self, snap: _Snapshot, query: models.SparseVector, cand: Optional[np.ndarray], k: int):
+        scores = np.zeros(snap.size, dtype=np.float32)
+        touched = np.zeros(snap.size, dtype=bool)
+        for t, qv in zip(query.indices, query.values):
+            posting = snap.postings.get(t)
+            if posting is None:
+                continue
+            if snap.idf is not None:
+                qv = qv * snap.idf[t]
+            docs, vals = posting
+            scores[docs] += qv * vals
+            touched[docs] = True
+        if cand is not None:
+            mask = np.zeros(snap.size, dtype=bool)
+            mask[cand] = True
+            touched &= mask
+        idx = np.flatnonzero(touched)
+        return _top_k(idx, scores[idx], k)
+
+    def _run(self, snap: _Snapshot, query: Any, using: Optional[str], flt, k: int):
+        cand = self._candidates(snap, flt)
+        if isinstance(query, models.SparseVector):
+            if using != self.sparse_vector_name:
+                raise UnsupportedQuery(f"sparse vector '{using}' not mirrored")
+            return self._sparse(snap, query, cand, k)
+        if isinstance(query, (list, np.ndarray)):
+            if using != self.vector_name:
+                raise UnsupportedQuery(f"dense vector '{using}' not mirrored")
+            return self._dense(snap, query, cand, k)
+        raise UnsupportedQuery(f"unsupported query type: {type(query).__name__}")
+
+    def _fuse(self, fusion: models.Fusion, results: List[List[Tuple[int, float]]], k: int):
+        fused: Dict[int, float] = {}
+        if fusion == models.Fusion.RRF:
+            for hits in results:
+                for rank, (i, _score) in enumerate(hits):
+                    fused[i] = fused.get(i, 0.0) + 1.0 / (self.RRF_K + rank)
+        elif fusion == models.Fusion.DBSF:
+            for hits in results:
+                if not hits:
+                    continue
+                scores = np.asarray([s for _i, s in hits], dtype=np.float64)
+                if len(hits) == 1 or scores.std(ddof=1) == 0:
+                    normed = np.full(len(hits), 0.5)
+                else:
+                    low = scores.mean() - 3 * scores.std(ddof=1)
+                    high = scores.mean() + 3 * scores.std(ddof=1)
+                    normed = (scores - low) / (high - low)
+                for (i, _s), n in zip(hits, normed):
+                    fused[i] = fused.get(i, 0.0) + float(n)
+        else:
+            raise UnsupportedQuery(f"unsupported fusion: {fusion}")
+        return sorted(fused.items(), key=lambda kv: kv[1], reverse=True)[:k]
+
+    def _point(self, snap: _Snapshot, i: int, score: float, with_payload: Any) -> models.ScoredPoint:
+        payload = None
+        if with_payload:
+            # Document 변환 시 metadata에 _id 등을 써넣으므로 스냅샷 원본은 복사해서 넘김
+            src = snap.payloads[i]
+            payload = {**src}
+            if isinstance(src.get("metadata"), dict):
+                payload["metadata"] = dict(src["metadata"])
+        return models.ScoredPoint(id=snap.ids[i], version=0, score=score, payload=payload)
+
+    def query_points(
+        self,
+        collection_name: Optional[str] = None,
+        query: Any = None,
+        using: Optional[str] = None,
+        prefetch: Optional[List[models.Prefetch]] = None,
+        query_filter: Optional[models.Filter] = None,
+        limit: int = 10,
+        with_payload: Any = True,
+        with_vectors: Any = False,
+        **kwargs: Any,
+    ) -> QueryResponse:
+        snap = self._snapshot
+        if snap is None:
+            raise UnsupportedQuery("local index not loaded")
+        if collection_name not in (None, self.collection) or with_vectors or kwargs.get("offset"):
+            raise UnsupportedQuery("request shape not mirrored")
+        started = time.perf_counter()
+        try:
+            if prefetch:
+                if not isinstance(query, models.FusionQuery):
+                    raise UnsupportedQuery("only fusion queries over prefetch are mirrored")
+                if any(p.prefetch for p in prefetch):
+                    raise UnsupportedQuery("nested prefetch is not mirrored")
+                results = [self._run(snap, p.query, p.using, p.filter, p.limit or 10) for p in prefetch]
+                hits = self._fuse(query.fusion, results, limit)
+                cand = self._candidates(snap, query_filter)
+                if cand is not None:
+                    allowed = set(cand.tolist())
+                    hits = [h for h in hits if h[0] in allowed]
+            else:
+                hits = self._run(snap, query, using, query_filter, limit)
+        except UnsupportedQuery:
+            self.stats["unsupported"] += 1
+            raise
+        self.stats["queries"] += 1
+        self.stats["query_ms_total"] += (time.perf_counter() - started) * 1000
+        return QueryResponse(points=[self._point(snap, i, s, with_payload) for i, s in hits])
+
+    def query_batch_points(
+        self, collection_name: Optional[str] = None, requests: Sequence[models.QueryRequest] = (), **kwargs: Any
+    ) -> List[QueryResponse]:
+        return [
+            self.query_points(
+                collection_name,
+                query=r.query,
+                using=r.using,
+                prefetch=r.prefetch if isinstance(r.prefetch, list) or r.prefetch is None else [r.prefetch],
+                query_filter=r.filter,
+                limit=r.limit or 10,
+                with_payload=r.with_payload if r.with_payload is not None else False,
+                with_vectors=r.with_vector or False,
+                offset=r.offset,
+            )
+            for r in requests
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        snap = self._snapshot
+        queries = self.stats["queries"]
+        return {
+            "ready": snap is not None,
+            "points": snap.size if snap else 0,
+            "loaded_at": snap.loaded_at if snap else None,
+            "refresh_interval": self.refresh_interval,
+            **{k: v for k, v in self.stats.items() if k != "query_ms_total"},
+            "avg_query_ms": round(self.stats["query_ms_total"] / queries, 4) if queries else None,
+        }
+
+
+# collection 이름 -> 인덱스 (guidance / marketing 이 같은 컬렉션이면 사본 하나를 공유)
+local_indexes: Dict[str, LocalVectorIndex] = {}
+
+
+def get_local_index(client: Any, collection: str, **kwargs: Any) -> Optional[LocalVectorIndex]:
+    """
+    LOCAL_INDEX_ENABLED=false 면 None. 실제 적재는 start_local_indexes() (startup) 에서 백그라운드로 진행되며
+    적재 전/실패 시에는 ready=False -> 호출부가 원격 Qdrant를 사용합니다.
+    """
+    if not settings.LOCAL_INDEX_ENABLED:
+        return None
+    index = local_indexes.get(collection)
+    if index is None:
+        index = local_indexes[collection] = LocalVectorIndex(
+            client,
+            collection,
+            refresh_interval=settings.LOCAL_INDEX_REFRESH_INTERVAL,
+            max_points=settings.LOCAL_INDEX_MAX_POINTS,
+            **kwargs,
+        )
+    return index
+
+
+async def start_local_indexes() -> None:
+    for index in local_indexes.values():
+        await index.start()
+
+
+async def stop_local_indexes() -> None:
+    for index in local_indexes.values():
+        await index.stop()
@@ -2,22 +2,89 @@
 import sys
 import os
 import asyncio
+import time
 from typing import Dict, Any, Optional
 
-from app.agent.marketing.session import build_session, MarketingSession
+from app.core.config import settings
+from app.agent.marketing.session import build_session, MarketingSession, safe_str
 from app.agent.marketing.graph import build_marketing_graph
+from app.agent.marketing.nodes import build_analysis_prompt
 from langchain_core.messages import HumanMessage, AIMessage
+from app.services.call_session_registry import (
+    call_session_registry,
+    approx_size,
+    checkpointer_thread_size,
+    delete_checkpointer_thread,
+)
 
 # Initialize Graph Once (Global)
 marketing_graph = build_marketing_graph()
 
+# [NEW] 고객 턴 라우팅 단계 집계 (MARKETING_PIPELINE legacy/combined 비교용, /agent/stats marketing_pipeline)
+PIPELINE_STATS: Dict[str, Dict[str, Any]] = {}
+
+
+def _record_route(pipeline: str, source: str, elapsed: float, opportunity: bool) -> None:
+    stats = PIPELINE_STATS.setdefault(
+        pipeline, {"turns": 0, "opportunities": 0, "route_seconds": 0.0, "sources": {}}
+    )
+    stats["turns"] += 1
+    stats["opportunities"] += int(bool(opportunity))
+    stats["route_seconds"] += elapsed
+    stats["sources"][source] = stats["sources"].get(source, 0) + 1
+
+
+def pipeline_stats() -> Dict[str, Any]:
+    out: Dict[str, Any] = {"mode": settings.MARKETING_PIPELINE}
+    for pipeline, stats in PIPELINE_STATS.items():
+        out[pipeline] = {
+            **stats,
+            "route_seconds": round(stats["route_seconds"], 3),
+            "avg_route_ms": round(stats["route_seconds"] / stats["turns"] * 1000, 1) if stats["turns"] else None,
+        }
+    return out
+
+
 # Global session storage for the service
 # Map: session_id -> MarketingSession
 _sessions: Dict[str, MarketingSession] = {}
 
-async def handle_marketing_message(turn: dict, session_id: str, customer_info: dict = None):
+
+def clear_session(session_id: str):
+    # 세션 객체(대화 이력, 세션 전용 그래프 포함)와 공용 그래프의 체크포인트 thread 제거
+    _sessions.pop(session_id, None)
+    delete_checkpointer_thread(marketing_graph.checkpointer, session_id)
+
+
+def session_size(session_id: str) -> int:
+    size = checkpointer_thread_size(marketing_graph.checkpointer, session_id)
+    session = _sessions.get(session_id)
+    if session is not None:
+        size += approx_size(session.turns)
+        size += checkpointer_thread_size(getattr(session.graph, "checkpointer", None), session_id)
+    return size
+
+
+call_session_registry.register("marketing", clear_session, size_probe=session_size)
+
+
+def handle_partial_transcript(turn: dict, session_id: str) -> bool:
+    """
+    [NEW] 고객 발화 중간(partial/interim STT)에 트리거 키워드가 보이면 Qdrant 검색을 미리 시작.
+    최종 턴의 retrieve_node가 쿼리 지문이 같을 때 결과를 재사용합니다.
+    """
+    session = _sessions.get(session_id)
+    if session is None or turn.get("speaker") != "customer":
+        return False
+    transcript = turn.get("transcript") or ""
+    if not session.gatekeeper.has_opportunity(transcript):
+        return False
+    return session.start_prefetch(transcript)
+
+async def handle_marketing_message(turn: dict, session_id: str, customer_info: dict = None, record_only: bool = False, on_delta=None):
     """
     AgentManager compliant handler for Marketing AI.
+    record_only=True: only sync the turn into session history (superseded turns).
     """
     global _sessions
     
@@ -43,6 +110,20 @@ async def handle_marketing_message(turn: dict, session_id: str, customer_info: d
             
     session = _sessions[session_id]
     
+    # [NEW] Superseded turn: keep dialogue context, skip routing/graph entirely
+    if record_only:
+        sp = "customer" if speaker == "customer" else "agent"
+        already = turn_id is not None and any(
+            t.turn_id == turn_id and t.speaker == sp for t in session.turns[-8:]
+        )
+        if not already:
+            session.add_turn(speaker=sp, transcript=transcript, turn_id=turn_id)
+        return {
+            "next_step": "skip",
+            "reasoning": "Turn recorded (superseded)",
+            "agent_type": "marketing"
+        }
+    
     # 2. Process Turn
     # If it's an agent (counselor/other AI) turn, just add to history
     if speaker == "agent" or speaker == "counselor":
@@ -68,50 +149,91 @@ async def handle_marketing_message(turn: dict, session_id: str, customer_info: d
         
         # [Sniper Logic] Early Exit Check
         # 1. Get Context (Last Agent Message)
+        # (방금 add_turn 한 고객 발화 바로 앞 턴; semantic_route 캐시 키에도 쓰임)
         last_agent_turn = ""
-        if session.turns and session.turns[-1].speaker == "agent":
-             last_agent_turn = session.turns[-1].transcript
+        if len(session.turns) >= 2 and session.turns[-2].speaker == "agent":
+             last_agent_turn = safe_str(session.turns[-2].transcript)
              
-        # 2. Fast Route Check (Tier 2 LLM/Router)
-        route_result = await session.gatekeeper.semantic_route(transcript, context=last_agent_turn)
-        print(f"[MarketingService] Sniper Check: {route_result}")
-        
-        is_opportunity = route_result.get("marketing_opportunity", False)
-        # If explicit trigger (e.g., user wants solution) or resolution detected, we proceed.
-        # But 'marketing_opportunity' should cover these if router.py is good.
-        
-        if not is_opportunity:
-             print(f"[MarketingService] Sniper Mode: No marketing opportunity detected (Intent: {route_result.get('intent')}). Skipping.")
-             return {
-                 "next_step": "skip", 
-                 "reasoning": "Sniper: No marketing opportunity",
-                 "agent_type": "marketing"
-             }
-
-        # 3. If Active, Proceed to Graph
-        graph_config = {
-            "configurable": {
-                "thread_id": session_id,
-                "session": session # Inject resource via config (non-serializable)
-            }
-        }
-        initial_state = {
-            "messages": [current_msg], # add_messages reducer will append this
-            # "session_context": session, # REMOVED: Passed via config
-            "session_id": session_id,
-            "marketing_needed": True # We already know it's true from Sniper
-        }
-        
-        # Run Graph
+        # 2. Fast Route Check (Tier 1 정규식/길이/안전 -> Tier 2 LLM/Router)
+        # [NEW] Speculative Retrieval: Tier 2 LLM을 기다리는 동안 기본 가중치 검색을 먼저 시작
+        # (retrieve_node가 marketing_type 가중치/가격 조건을 적용해 재사용). Tier 1에서 끝나는 턴은 시작하지 않고,
+        # 쓰이지 않은 검색은 라우팅 예외/취소를 포함해 어떤 경우든 finally에서 폐기
+        speculative = None
+        precomputed_analysis = None
+        t_route = time.perf_counter()
         try:
-            print(f"[MarketingService] Invoking Graph for {session_id}")
-            final_state = await marketing_graph.ainvoke(initial_state, config=graph_config)
-        except Exception as e:
-            print(f"[MarketingService] Graph failed: {e}")
-            import traceback
-            traceback.print_exc()
-            return {"next_step": "skip", "reasoning": f"Error: {e}"}
-            
+            route_result = await session.gatekeeper.regex_route(transcript)
+            if route_result is None:
+                if settings.MARKETING_SPECULATIVE_RETRIEVAL:
+                    speculative = session.start_speculative_retrieval()
+                if settings.MARKETING_PIPELINE == "combined":
+                    # [NEW] 라우팅 + Deep Analysis를 LLM 1회로 (analyze_node는 이 결과를 그대로 사용)
+                    route_result = await session.gatekeeper.route_and_analyze(
+                        transcript,
+                        last_agent_turn,
+                        session.llm,
+                        build_analysis_prompt(session, transcript),
+                        tier1_checked=True,
+                    )
+                    # cache 적중은 라우팅 필드만 있음 -> analyze_node가 Deep Analysis
+                    if route_result.get("source") == "llm":
+                        precomputed_analysis = route_result
+                else:
+                    route_result = await session.gatekeeper.semantic_route(
+                        transcript, context=last_agent_turn, tier1_checked=True
+                    )
+            _record_route(
+                settings.MARKETING_PIPELINE,
+                route_result.get("source", "route"),
+                time.perf_counter() - t_route,
+                route_result.get("marketing_opportunity", False),
+            )
+            print(f"[MarketingService] Sniper Check: {route_result}")
+
+            is_opportunity = route_result.get("marketing_opportunity", False)
+            # If explicit trigger (e.g., user wants solution) or resolution detected, we proceed.
+            # But 'marketing_opportunity' should cover these if router.py is good.
+
+            if not is_opportunity:
+                 print(f"[MarketingService] Sniper Mode: No marketing opportunity detected (Intent: {route_result.get('intent')}). Skipping.")
+                 return {
+                     "next_step": "skip",
+                     "reasoning": "Sniper: No marketing opportunity",
+                     "agent_type": "marketing"
+                 }
+
+            # 3. If Active, Proceed to Graph
+            graph_config = {
+                "configurable": {
+                    "thread_id": session_id,
+                    "session": session # Inject resource via config (non-serializable)
+                }
+            }
+            if on_delta is not None:
+                # [NEW] generate_node가 완성된 카드 필드를 result_delta로 먼저 전달
+                graph_config["configurable"]["on_delta"] = on_delta
+            initial_state = {
+                "messages": [current_msg], # add_messages reducer will append this
+                # "session_context": session, # REMOVED: Passed via config
+                "session_id": session_id,
+                "marketing_needed": True, # We already know it's true from Sniper
+                # combined 모드 분석 결과 (legacy면 None으로 덮어써서 이전 턴 값이 체크포인트에 남지 않게)
+                "precomputed_analysis": precomputed_analysis,
+            }
+
+            # Run Graph
+            try:
+                print(f"[MarketingService] Invoking Graph for {session_id}")
+                final_state = await marketing_graph.ainvoke(initial_state, config=graph_config)
+            except Exception as e:
+                print(f"[MarketingService] Graph failed: {e}")
+                import traceback
+                traceback.print_exc()
+                return {"next_step": "skip", "reasoning": f"Error: {e}"}
+        finally:
+            # 마케팅 불필요/분석 결과 retrieve 미실행/라우팅 실패·취소 등으로 쓰이지 않은 검색은 폐기
+            session.discard_speculative(speculative)
+
         # Extract Results from Final State
         marketing_needed = final_state.get("marketing_needed", False)
         marketing_type = final_state.get("marketing_type", "none")
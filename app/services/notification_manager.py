@@ -1,43 +1,225 @@
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set, Tuple
 from fastapi import WebSocket
+from app.services.socket_sender import SocketSender
+from app.services.call_session_registry import call_session_registry
+from app.services.broker import Broker, broker as default_broker
+from app.utils.ws_codec import EncodedFrame, negotiate_format
+
+# 구독 토픽 키: ("tenant", tenant_name) / ("member", member_id) / ("call", call_id)
+Topic = Tuple[str, str]
+
 
 class NotificationManager:
-    def __init__(self):
-        # User ID를 키로 하고 연결된 웹소켓 리스트를 값으로 저장
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+    def __init__(self, broker: Optional[Broker] = None):
+        # [NEW] 알림/라우팅 정보는 브로커를 거쳐 모든 워커에 전달
+        self.broker = broker or default_broker
+        self.broker.subscribe("notify", self._on_notify_event)
+        # User ID를 키로 하고 연결된 웹소켓(전용 송신 큐) 리스트를 값으로 저장
+        self.active_connections: Dict[str, List[SocketSender]] = {}
+        # [NEW] 토픽별 구독 인덱스 -> 이벤트를 관심 있는 소켓에만 라우팅
+        self.topics: Dict[Topic, Set[SocketSender]] = {}
+        self.sender_topics: Dict[SocketSender, Set[Topic]] = {}
+        # SUBSCRIBE를 보내지 않은 (구버전) 클라이언트는 기존처럼 모든 이벤트를 받음
+        self.firehose: Set[SocketSender] = set()
+        # Call ID -> 라우팅 정보 (tenant_name, member_id)
+        self.call_routes: Dict[str, Dict[str, Optional[str]]] = {}
 
     async def connect(self, websocket: WebSocket, user_id: str):
         await websocket.accept()
         if user_id not in self.active_connections:
             self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+
+        async def on_close(sender: SocketSender):
+            self._remove_sender(sender, user_id)
+
+        sender = SocketSender(
+            websocket, label=f"notification:{user_id}", on_close=on_close, fmt=negotiate_format(websocket)
+        ).start()
+        self.active_connections[user_id].append(sender)
+        self.sender_topics[sender] = set()
+        self.firehose.add(sender)
         print(f"Notification Service: User {user_id} connected.")
 
     def disconnect(self, websocket: WebSocket, user_id: str):
+        for sender in self.active_connections.get(user_id, [])[:]:
+            if sender.websocket is websocket:
+                sender.detach()
+                self._remove_sender(sender, user_id)
+
+    def _remove_sender(self, sender: SocketSender, user_id: str):
+        self.firehose.discard(sender)
+        for topic in self.sender_topics.pop(sender, set()):
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(sender)
+                if not subscribers:
+                    del self.topics[topic]
+
         if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            
+            if sender in self.active_connections[user_id]:
+                self.active_connections[user_id].remove(sender)
+
             if not self.active_connections[user_id]:
                 del self.active_connections[user_id]
-    
-    async def broadcast(self, message: dict, user_id: str = None):
+
+    # -------------------------
+    # Subscriptions
+    # -------------------------
+
+    def _find_senders(self, websocket: WebSocket, user_id: str) -> List[SocketSender]:
+        return [s for s in self.active_connections.get(user_id, []) if s.websocket is websocket]
+
+    def subscribe(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        tenant_name: Optional[str] = None,
+        call_ids: Optional[List[str]] = None,
+    ):
+        """
+        클라이언트가 관심 범위를 밝히면 firehose에서 빠지고, 해당 tenant/본인(member)/지정 call 이벤트만 받습니다.
+        """
+        topics: List[Topic] = [("member", str(user_id))]
+        if tenant_name:
+            topics.append(("tenant", tenant_name))
+        for call_id in call_ids or []:
+            topics.append(("call", call_id))
+
+        for sender in self._find_senders(websocket, user_id):
+            self.firehose.discard(sender)
+            for topic in topics:
+                self.topics.setdefault(topic, set()).add(sender)
+                self.sender_topics.setdefault(sender, set()).add(topic)
+
+    def unsubscribe_call(self, websocket: WebSocket, user_id: str, call_id: str):
+        topic = ("call", call_id)
+        for sender in self._find_senders(websocket, user_id):
+            self.sender_topics.get(sender, set()).discard(topic)
+            subscribers = self.topics.get(topic)
+            if subscribers is not None:
+                subscribers.discard(sender)
+                if not subscribers:
+                    del self.topics[topic]
+
+    def bind_call(self, call_id: str, tenant_name: Optional[str] = None, member_id: Optional[str] = None):
         """
-        user_id가 있으면 해당 유저에게만, 없으면 전체 유저에게 브로드캐스트
+        Call ID에 tenant/담당 상담원 정보를 연결 -> 이후 해당 call 이벤트는 관심 소켓에만 전송
         """
+        self._bind_local(call_id, tenant_name, member_id)
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.publish("notify", {
+                "op": "bind", "call_id": call_id, "tenant_name": tenant_name,
+                "member_id": str(member_id) if member_id is not None else None,
+            }))
+
+    def _bind_local(self, call_id: str, tenant_name: Optional[str], member_id: Optional[str]):
+        route = self.call_routes.setdefault(call_id, {"tenant_name": None, "member_id": None})
+        if tenant_name:
+            route["tenant_name"] = tenant_name
+        if member_id is not None:
+            route["member_id"] = str(member_id)
+
+    def unbind_call(self, call_id: str):
+        self.call_routes.pop(call_id, None)
+        if self.broker.shared:
+            self.broker.write_behind(self.broker.publish("notify", {"op": "unbind", "call_id": call_id}))
+
+    def _recipients(
+        self, call_id: Optional[str], tenant_name: Optional[str], member_id: Optional[str]
+    ) -> Optional[Set[SocketSender]]:
+        """
+        라우팅 가능한 이벤트면 수신자 집합을, 라우팅 정보가 없으면 None(전체 전송)을 반환
+        """
+        route = self.call_routes.get(call_id, {}) if call_id else {}
+        tenant_name = tenant_name or route.get("tenant_name")
+        member_id = member_id if member_id is not None else route.get("member_id")
+        if not tenant_name and member_id is None:
+            return None
+
+        recipients = set(self.firehose)
+        recipients.update(self.topics.get(("call", call_id), ()) if call_id else ())
+        if tenant_name:
+            recipients.update(self.topics.get(("tenant", tenant_name), ()))
+        if member_id is not None:
+            recipients.update(self.topics.get(("member", str(member_id)), ()))
+        return recipients
+
+    # -------------------------
+    # Broadcast
+    # -------------------------
+
+    async def broadcast(
+        self,
+        message: dict,
+        user_id: str = None,
+        call_id: Optional[str] = None,
+        tenant_name: Optional[str] = None,
+        member_id: Optional[str] = None,
+    ):
+        """
+        user_id가 있으면 해당 유저에게만,
+        call_id/tenant_name/member_id로 라우팅 가능하면 관심 있는 소켓에만,
+        둘 다 아니면 전체 유저에게 브로드캐스트
+        (소켓별 송신 큐에 넣기만 하므로 느린 클라이언트가 전체 전송을 막지 않음)
+        """
+        # 발행 워커가 아는 라우팅 정보를 envelope에 실어 보냄 (수신 워커의 정보와 합쳐서 사용)
+        route = self.call_routes.get(call_id, {}) if call_id else {}
+        await self.broker.publish("notify", {
+            "op": "broadcast",
+            "message": message,
+            "user_id": user_id,
+            "call_id": call_id,
+            "tenant_name": tenant_name or route.get("tenant_name"),
+            "member_id": str(member_id) if member_id is not None else route.get("member_id"),
+        })
+
+    async def _on_notify_event(self, envelope: dict):
+        op = envelope.get("op")
+        if op == "bind":
+            self._bind_local(envelope["call_id"], envelope.get("tenant_name"), envelope.get("member_id"))
+        elif op == "unbind":
+            self.call_routes.pop(envelope["call_id"], None)
+        elif op == "broadcast":
+            self._deliver_local(
+                envelope["message"], envelope.get("user_id"), envelope.get("call_id"),
+                envelope.get("tenant_name"), envelope.get("member_id"),
+            )
+
+    def _deliver_local(
+        self,
+        message: dict,
+        user_id: Optional[str],
+        call_id: Optional[str],
+        tenant_name: Optional[str],
+        member_id: Optional[str],
+    ):
+        # 수신 소켓 수와 무관하게 포맷별 직렬화는 1회
+        frame = EncodedFrame(message)
         if user_id:
-            if user_id in self.active_connections:
-                for connection in self.active_connections[user_id]:
-                    try:
-                        await connection.send_json(message)
-                    except Exception as e:
-                        print(f"Error sending notification to {user_id}: {e}")
-        else:
-            for uid, connections in self.active_connections.items():
-                for connection in connections:
-                    try:
-                        await connection.send_json(message)
-                    except Exception as e:
-                        print(f"Error sending notification to {uid}: {e}")
+            for sender in self.active_connections.get(user_id, [])[:]:
+                sender.send(frame)
+            return
+
+        recipients = self._recipients(call_id, tenant_name, member_id)
+        if recipients is not None:
+            for sender in recipients:
+                sender.send(frame)
+            return
+
+        for senders in list(self.active_connections.values()):
+            for sender in senders[:]:
+                sender.send(frame)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "connections": {
+                user_id: [sender.stats() for sender in senders]
+                for user_id, senders in self.active_connections.items()
+            },
+            "firehose": len(self.firehose),
+            "topics": {f"{kind}:{key}": len(subs) for (kind, key), subs in self.topics.items()},
+            "routed_calls": len(self.call_routes),
+        }
 
 notification_manager = NotificationManager()
+call_session_registry.register("notification_routes", notification_manager.unbind_call)
@@ -42,10 +42,10 @@ class OpenAIService:
     # Guidance용
     def get_guidance_model(
         self, 
-        model: str = "gpt-4o-mini", 
+        model: str | None = None, 
         temperature: float = 0) -> ChatOpenAI:
         return ChatOpenAI(
-            model=model,
+            model=model or settings.GUIDANCE_LLM_MODEL,
             temperature=temperature,
             openai_api_key=settings.OPENAI_API_KEY
         )
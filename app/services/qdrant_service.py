@@ -1,9 +1,15 @@
+import asyncio
 import os
-from qdrant_client import QdrantClient
+from typing import List, Optional, Tuple
+from langchain_core.documents import Document
+from qdrant_client import QdrantClient, models
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
 from langchain_community.embeddings import FastEmbedEmbeddings
 from langchain_qdrant import FastEmbedSparse
 from app.core.config import settings
+from app.services.embedding_cache import CachedEmbeddings
+from app.services.local_index import UnsupportedQuery, get_local_index
+from app.utils.qdrant_points import document_from_point
 
 # Qdrant 연결
 if not settings.QDRANT_API_KEY or not settings.QDRANT_URL:
@@ -24,9 +30,12 @@ _sparse_embeddings = None
 if _qdrant_client:
     print("임베딩 모델을 로드 중입니다...")
     # [MEMORY OPTIMIZED] t3.small 대응: Dense 모델만 사용 (Sparse는 메모리 절약 위해 비활성화)
-    _dense_embeddings = FastEmbedEmbeddings(
-        model_name=settings.QDRANT_DENSE_EMBEDDING_MODEL,
-        normalize=True
+    # [NEW] 같은 문구 재임베딩 방지 (프로세스 공용 LRU 캐시)
+    _dense_embeddings = CachedEmbeddings(
+        FastEmbedEmbeddings(
+            model_name=settings.QDRANT_DENSE_EMBEDDING_MODEL,
+            normalize=True
+        )
     )
     _sparse_embeddings = None
     # _sparse_embeddings = FastEmbedSparse(
@@ -51,4 +60,57 @@ if _dense_embeddings:
 def get_vector_store():
     if _vector_store is None:
         raise Exception("Qdrant VectorStore가 초기화되지 않았습니다. API키 및 URL을 확인하세요.")
-    return _vector_store
\ No newline at end of file
+    return _vector_store
+
+# [NEW] 컬렉션 메모리 사본 (LOCAL_INDEX_ENABLED=true 일 때, startup에서 적재)
+_local_index = (
+    get_local_index(_qdrant_client, settings.QDRANT_COLLECTION_NAME)
+    if _vector_store is not None
+    else None
+)
+
+
+async def search_documents(
+    query: str, k: int = 4, category: Optional[str] = None
+) -> List[Tuple[Document, float]]:
+    """
+    guidance 검색: 로컬 사본이 준비되어 있으면 네트워크 없이, 아니면 원격 Qdrant
+    (VectorStore와 같은 Document + 유사도 점수 - context packer가 점수순으로 담음)
+    """
+    vector_store = get_vector_store()
+    search_filter = None
+    if category:
+        search_filter = models.Filter(
+            must=[
+                models.FieldCondition(
+                    key="metadata.category",
+                    match=models.MatchValue(value=category)
+                )
+            ]
+        )
+
+    if _local_index is not None and _local_index.ready:
+        embedding = await asyncio.to_thread(_dense_embeddings.embed_query, query)
+        try:
+            res = _local_index.query_points(
+                query=embedding,
+                using=vector_store.vector_name,
+                query_filter=search_filter,
+                limit=k,
+            )
+            return [
+                (
+                    document_from_point(
+                        p,
+                        vector_store.collection_name,
+                        vector_store.content_payload_key,
+                        vector_store.metadata_payload_key,
+                    ),
+                    p.score,
+                )
+                for p in res.points
+            ]
+        except UnsupportedQuery:
+            pass
+
+    return await vector_store.asimilarity_search_with_score(query=query, k=k, filter=search_filter)
@@ -1,10 +1,22 @@
 from typing import Any, cast
 from app.agent.rp.graph import build_graph
 from app.agent.rp.state import RPState
+from app.services.call_session_registry import (
+    call_session_registry,
+    checkpointer_thread_size,
+    delete_checkpointer_thread,
+)
 
 # ✅ 앱 시작 시 그래프 1회 생성
 graph = build_graph()
 
+# [NEW] RP 세션도 유휴 TTL로 MemorySaver thread 회수
+call_session_registry.register(
+    "rp",
+    lambda session_id: delete_checkpointer_thread(graph.checkpointer, session_id),
+    size_probe=lambda session_id: checkpointer_thread_size(graph.checkpointer, session_id),
+)
+
 
 async def handle_agent_message(
     session_id: str, message: str, persona: dict | None = None, start: bool = False
@@ -15,6 +27,7 @@ async def handle_agent_message(
     - user 메시지만 전달
     - session_id를 thread_id로 매핑
     """
+    call_session_registry.touch(session_id)
     payload: dict[str, Any] = {"messages": [{"role": "user", "content": message}]}
 
     if persona is not None:
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
+
+from fastapi import WebSocket
+
+from app.core.config import settings
+from app.utils.ws_codec import FORMAT_JSON, EncodedFrame, as_frame
+
+logger = logging.getLogger(__name__)
+
+# 큐가 가득 찼을 때 버려도 되는 중간 이벤트 (최종 result / CALL_ENDED 등 종결 이벤트는 버리지 않음)
+DROPPABLE_TYPES = frozenset({"result_delta", "processing"})
+
+
+def _is_droppable(message: Any) -> bool:
+    if isinstance(message, EncodedFrame):
+        message = message.message
+    return isinstance(message, dict) and message.get("type") in DROPPABLE_TYPES
+
+
+class SocketSender:
+    """
+    WebSocket 1개당 전용 송신 큐 + writer 태스크.
+    - send()는 큐에 넣기만 하므로 producer(에이전트 태스크/브로드캐스트)는 절대 블로킹되지 않습니다.
+    - 큐가 가득 차면 버려도 되는 중간 이벤트(DROPPABLE_TYPES) 중 가장 오래된 것부터 버리고(coalesce),
+      마지막 성공 송신 이후 버린 메시지가 max_drops를 넘거나, 종결 이벤트만으로 큐가 max_queue의 2배를 넘거나,
+      송신이 send_timeout 이상 걸리면 느린 소비자로 보고 연결을 끊습니다.
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        label: str,
+        on_close: Optional[Callable[["SocketSender"], Awaitable[Any]]] = None,
+        max_queue: Optional[int] = None,
+        max_drops: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+        fmt: str = FORMAT_JSON,
+    ):
+        self.websocket = websocket
+        self.label = label
+        # 클라이언트가 협상한 프레임 포맷 (json 텍스트 / msgpack 바이너리)
+        self.fmt = fmt
+        self._on_close = on_close
+        self.max_queue = max_queue or settings.WS_SEND_QUEUE_SIZE
+        self.max_drops = max_drops or settings.WS_MAX_DROPS
+        self.send_timeout = send_timeout or settings.WS_SEND_TIMEOUT
+
+        # (enqueued_at, message)
+        self._queue: Deque[Tuple[float, Any]] = deque()
+        self._wakeup = asyncio.Event()
+        self._writer: Optional[asyncio.Task] = None
+        self._close_task: Optional[asyncio.Task] = None
+        self.closed = False
+
+        self.sent = 0
+        self.dropped = 0
+        self._drops_since_send = 0
+        self.last_send_ms = 0.0
+        self.max_lag_sec = 0.0
+
+    def start(self) -> "SocketSender":
+        if self._writer is None:
+            self._writer = asyncio.create_task(self._run())
+        return self
+
+    def send(self, message: Any) -> bool:
+        if self.closed or self._close_task is not None:
+            return False
+        if len(self._queue) >= self.max_queue:
+            victim = next((i for i, (_, queued) in enumerate(self._queue) if _is_droppable(queued)), None)
+            if victim is None and _is_droppable(message):
+                self._count_drop()
+                return False
+            if victim is not None:
+                del self._queue[victim]
+                self._count_drop()
+            elif len(self._queue) >= 2 * self.max_queue:
+                self._slow_consumer(f"{len(self._queue)} undroppable msgs queued")
+            if self._close_task is not None:
+                return False
+        self._queue.append((time.monotonic(), message))
+        self._wakeup.set()
+        return True
+
+    def _count_drop(self) -> None:
+        self.dropped += 1
+        self._drops_since_send += 1
+        if self._drops_since_send > self.max_drops:
+            self._slow_consumer(f"{self._drops_since_send} msgs behind")
+
+    def _slow_consumer(self, reason: str) -> None:
+        logger.warning(f"[SocketSender] {self.label}: slow consumer dropped ({reason})")
+        # 태스크 참조를 보관 (GC로 close가 중간에 사라지지 않게)
+        if self._close_task is None:
+            self._close_task = asyncio.create_task(self.close())
+
+    def detach(self) -> None:
+        """
+        클라이언트 쪽에서 이미 연결이 끊긴 경우: 소켓을 건드리지 않고 writer만 정리합니다.
+        """
+        self.closed = True
+        self._queue.clear()
+        if self._writer is not None:
+            self._writer.cancel()
+
+    async def close(self) -> None:
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._wakeup.set()
+        if self._writer is not None and self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        try:
+            await self.websocket.close()
+        except Exception:
+            pass
+        if self._on_close:
+            await self._on_close(self)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    @property
+    def lag_sec(self) -> float:
+        if not self._queue:
+            return 0.0
+        return time.monotonic() - self._queue[0][0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "label": self.label,
+            "format": self.fmt,
+            "queue_depth": len(self._queue),
+            "lag_sec": round(self.lag_sec, 4),
+            "max_lag_sec": round(self.max_lag_sec, 4),
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "last_send_ms": round(self.last_send_ms, 2),
+        }
+
+    async def _deliver(self, message: Any) -> None:
+        # 브로드캐스트는 EncodedFrame으로 들어와서 소켓 수와 무관하게 직렬화 1회
+        await as_frame(message).send(self.websocket, self.fmt)
+
+    async def _run(self) -> None:
+        while not self.closed:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            enqueued_at, message = self._queue.popleft()
+            t0 = time.monotonic()
+            try:
+                await asyncio.wait_for(self._deliver(message), timeout=self.send_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"[SocketSender] {self.label}: send failed, closing ({e!r})")
+                await self.close()
+                return
+
+            now = time.monotonic()
+            self.sent += 1
+            self._drops_since_send = 0
+            self.last_send_ms = (now - t0) * 1000
+            self.max_lag_sec = max(self.max_lag_sec, now - enqueued_at)
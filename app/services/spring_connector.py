@@ -1,6 +1,10 @@
+import asyncio
 import httpx
 import logging
 import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 from app.core.config import settings
 from app.schemas.customer import CustomerInfo
 
@@ -14,50 +18,147 @@ class SpringConnector:
         self.customer_api_url_base = settings.SPRING_CUSTOMER_API_URL
         self.api_key = settings.SPRING_API_KEY
 
-    async def get_customer_info(self, customer_number: str) -> CustomerInfo:
+        # [NEW] 커넥션 풀을 유지하는 장수명 클라이언트 (요청마다 TCP/TLS 핸드셰이크 방지)
+        self._client: Optional[httpx.AsyncClient] = None
+
+        # [NEW] 전화번호 -> (만료 시각, CustomerInfo | None) TTL/LRU 캐시 (None은 404 negative cache)
+        self._cache: "OrderedDict[str, Tuple[float, Optional[CustomerInfo]]]" = OrderedDict()
+        # 같은 번호에 대한 동시 조회는 하나의 요청으로 합침 (ring warm-up + metadata 등)
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Ring 이벤트로 알게 된 Call ID -> 전화번호
+        self._call_numbers: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "warmups": 0}
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            headers = {"X-API-KEY": self.api_key} if self.api_key else {}
+            self._client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(10.0, connect=3.0),
+                limits=httpx.Limits(
+                    max_connections=settings.SPRING_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.SPRING_HTTP_MAX_CONNECTIONS,
+                ),
+            )
+        return self._client
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    # -------------------------
+    # Customer lookup cache
+    # -------------------------
+
+    def _cache_get(self, customer_number: str) -> Tuple[bool, Optional[CustomerInfo]]:
+        entry = self._cache.get(customer_number)
+        if entry is None:
+            return False, None
+        expires_at, info = entry
+        if time.monotonic() >= expires_at:
+            del self._cache[customer_number]
+            return False, None
+        self._cache.move_to_end(customer_number)
+        return True, info
+
+    def _cache_put(self, customer_number: str, info: Optional[CustomerInfo]):
+        ttl = settings.SPRING_CUSTOMER_CACHE_TTL if info is not None else settings.SPRING_CUSTOMER_NEGATIVE_TTL
+        self._cache[customer_number] = (time.monotonic() + ttl, info)
+        self._cache.move_to_end(customer_number)
+        while len(self._cache) > settings.SPRING_CUSTOMER_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    async def get_customer_info(self, customer_number: str, use_cache: bool = True) -> CustomerInfo:
         """
-        Spring 서버에서 고객 정보를 조회합니다.
-        
+        Spring 서버에서 고객 정보를 조회합니다. (TTL 캐시 + 동시 조회 합치기)
+
         Args:
             customer_number (str): 고객 전화번호 (또는 식별자)
-        
+            use_cache (bool): False면 캐시를 건너뛰고 새로 조회
+
         Returns:
             CustomerInfo: 고객 정보 객체 (실패 시 None 또는 예외 발생)
         """
+        if use_cache:
+            found, info = self._cache_get(customer_number)
+            if found:
+                self.stats["hits"] += 1
+                return info
+
+        task = self._inflight.get(customer_number)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self.stats["misses"] += 1
+            task = asyncio.create_task(self._fetch_customer_info(customer_number))
+            self._inflight[customer_number] = task
+            task.add_done_callback(lambda _t: self._inflight.pop(customer_number, None))
+        # 호출자가 취소되어도 공유 조회는 계속 진행 (다른 대기자/캐시 적재용)
+        return await asyncio.shield(task)
+
+    def warm_customer_info(self, customer_number: str, call_id: Optional[str] = None) -> None:
+        """
+        [NEW] 전화가 울릴 때(Ring) 미리 조회해서 캐시를 채워 둡니다. (결과를 기다리지 않음)
+        """
+        if call_id:
+            self._call_numbers[call_id] = (time.monotonic() + settings.SPRING_CUSTOMER_CACHE_TTL, customer_number)
+            self._call_numbers.move_to_end(call_id)
+            while len(self._call_numbers) > settings.SPRING_CUSTOMER_CACHE_SIZE:
+                self._call_numbers.popitem(last=False)
+        found, _ = self._cache_get(customer_number)
+        if found or customer_number in self._inflight:
+            return
+        self.stats["warmups"] += 1
+        asyncio.create_task(self.get_customer_info(customer_number))
+
+    def number_for_call(self, call_id: str) -> Optional[str]:
+        entry = self._call_numbers.get(call_id)
+        if entry is None or time.monotonic() >= entry[0]:
+            return None
+        return entry[1]
+
+    async def _fetch_customer_info(self, customer_number: str) -> Optional[CustomerInfo]:
         try:
             # Spring Controller: @GetMapping("/search") @RequestParam String phoneNumber
             # URL: .../search
             # Params: { "phoneNumber": "..." }
             url = self.customer_api_url_base
             params = {"phoneNumber": customer_number}
-            headers = {"X-API-KEY": self.api_key} if self.api_key else {}
-            
+
             # [DEBUG] 헤더 확인 로그
-            safe_headers = {k: (v[:4] + "***" if k == "X-API-KEY" and v else "None") for k, v in headers.items()}
-            print(f"[SpringConnector] Sending request to {url} with headers: {safe_headers}")
-
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params, headers=headers, timeout=5.0)
-                if response.status_code == 404:
-                    logger.warning(f"Customer not found: {customer_number}")
-                    return None
-                    
-                response.raise_for_status()
-                data = response.json()
-                # Pydantic 모델로 변환 (alias를 사용하여 매핑)
-                return CustomerInfo(**data)
-                
+            safe_key = self.api_key[:4] + "***" if self.api_key else "None"
+            print(f"[SpringConnector] Sending request to {url} with headers: {{'X-API-KEY': '{safe_key}'}}")
+
+            response = await self._get_client().get(url, params=params, timeout=5.0)
+            if response.status_code == 404:
+                logger.warning(f"Customer not found: {customer_number}")
+                self._cache_put(customer_number, None)
+                return None
+
+            response.raise_for_status()
+            data = response.json()
+            # Pydantic 모델로 변환 (alias를 사용하여 매핑)
+            info = CustomerInfo(**data)
+            self._cache_put(customer_number, info)
+            return info
+
         except httpx.HTTPStatusError as e:
+             self.stats["errors"] += 1
              logger.error(f"HTTP error fetching customer info: {e.response.text}")
              return None
         except Exception as e:
+            self.stats["errors"] += 1
             logger.error(f"Failed to fetch customer info: {e}")
             return None
 
+    def cache_stats(self) -> Dict[str, int]:
+        return {**self.stats, "cached": len(self._cache), "inflight": len(self._inflight)}
+
     async def send_call_data(self, call_data: dict):
         """
         상담 종료 후 데이터를 Spring 서버로 전송합니다.
-        
+
         Args:
             call_data (dict): {
                 "transcripts": [ ... ],
@@ -66,17 +167,14 @@ class SpringConnector:
             }
         """
         try:
-            async with httpx.AsyncClient() as client:
-                headers = {"X-API-KEY": self.api_key} if self.api_key else {}
-                response = await client.post(
-                    self.spring_api_url, 
-                    json=call_data,
-                    headers=headers,
-                    timeout=10.0
-                )
-                response.raise_for_status()
-                logger.info(f"Successfully sent call data to Spring: {response.status_code}")
-                return response.json()
+            response = await self._get_client().post(
+                self.spring_api_url,
+                json=call_data,
+                timeout=10.0
+            )
+            response.raise_for_status()
+            logger.info(f"Successfully sent call data to Spring: {response.status_code}")
+            return response.json()
         except httpx.HTTPStatusError as e:
             logger.error(f"HTTP error sending data to Spring: {e.response.text}")
         except Exception as e:
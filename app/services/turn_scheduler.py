@@ -0,0 +1,249 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional
+
+from app.services.call_session_registry import call_session_registry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TurnJob:
+    turn: dict
+    customer_info: Optional[dict] = None
+    enqueued_at: float = field(default_factory=time.monotonic)
+    superseded: bool = False
+
+    @property
+    def turn_id(self):
+        return self.turn.get("turn_id")
+
+    @property
+    def is_customer(self) -> bool:
+        return self.turn.get("speaker") == "customer"
+
+
+class TurnScheduler:
+    """
+    통화(call) 1건에 대한 턴 처리 스케줄러.
+    - 턴은 들어온 순서대로 하나씩 처리합니다. (동일 thread에 대한 그래프 동시 실행 방지)
+    - 새 고객 발화가 들어오면, 아직 처리 중이거나 대기 중인 이전 고객 턴의 에이전트 실행은
+      결과가 이미 stale 하므로 취소/폐기하고, 대화 이력에만 적재(record)합니다.
+    """
+
+    def __init__(
+        self,
+        call_id: str,
+        runner: Callable[[dict, Optional[dict]], Awaitable[Any]],
+        recorder: Callable[[dict, Optional[dict]], Awaitable[Any]],
+        on_superseded: Optional[Callable[[TurnJob], Awaitable[Any]]] = None,
+    ):
+        self.call_id = call_id
+        self._runner = runner
+        self._recorder = recorder
+        self._on_superseded = on_superseded
+
+        self._queue: Deque[TurnJob] = deque()
+        self._wakeup = asyncio.Event()
+        self._current: Optional[TurnJob] = None
+        self._current_task: Optional[asyncio.Task] = None
+        self._current_started: float = 0.0
+        self._worker: Optional[asyncio.Task] = None
+        self._closed = False
+
+        self.stats: Dict[str, float] = {
+            "submitted": 0,
+            "completed": 0,
+            "cancelled_in_flight": 0,  # 실행 중 취소된 에이전트 실행 수
+            "dropped_queued": 0,  # 실행 전 폐기된 고객 턴 수
+            "cancelled_elapsed_sec": 0.0,  # 취소 시점까지 이미 소모된 실행 시간
+            "max_queue_depth": 0,
+        }
+
+    # -------------------------
+    # Public API
+    # -------------------------
+
+    def submit(self, turn: dict, customer_info: Optional[dict] = None) -> TurnJob:
+        if self._closed:
+            raise RuntimeError(f"TurnScheduler for {self.call_id} is closed")
+
+        job = TurnJob(turn=turn, customer_info=customer_info)
+        if job.is_customer:
+            self._supersede_older()
+
+        self._queue.append(job)
+        self.stats["submitted"] += 1
+        self.stats["max_queue_depth"] = max(self.stats["max_queue_depth"], len(self._queue))
+
+        if self._worker is None:
+            self._worker = asyncio.create_task(self._run_worker())
+        self._wakeup.set()
+        return job
+
+    async def close(self, drain: bool = False) -> None:
+        """
+        drain=True 이면 남은 턴을 모두 처리한 뒤 종료하고, 아니면 즉시 취소합니다.
+        """
+        self._closed = True
+        if self._worker is None:
+            return
+        if drain:
+            self._wakeup.set()
+            await asyncio.wait({self._worker})
+            return
+
+        self._worker.cancel()
+        if self._current_task and not self._current_task.done():
+            self._current_task.cancel()
+        await asyncio.wait({self._worker})
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            **self.stats,
+            "queue_depth": len(self._queue),
+            "in_flight_turn": self._current.turn_id if self._current else None,
+        }
+
+    # -------------------------
+    # Internals
+    # -------------------------
+
+    def _supersede_older(self) -> None:
+        # 1) 대기 중인 이전 고객 턴 -> 실행하지 않고 기록만
+        for job in self._queue:
+            if job.is_customer and not job.superseded:
+                job.superseded = True
+                self.stats["dropped_queued"] += 1
+
+        # 2) 실행 중인 이전 고객 턴 -> 취소
+        if (
+            self._current is not None
+            and self._current.is_customer
+            and self._current_task is not None
+            and not self._current_task.done()
+        ):
+            self._current.superseded = True
+            self._current_task.cancel()
+
+    async def _run_worker(self) -> None:
+        while True:
+            if not self._queue:
+                if self._closed:
+                    return
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            job = self._queue.popleft()
+            if job.superseded:
+                await self._record(job)
+                continue
+
+            self._current = job
+            self._current_started = time.monotonic()
+            self._current_task = asyncio.create_task(self._runner(job.turn, job.customer_info))
+            try:
+                # wait()는 자식 태스크가 취소되어도 예외를 올리지 않으므로,
+                # 워커 자신의 취소와 슈퍼세션(자식 취소)을 구분할 수 있습니다.
+                await asyncio.wait({self._current_task})
+            except asyncio.CancelledError:
+                self._current_task.cancel()
+                raise
+
+            if self._current_task.cancelled():
+                self.stats["cancelled_in_flight"] += 1
+                self.stats["cancelled_elapsed_sec"] += time.monotonic() - self._current_started
+                logger.info(f"[TurnScheduler] {self.call_id}: turn {job.turn_id} superseded in flight")
+                await self._record(job)
+            else:
+                self.stats["completed"] += 1
+            self._current = None
+            self._current_task = None
+
+    async def _record(self, job: TurnJob) -> None:
+        """
+        폐기된 턴도 대화 맥락에서 빠지면 안 되므로 에이전트 상태에는 적재합니다.
+        """
+        try:
+            await self._recorder(job.turn, job.customer_info)
+            if self._on_superseded:
+                await self._on_superseded(job)
+        except Exception as e:
+            logger.error(f"[TurnScheduler] {self.call_id}: failed to record turn {job.turn_id}: {e}")
+
+
+class TurnSchedulerRegistry:
+    """
+    call_id -> TurnScheduler 관리 및 전체 통계 집계
+    """
+
+    def __init__(self):
+        self.schedulers: Dict[str, TurnScheduler] = {}
+        self._retired: Dict[str, float] = {}
+        # 종료(drain) 중인 call_id -> 종료 완료 future. 그 사이 같은 call_id로 새 스케줄러를 만들면
+        # 두 워커가 같은 그래프 thread를 동시에 돌리게 되므로 acquire()가 종료를 기다림
+        self._closing: Dict[str, asyncio.Future] = {}
+
+    async def acquire(self, call_id: str, **kwargs) -> TurnScheduler:
+        """
+        get_or_create와 같지만, 같은 call_id의 이전 스케줄러가 아직 종료 중이면 끝날 때까지 기다림 (재연결)
+        """
+        pending = self._closing.get(call_id)
+        while pending is not None:
+            await asyncio.shield(pending)
+            pending = self._closing.get(call_id)
+        return self.get_or_create(call_id, **kwargs)
+
+    def get_or_create(self, call_id: str, **kwargs) -> TurnScheduler:
+        if call_id in self._closing:
+            raise RuntimeError(f"TurnScheduler for {call_id} is still closing; use acquire()")
+        scheduler = self.schedulers.get(call_id)
+        if scheduler is None:
+            scheduler = TurnScheduler(call_id, **kwargs)
+            self.schedulers[call_id] = scheduler
+        return scheduler
+
+    async def close(self, call_id: str, drain: bool = False) -> None:
+        scheduler = self.schedulers.pop(call_id, None)
+        if scheduler is None:
+            return
+        closed = asyncio.get_running_loop().create_future()
+        self._closing[call_id] = closed
+        try:
+            await scheduler.close(drain=drain)
+        finally:
+            if self._closing.get(call_id) is closed:
+                del self._closing[call_id]
+            closed.set_result(None)
+        for k, v in scheduler.stats.items():
+            if k == "max_queue_depth":
+                self._retired[k] = max(self._retired.get(k, 0), v)
+            else:
+                self._retired[k] = self._retired.get(k, 0) + v
+
+    def stats(self) -> Dict[str, Any]:
+        total = dict(self._retired)
+        for scheduler in self.schedulers.values():
+            for k, v in scheduler.stats.items():
+                if k == "max_queue_depth":
+                    total[k] = max(total.get(k, 0), v)
+                else:
+                    total[k] = total.get(k, 0) + v
+        return {
+            "active_calls": len(self.schedulers),
+            "closing_calls": len(self._closing),
+            "totals": total,
+            "calls": {cid: s.snapshot() for cid, s in self.schedulers.items()},
+        }
+
+
+turn_schedulers = TurnSchedulerRegistry()
+call_session_registry.register("turn_scheduler", turn_schedulers.close)
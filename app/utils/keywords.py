@@ -0,0 +1,249 @@
+"""
+공용 키워드 엔진 (Aho-Corasick 스타일 다중 패턴 매칭)
+
+라우터/휴리스틱이 턴마다 같은 발화를 `any(k in t for k in [...])` 와 정규식으로 여러 번 훑던 것을
+전체 사전(LEXICONS)으로 한 번 만든 매처의 단일 스캔으로 대체합니다.
+- 모든 키워드를 trie로 묶어 정규식 하나로 컴파일 -> C 정규식 엔진의 finditer 한 번으로 위치마다 가장 긴
+  키워드를 잡고, 매칭 안에 겹쳐 있는 키워드는 매칭 문자열별로 한 번 계산해 둔 closure로 채움
+  (경계를 넘어 겹치는 키워드가 있을 수 있는 offset에서만 추가 match -> 겹치는 키워드까지 전부 검출)
+- 카테고리 판정은 키워드별 카테고리 비트 OR -> has() 는 비트 연산 한 번
+- `\\s*` (공백 무시) 패턴도 같은 trie에 들어감 (QA 사전)
+- annotate(text) 결과(KeywordHits)는 텍스트 기준 LRU로 공유: 한 턴을 Gatekeeper / analyze_node /
+  build_query 가 각각 부르더라도 스캔은 1회
+
+    hits = annotate(transcript)
+    if hits.has("gatekeeper.furious"):
+        ...
+    hits.matched("query")  # 사전 순서대로 매칭된 키워드
+"""
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+# 카테고리 -> 키워드. 공백 무시 패턴은 "\s*" 를 그대로 적습니다 (나머지는 모두 리터럴)
+LEXICONS: Dict[str, List[str]] = {
+    # marketing quick_router
+    "router.verification": ["성함", "본인", "명의", "인증", "주소지", "연락주신 번호", "확인"],
+    "router.consent": ["동의", "녹취", "개인정보", "위탁", "보관", "약관", "필수적으로 필요"],
+    "router.closing": ["감사", "좋은 하루", "행복한 하루", "상담사", "종료"],
+    "router.churn": ["해지", "해약", "번호이동", "옮기", "탈퇴"],
+    "router.upsell": [
+        "요금제", "변경", "업그레이드", "추가", "부가서비스", "데이터",
+        "무제한", "결합", "가족결합", "재결합", "할인", "혜택",
+    ],
+    "router.complaint": ["불만", "끊김", "느려", "장애", "환불", "오류", "안돼", "문제"],
+    "router.db_signal": ["약정 만료", "초과요금", "할인 미적용", "결합"],
+    # marketing Gatekeeper
+    "gatekeeper.furious": [
+        "개새끼", "미친", "씨발", "닥쳐", "장난해", "임마", "자식", "새끼", "꺼져",
+        "팀장", "상급자", "책임자", "소보원", "고발", "신고",
+        "말귀", "몇 번을 말해", "안 산다", "짜증",
+    ],
+    "gatekeeper.sensitive": [
+        "사망", "별세", "장례", "독촉", "압류", "파산",
+        "소송", "법적", "경찰", "병원", "응급실",
+    ],
+    "gatekeeper.opportunity": [
+        "요금", "할인", "약정", "만료", "바꾸", "변경",
+        "인터넷", "데이터", "부족", "느려", "답답", "비싸",
+        "해지", "탈퇴", "그만", "끊어", "다른",
+    ],
+    # marketing session.build_query
+    "query": [
+        "해지", "위약금", "약정", "결합", "가족결합", "재결합", "요금제",
+        "변경", "할인", "혜택", "동의", "개인정보", "인터넷", "IPTV",
+    ],
+    # marketing analyze_node
+    "analyze.churn": ["해지", "탈퇴"],
+    "analyze.cheap": ["싸", "저렴"],
+    "analyze.alternative": ["다른", "딴거", "그거 말고", "제외하고"],
+    # QA 대표 턴 선택
+    "qa.pick": [
+        r"안녕하세요", r"상담사", r"무엇을\s*도와", r"본인\s*확인",  # 오프닝/확인
+        r"요금", r"청구", r"과금", r"결제", r"소액결제", r"휴대폰\s*결제",
+        r"데이터", r"초과", r"추가\s*요금", r"부가\s*서비스", r"콘텐츠",
+        r"해지", r"환불", r"정지", r"납부", r"미납", r"연체",
+        r"명의", r"가족", r"결합", r"약정",
+        r"요약", r"정리", r"확인해\s*보", r"확인\s*드리", r"마무리", r"도와드릴",
+    ],
+    # RP 고객 이해도 단계
+    "rp.level1": ["데이터", "초과", "추가 요금", "추가요금"],
+    "rp.level2": ["GB", "기가", "기준", "까지", "한도"],
+    "rp.level3": ["사용하셨", "초과하셨", "사용량", "이용량", "10GB", "20GB", "5GB"],
+    "rp.level4": ["계산", "청구", "산정", "만원", "원", "요금이 붙"],
+}
+
+_WS_OPTIONAL = r"\s*"
+
+
+def _tokens(word: str) -> List[str]:
+    # "본인\s*확인" -> ["본", "인", "\s*", "확", "인"]
+    out: List[str] = []
+    for i, part in enumerate(word.split(_WS_OPTIONAL)):
+        if i:
+            out.append(_WS_OPTIONAL)
+        out.extend(part)
+    return out
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """
+    키워드 목록 -> 접두어를 공유하는 정규식 하나 (위치마다 첫 글자가 맞는 가지만 따라감)
+    """
+    trie: Dict = {}
+    for w in words:
+        node = trie
+        for tok in _tokens(w):
+            node = node.setdefault(tok, {})
+        node[""] = {}
+
+    def emit(node: Dict) -> str:
+        branches = [
+            (tok if tok == _WS_OPTIONAL else re.escape(tok)) + emit(child)
+            for tok, child in sorted(node.items())
+            if tok
+        ]
+        if not branches:
+            return ""
+        body = "(?:" + "|".join(branches) + ")"
+        return body + "?" if "" in node else body
+
+    return emit(trie)
+
+
+class _Automaton:
+    def __init__(self, lexicons: Dict[str, List[str]]):
+        self.bits = {cat: 1 << i for i, cat in enumerate(lexicons)}
+        # 키워드 -> 속한 카테고리 비트 OR
+        self.masks: Dict[str, int] = {}
+        for cat, words in lexicons.items():
+            for w in words:
+                self.masks[w] = self.masks.get(w, 0) | self.bits[cat]
+        self.words = sorted(self.masks)
+        self.pattern = re.compile(_trie_regex(self.words)) if self.words else None
+        # 첫 글자 -> 그 글자로 시작하는 키워드 (리터럴은 startswith, 공백 무시 패턴은 정규식으로 확인)
+        self.by_first: Dict[str, List[Tuple[str, Optional[re.Pattern]]]] = {}
+        for w in self.words:
+            rx = re.compile(w) if _WS_OPTIONAL in w else None
+            self.by_first.setdefault(w[0], []).append((w, rx))
+        self._inner: Dict[str, Tuple[FrozenSet[str], int, Tuple[int, ...]]] = {}
+        self._prefix: Dict[str, Tuple[FrozenSet[str], int]] = {}
+
+    def _mask(self, words: Iterable[str]) -> int:
+        mask = 0
+        for w in words:
+            mask |= self.masks[w]
+        return mask
+
+    def prefix_closure(self, matched: str) -> Tuple[FrozenSet[str], int]:
+        """
+        한 위치의 최장 매칭 -> 그 위치에서 시작하는 키워드 전부 (더 짧은 접두어 키워드 포함)
+        """
+        hit = self._prefix.get(matched)
+        if hit is None:
+            words = frozenset(
+                w
+                for w, rx in self.by_first[matched[0]]
+                if (rx.match(matched) if rx else matched.startswith(w))
+            )
+            hit = self._prefix[matched] = (words, self._mask(words))
+        return hit
+
+    def inner_closure(self, matched: str) -> Tuple[FrozenSet[str], int, Tuple[int, ...]]:
+        """
+        비중첩 매칭 문자열 -> (그 안에 들어 있는 키워드 전부, 카테고리 비트,
+        매칭 안에서 시작해 밖으로 이어질 수 있는 키워드의 시작 offset들 - 여기만 추가로 match)
+        """
+        hit = self._inner.get(matched)
+        if hit is None:
+            words = frozenset(
+                w
+                for ws in self.by_first.values()
+                for w, rx in ws
+                if (rx.search(matched) if rx else w in matched)
+            )
+            risky = tuple(
+                i
+                for i in range(1, len(matched))
+                if any(
+                    (rx is not None) or (len(w) > len(matched) - i and w.startswith(matched[i:]))
+                    for w, rx in self.by_first.get(matched[i], ())
+                )
+            )
+            hit = self._inner[matched] = (words, self._mask(words), risky)
+        return hit
+
+    def scan(self, text: str) -> Tuple[FrozenSet[str], int]:
+        if self.pattern is None or not text:
+            return frozenset(), 0
+        found, mask = set(), 0
+        match = self.pattern.match
+        # 비중첩 finditer 한 번 (위치마다 최장 키워드). 매칭 안쪽 키워드는 inner_closure 로,
+        # 매칭 안에서 시작해 경계를 넘는 키워드("가족결합" 뒤 "합니다" 같은 경우)는 그 offset에서만 다시 match
+        for m in self.pattern.finditer(text):
+            words, bits, risky = self.inner_closure(m.group())
+            found.update(words)
+            mask |= bits
+            for off in risky:
+                m2 = match(text, m.start() + off)
+                if m2 is not None and m2.end() > m.end():
+                    words, bits = self.prefix_closure(m2.group())
+                    found.update(words)
+                    mask |= bits
+        return frozenset(found), mask
+
+
+class KeywordHits:
+    """
+    텍스트 1건의 스캔 결과 (턴 단위 annotation). has()는 비트 연산, matched()는 사전 순서 유지
+    """
+
+    __slots__ = ("engine", "found", "mask")
+
+    def __init__(self, engine: "KeywordEngine", found: FrozenSet[str], mask: int):
+        self.engine = engine
+        self.found = found  # 매칭된 사전 항목 (공백 무시 패턴은 원래 표기 그대로)
+        self.mask = mask
+
+    def has(self, category: str) -> bool:
+        return bool(self.mask & self.engine.bits[category])
+
+    def matched(self, category: str) -> List[str]:
+        if not self.has(category):
+            return []
+        return [k for k in self.engine.lexicons[category] if k in self.found]
+
+    def categories(self) -> List[str]:
+        return [c for c in self.engine.lexicons if self.has(c)]
+
+
+class KeywordEngine:
+    def __init__(self, lexicons: Dict[str, List[str]]):
+        self.lexicons = lexicons
+        self._automaton = _Automaton(lexicons)
+        self.bits = self._automaton.bits
+
+    def scan(self, text: str) -> KeywordHits:
+        return KeywordHits(self, *self._automaton.scan(text))
+
+
+keyword_engine = KeywordEngine(LEXICONS)
+
+
+@lru_cache(maxsize=2048)
+def _annotate(text: str) -> KeywordHits:
+    return keyword_engine.scan(text)
+
+
+def annotate(text: Optional[str]) -> KeywordHits:
+    """
+    발화/대화 텍스트의 키워드 annotation (같은 텍스트는 LRU에서 재사용)
+    """
+    if not isinstance(text, str):
+        text = "" if text is None else str(text)
+    return _annotate(text)
+
+
+def annotation_cache_info() -> Dict[str, int]:
+    info = _annotate.cache_info()
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
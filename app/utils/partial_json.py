@@ -0,0 +1,244 @@
+"""
+Incremental (streaming) JSON parser
+
+LLM이 토큰 단위로 내보내는 구조화 출력(JSON)을 도착하는 대로 파싱합니다.
+- 문자열 값은 닫히기 전에도 조각(delta) 이벤트로 흘려보냄 -> 첫 유효 토큰을 바로 화면에 표시
+- 값이 완성되면 complete 이벤트 + completed_paths에 경로 기록
+- .value 는 지금까지 도착한 부분 문서 (열린 문자열은 현재까지의 내용)
+
+    parser = IncrementalJSONParser()
+    for chunk in stream:
+        for event in parser.feed(chunk):
+            if event.kind == "delta" and event.path == ("recommended_answer",):
+                ...
+"""
+import json
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple
+
+Path = Tuple[Any, ...]
+
+_VALUE, _STRING, _LITERAL, _AFTER_VALUE, _OBJ_KEY, _COLON, _DONE = range(7)
+_WHITESPACE = " \t\r\n"
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class JSONStreamEvent(NamedTuple):
+    kind: str  # "delta" (문자열 조각) | "complete" (값 완성)
+    path: Path
+    value: Any
+
+
+class IncrementalJSONParser:
+    def __init__(self):
+        self.root: Any = None
+        self.completed_paths: Set[Path] = set()
+        self._state = _VALUE
+        # 열린 컨테이너: {"c": dict|list, "k": 현재 key/index, "path": 컨테이너 경로}
+        self._stack: List[Dict[str, Any]] = []
+        # 진행 중인 문자열: {"key": bool, "parts": [...], "path": ..., "flushed": int}
+        self._string: Optional[Dict[str, Any]] = None
+        self._escape: Optional[str] = None  # None | "" (백슬래시 직후) | "u12" (유니코드 진행 중)
+        self._high_surrogate: Optional[int] = None
+        self._literal: List[str] = []
+
+    # -------------------------
+    # Public
+    # -------------------------
+
+    @property
+    def value(self) -> Any:
+        return self.root
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def is_complete(self, *path: Any) -> bool:
+        return tuple(path) in self.completed_paths
+
+    def get(self, *path: Any, default: Any = None) -> Any:
+        node = self.root
+        for key in path:
+            try:
+                node = node[key]
+            except (KeyError, IndexError, TypeError):
+                return default
+        return node
+
+    def feed(self, chunk: str) -> List[JSONStreamEvent]:
+        events: List[JSONStreamEvent] = []
+        i, n = 0, len(chunk)
+        while i < n:
+            if self._state == _STRING and self._escape is None:
+                # 일반 문자 구간은 한 번에 잘라서 처리
+                j = i
+                while j < n and chunk[j] != '"' and chunk[j] != "\\":
+                    j += 1
+                if j > i:
+                    self._string["parts"].append(chunk[i:j])
+                    i = j
+                    continue
+            self._step(chunk[i], events)
+            i += 1
+        self._flush_string(events)
+        return events
+
+    def close(self) -> List[JSONStreamEvent]:
+        """
+        스트림 종료: 최상위 숫자/리터럴처럼 구분자 없이 끝난 값을 마무리
+        """
+        events: List[JSONStreamEvent] = []
+        if self._state == _LITERAL:
+            self._finish_literal(events)
+        return events
+
+    # -------------------------
+    # State machine
+    # -------------------------
+
+    def _path(self) -> Path:
+        return tuple(frame["k"] for frame in self._stack)
+
+    def _place(self, value: Any) -> Path:
+        if not self._stack:
+            self.root = value
+            return ()
+        frame = self._stack[-1]
+        container = frame["c"]
+        if isinstance(container, list):
+            frame["k"] = len(container)
+            container.append(value)
+        else:
+            container[frame["k"]] = value
+        return self._path()
+
+    def _set(self, path: Path, value: Any) -> None:
+        if not self._stack:
+            self.root = value
+            return
+        frame = self._stack[-1]
+        frame["c"][frame["k"]] = value
+
+    def _completed(self, path: Path, value: Any, events: List[JSONStreamEvent]) -> None:
+        self.completed_paths.add(path)
+        events.append(JSONStreamEvent("complete", path, value))
+        self._state = _AFTER_VALUE if self._stack else _DONE
+
+    def _flush_string(self, events: List[JSONStreamEvent]) -> None:
+        s = self._string
+        if s is None or s["key"] or len(s["parts"]) == s["flushed"]:
+            return
+        delta = "".join(s["parts"][s["flushed"]:])
+        s["parts"] = ["".join(s["parts"])]
+        s["flushed"] = 1
+        self._set(s["path"], s["parts"][0])
+        if delta:
+            events.append(JSONStreamEvent("delta", s["path"], delta))
+
+    def _start_string(self, is_key: bool) -> None:
+        path = None if is_key else self._place("")
+        self._string = {"key": is_key, "parts": [], "path": path, "flushed": 0}
+        self._state = _STRING
+
+    def _end_string(self, events: List[JSONStreamEvent]) -> None:
+        s = self._string
+        self._flush_string(events)
+        self._string = None
+        text = "".join(s["parts"])
+        if s["key"]:
+            self._stack[-1]["k"] = text
+            self._state = _COLON
+        else:
+            self._completed(s["path"], text, events)
+
+    def _finish_literal(self, events: List[JSONStreamEvent]) -> None:
+        raw = "".join(self._literal)
+        self._literal = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        path = self._place(value)
+        self._completed(path, value, events)
+
+    def _close_container(self, events: List[JSONStreamEvent]) -> None:
+        frame = self._stack.pop()
+        self._completed(frame["path"], frame["c"], events)
+
+    def _step(self, ch: str, events: List[JSONStreamEvent]) -> None:
+        state = self._state
+
+        if state == _STRING:
+            self._string_char(ch, events)
+            return
+
+        if state == _LITERAL:
+            if ch in ",}]" or ch in _WHITESPACE:
+                self._finish_literal(events)
+                self._step(ch, events)
+            else:
+                self._literal.append(ch)
+            return
+
+        if ch in _WHITESPACE or state == _DONE:
+            return
+
+        if state == _VALUE:
+            if ch in "{[":
+                container: Any = {} if ch == "{" else []
+                path = self._place(container)
+                self._stack.append({"c": container, "k": None, "path": path})
+                self._state = _OBJ_KEY if ch == "{" else _VALUE
+            elif ch == "]" and self._stack and isinstance(self._stack[-1]["c"], list):
+                self._close_container(events)
+            elif ch == '"':
+                self._start_string(is_key=False)
+            else:
+                self._literal = [ch]
+                self._state = _LITERAL
+        elif state == _OBJ_KEY:
+            if ch == '"':
+                self._start_string(is_key=True)
+            elif ch == "}":
+                self._close_container(events)
+        elif state == _COLON:
+            if ch == ":":
+                self._state = _VALUE
+        elif state == _AFTER_VALUE:
+            if ch == ",":
+                self._state = _OBJ_KEY if isinstance(self._stack[-1]["c"], dict) else _VALUE
+            elif ch in "}]":
+                self._close_container(events)
+
+    def _string_char(self, ch: str, events: List[JSONStreamEvent]) -> None:
+        parts = self._string["parts"]
+        if self._escape is None:
+            if ch == '"':
+                self._end_string(events)
+            elif ch == "\\":
+                self._escape = ""
+            else:
+                parts.append(ch)
+            return
+
+        if self._escape == "":
+            if ch == "u":
+                self._escape = "u"
+            else:
+                parts.append(_ESCAPES.get(ch, ch))
+                self._escape = None
+            return
+
+        # \uXXXX
+        self._escape += ch
+        if len(self._escape) < 5:
+            return
+        code = int(self._escape[1:], 16)
+        self._escape = None
+        if 0xD800 <= code < 0xDC00:
+            self._high_surrogate = code
+            return
+        if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+            code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+        self._high_surrogate = None
+        parts.append(chr(code))
@@ -0,0 +1,16 @@
+from typing import Any
+
+from langchain_core.documents import Document
+
+
+def document_from_point(point: Any, collection_name: str, content_key: str, metadata_key: str) -> Document:
+    """
+    Qdrant point(ScoredPoint/Record) -> langchain Document.
+    QdrantVectorStore의 변환과 같은 모양 (metadata에 _id / _collection_name 추가)이지만
+    private API(QdrantVectorStore._document_from_point)에 의존하지 않도록 직접 구성합니다.
+    """
+    payload = point.payload or {}
+    metadata = dict(payload.get(metadata_key) or {})
+    metadata["_id"] = point.id
+    metadata["_collection_name"] = collection_name
+    return Document(page_content=payload.get(content_key) or "", metadata=metadata)
@@ -0,0 +1,131 @@
+"""
+WebSocket 프레임 공용 직렬화 계층 (orjson / ormsgpack)
+
+- 브로드캐스트 1건은 EncodedFrame 하나로 감싸 N개 소켓에 그대로 보냅니다. (직렬화는 포맷별 최초 1회)
+- 클라이언트는 접속 URL의 ?format=msgpack 으로 바이너리(msgpack) 모드를 선택할 수 있습니다. 기본은 JSON 텍스트.
+"""
+from typing import Any, Optional, Union
+
+import orjson
+
+try:
+    import ormsgpack
+except ImportError:  # msgpack 모드는 선택 사항
+    ormsgpack = None
+
+FORMAT_JSON = "json"
+FORMAT_MSGPACK = "msgpack"
+
+_ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+_MSGPACK_OPTIONS = (
+    ormsgpack.OPT_NON_STR_KEYS | ormsgpack.OPT_SERIALIZE_NUMPY | ormsgpack.OPT_SERIALIZE_PYDANTIC
+    if ormsgpack is not None
+    else 0
+)
+
+
+def _default(obj: Any) -> Any:
+    # pydantic 모델, set 등 stdlib json도 못 다루던 값들을 최대한 살려서 전송
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(obj: Any) -> bytes:
+    return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+
+
+def dumps_text(obj: Any) -> str:
+    return dumps(obj).decode("utf-8")
+
+
+def loads(data: Union[str, bytes, bytearray, memoryview]) -> Any:
+    """
+    orjson.JSONDecodeError는 json.JSONDecodeError의 하위 클래스라 기존 except 절이 그대로 동작합니다.
+    """
+    return orjson.loads(data)
+
+
+def dumps_msgpack(obj: Any) -> bytes:
+    if ormsgpack is None:
+        raise RuntimeError("msgpack format requested but 'ormsgpack' is not installed")
+    return ormsgpack.packb(obj, default=_default, option=_MSGPACK_OPTIONS)
+
+
+def loads_msgpack(data: bytes) -> Any:
+    if ormsgpack is None:
+        raise RuntimeError("msgpack format requested but 'ormsgpack' is not installed")
+    return ormsgpack.unpackb(data)
+
+
+def negotiate_format(websocket: Any) -> str:
+    """
+    접속 시 쿼리스트링으로 포맷 협상: ?format=msgpack (ormsgpack 미설치 시 JSON으로 대체)
+    """
+    try:
+        requested = (websocket.query_params.get("format") or "").lower()
+    except AttributeError:
+        return FORMAT_JSON
+    if requested == FORMAT_MSGPACK and ormsgpack is not None:
+        return FORMAT_MSGPACK
+    return FORMAT_JSON
+
+
+def decode_frame(text: Optional[str], data: Optional[bytes], fmt: str = FORMAT_JSON) -> Any:
+    """
+    수신 프레임 디코딩: 텍스트는 항상 JSON, 바이너리는 msgpack 모드일 때만 허용
+    """
+    if text is not None:
+        return loads(text)
+    if data is not None and fmt == FORMAT_MSGPACK:
+        return loads_msgpack(data)
+    raise ValueError("binary frame received on a JSON-mode socket")
+
+
+async def receive_frame(websocket: Any, fmt: str = FORMAT_JSON) -> Any:
+    """
+    텍스트/바이너리 프레임을 받아 디코딩. 연결 종료 시 WebSocketDisconnect, 디코딩 실패 시 ValueError
+    """
+    message = await websocket.receive()
+    if message.get("type") == "websocket.disconnect":
+        from fastapi import WebSocketDisconnect
+
+        raise WebSocketDisconnect(message.get("code", 1000))
+    return decode_frame(message.get("text"), message.get("bytes"), fmt)
+
+
+class EncodedFrame:
+    """
+    송신 메시지 1건 + 포맷별 직렬화 결과 캐시. 같은 프레임을 여러 소켓에 보내도 직렬화는 한 번입니다.
+    """
+
+    __slots__ = ("message", "_text", "_msgpack")
+
+    def __init__(self, message: Any):
+        self.message = message
+        self._text: Optional[str] = None
+        self._msgpack: Optional[bytes] = None
+
+    @property
+    def text(self) -> str:
+        if self._text is None:
+            self._text = dumps_text(self.message)
+        return self._text
+
+    @property
+    def msgpack(self) -> bytes:
+        if self._msgpack is None:
+            self._msgpack = dumps_msgpack(self.message)
+        return self._msgpack
+
+    async def send(self, websocket: Any, fmt: str = FORMAT_JSON) -> None:
+        if fmt == FORMAT_MSGPACK:
+            await websocket.send_bytes(self.msgpack)
+        else:
+            await websocket.send_text(self.text)
+
+
+def as_frame(message: Any) -> EncodedFrame:
+    return message if isinstance(message, EncodedFrame) else EncodedFrame(message)
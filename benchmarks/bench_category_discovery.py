@@ -0,0 +1,90 @@
+"""
+카테고리 탐색 비교: scroll 250건 샘플링(기존 _sample_categories) vs keyword 인덱스 facet 집계(CategoryCatalog)
+
+  - 앞쪽 250건에 없는 카테고리(뒤늦게 적재된 terms 등)를 찾는지
+  - 탐색 1회 소요 시간 (참고용: in-memory Qdrant는 payload 인덱스가 없어 facet도 전체 스캔합니다.
+    서버 Qdrant에서는 facet이 인덱스만 읽고, scroll은 payload 전체를 네트워크로 내려받습니다)
+  - 카테고리별 문서 수 / 빈 카테고리 검색 생략 수
+
+실행: python benchmarks/bench_category_discovery.py [--points 3000] [--rounds 20]
+"""
+import argparse
+import os
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+from app.services.category_catalog import CategoryCatalog  # noqa: E402
+
+REQUESTED = ["marketing", "guideline", "principle", "terms"]
+
+
+def build_fixture(n: int) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection("cs_guideline", vectors_config={})
+    points = []
+    for i in range(n):
+        # terms 문서는 컬렉션 뒤쪽에만 적재 (나중에 추가된 약관 문서)
+        cat = "terms" if i >= n - 40 else ("marketing", "guideline")[i % 2]
+        points.append(
+            models.PointStruct(
+                id=i,
+                vector={},
+                payload={
+                    "page_content": f"{cat} 문서 {i} " + "요금제 할인 결합 약정 혜택 " * 40,
+                    "metadata": {"category": cat, "title": f"{cat}-{i}", "source": f"doc{i}.md"},
+                },
+            )
+        )
+    client.upsert("cs_guideline", points=points)
+    return client
+
+
+def legacy_sample(client: QdrantClient, n: int = 250):
+    cats = set()
+    pts, _ = client.scroll(collection_name="cs_guideline", limit=n, with_payload=True, with_vectors=False)
+    for p in pts:
+        md = (p.payload or {}).get("metadata", {})
+        if isinstance(md, dict) and md.get("category"):
+            cats.add(md["category"])
+    return sorted(cats)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=3000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    warnings.filterwarnings("ignore", message="Payload indexes have no effect")
+    client = build_fixture(args.points)
+    catalog = CategoryCatalog(client, "cs_guideline")
+
+    for label, fn in (
+        ("scroll sample (250, full payload)", lambda: legacy_sample(client)),
+        ("facet on metadata.category", lambda: (catalog.refresh(), catalog.categories)[1]),
+    ):
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            found = fn()
+        per = (time.perf_counter() - t0) / args.rounds * 1000
+        searched = [c for c in REQUESTED if c in found]
+        print(f"{label:<36} {per:8.2f}ms   categories={found}   searched={searched}")
+
+    print(f"\ncounts: {catalog.counts} (source={catalog.source})")
+    skipped = [c for c in REQUESTED if c not in catalog.categories]
+    print(f"per-category queries skipped (missing/empty): {skipped}")
+
+
+if __name__ == "__main__":
+    main()
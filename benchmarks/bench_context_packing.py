@@ -0,0 +1,97 @@
+"""
+근거 컨텍스트 크기 비교: 글자 수 제한(기존 build_context max_chars=8500/per_doc_chars=850) vs 토큰 예산 packer
+
+  - 턴마다 검색 결과 수/문서 길이/한영 비율이 다른 합성 턴을 만들어 컨텍스트 토큰 수 분포(p50/p95/max)를 비교
+  - 글자 수 제한은 한글 비율에 따라 토큰 수가 크게 흔들리고, 토큰 예산은 상한을 넘지 않음
+  - 토큰 수는 tiktoken(LLM_MODEL 인코딩), BPE 파일을 받을 수 없는 환경이면 근사치로 계산 (encoding 출력 참고)
+
+실행: python benchmarks/bench_context_packing.py [--turns 500]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.session import RetrievedItem, build_context, safe_str  # noqa: E402
+from app.services.context_packer import get_encoding, marketing_context_packer  # noqa: E402
+
+KO = "약정 기간 중 해지 시 위약금이 발생하며 결합 할인은 다음 달부터 적용됩니다".split()
+EN = "5G Premium plan includes unlimited data roaming OTT bundle with family sharing".split()
+
+
+def legacy_build_context(items, max_chars=8500, per_doc_chars=850):
+    blocks, used = [], 0
+    for it in items:
+        src = safe_str(it.metadata.get("source"))
+        title = safe_str(it.metadata.get("title"))
+        cat = safe_str(it.category)
+        txt = re.sub(r"\n{3,}", "\n\n", (it.page_content or "").strip())[:per_doc_chars]
+        block = f"[{it.doc_id}]\n- category: {cat}\n- title: {title}\n- source: {src}\n- content:\n{txt}\n"
+        if used + len(block) > max_chars:
+            break
+        blocks.append(block)
+        used += len(block)
+    return "\n\n".join(blocks).strip()
+
+
+def make_turn(rng):
+    ko_ratio = rng.random()
+    items = []
+    for i in range(rng.randint(2, 8)):
+        words = [rng.choice(KO) if rng.random() < ko_ratio else rng.choice(EN) for _ in range(rng.randint(20, 400))]
+        items.append(
+            RetrievedItem(
+                doc_id=f"DOC{i + 1}",
+                score=rng.random(),
+                page_content=" ".join(words),
+                metadata={"source": f"doc{i}.md", "title": f"안내 {i}"},
+                category=rng.choice(["guideline", "terms", "principle"]),
+            )
+        )
+    return items
+
+
+def dist(values):
+    values = sorted(values)
+    return (
+        f"p50 {values[len(values) // 2]:6d}   p95 {values[int(len(values) * 0.95)]:6d}   "
+        f"max {values[-1]:6d}   spread(max-min) {values[-1] - values[0]:6d}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=500)
+    args = parser.parse_args()
+
+    packer = marketing_context_packer
+    enc = get_encoding(packer.model)
+    print(f"model={packer.model} encoding={getattr(enc, 'name', 'estimate')} budget={packer.budget}\n")
+
+    rng = random.Random(3)
+    turns = [make_turn(rng) for _ in range(args.turns)]
+
+    legacy = [packer.count(legacy_build_context(t)) for t in turns]
+    t0 = time.perf_counter()
+    packed = [build_context(t)[0] for t in turns]
+    per = (time.perf_counter() - t0) / len(turns) * 1000
+    packed_tokens = [packer.count(text) for text in packed]
+
+    print(f"{'chars (8500 / 850 per doc)':<28} {dist(legacy)}")
+    print(f"{'tokens (packer)':<28} {dist(packed_tokens)}   {per:.2f}ms / turn")
+    print(f"\nover budget: chars {sum(v > packer.budget for v in legacy)}/{len(turns)}, "
+          f"tokens {sum(v > packer.budget for v in packed_tokens)}/{len(turns)}")
+
+
+if __name__ == "__main__":
+    main()
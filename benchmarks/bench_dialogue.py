@@ -0,0 +1,167 @@
+"""
+MarketingSession 대화 렌더링 비교: 호출마다 최근 턴 전체 mask_pii(re.sub 7회) vs 턴 생성 시 1회 마스킹 + 창 캐시
+
+  - 고객 발화마다 실제 소비자 순서대로 대화를 읽음
+      build_query(last_n=14, 쿼리 지문/검색 쿼리 3회), analyze_node(last_n=6), generate_node(last_n=12)
+  - 통화 길이(턴 수)를 늘려가며 고객 턴당 CPU 비교 - after는 add_turn 비용 포함
+  - PII가 섞인 발화에 대해 legacy mask_pii / dialogue_text 와 결과가 같은지 확인
+
+실행: python benchmarks/bench_dialogue.py [--rounds 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.session import QUERY_KEYWORDS, MarketingSession, mask_pii  # noqa: E402
+
+# -------------------------
+# Legacy implementation (변경 전 코드 그대로)
+# -------------------------
+
+
+def legacy_mask_pii(text):
+    if not text:
+        return ""
+    if isinstance(text, dict):
+        text = text.get("ment") or text.get("recommendation") or str(text)
+    t = str(text)
+    t = re.sub(r"\b01[0-9][- ]?\d{3,4}[- ]?\d{4}\b", "<PHONE>", t)
+    t = re.sub(r"\b\d{6,}\b", "<NUM>", t)
+    t = re.sub(r"([가-힣]{1,10}(?:로|길)\s*\d+(?:[가-힣0-9\s\-]*)?)", "<ADDRESS>", t)
+    t = re.sub(r"\b\d+\s*호\b", "<HO>", t)
+    t = re.sub(r"(성함이)\s*([가-힣]{2,4})", r"\1 <NAME>", t)
+    t = re.sub(r"(상담사)\s*([가-힣]{2,4})", r"\1 <NAME>", t)
+    t = re.sub(r"([가-힣]{2,4})\s*고객님", r"<NAME> 고객님", t)
+    return t
+
+
+def legacy_dialogue_text(turns, last_n=14):
+    part = turns[-last_n:] if last_n and len(turns) > last_n else turns
+    lines = []
+    for t in part:
+        role = "고객" if t.speaker == "customer" else "상담원"
+        txt = legacy_mask_pii(t.transcript or "")
+        if txt.strip():
+            lines.append(f"{role}: {txt}")
+    return "\n".join(lines).strip()
+
+
+def legacy_customer_turn(session):
+    for _ in range(3):  # query_fingerprint(prefetch) / take_prefetched / build_query
+        dialog = legacy_dialogue_text(session.turns)
+        [k for k in QUERY_KEYWORDS if k in dialog]
+    legacy_dialogue_text(session.turns, last_n=6)  # analyze_node
+    return legacy_dialogue_text(session.turns, last_n=12)  # generate_node
+
+
+def new_customer_turn(session):
+    for _ in range(3):
+        session.dialogue_text()
+        session._query_keywords(session.turns)
+    session.dialogue_text(last_n=6)
+    return session.dialogue_text(last_n=12)
+
+
+# -------------------------
+# Fixture
+# -------------------------
+
+PLAIN = [
+    "네 안녕하세요 무엇을 도와드릴까요",
+    "이번 달 요금이 좀 많이 나와서요 데이터를 많이 썼나 봐요",
+    "확인해 보니 데이터 초과 요금이 붙었습니다",
+    "그럼 요금제를 바꾸면 할인이 되나요",
+    "가족결합 하시면 월 만원 정도 할인 가능합니다",
+    "약정이 언제까지였죠 해지하면 위약금 있나요",
+    "네 잠시만 기다려 주세요",
+]
+PII = [
+    "제 번호는 010-1234-5678 이에요",
+    "주소는 강남대로 123 래미안아파트 101동 이고요",
+    "성함이 홍길동 맞으신가요",
+    "저는 상담사 김민지 입니다",
+    "박철수 고객님 맞으시죠",
+    "고객번호 12345678 로 조회됩니다",
+    "1203 호 입니다",
+    "테헤란로 12 010-9876-5432 로 보내주세요",
+]
+
+
+def make_call(n, rng):
+    return [rng.choice(PII) if rng.random() < 0.25 else rng.choice(PLAIN) for _ in range(n)]
+
+
+def new_session():
+    session = MarketingSession.__new__(MarketingSession)
+    session.turns = []
+    session._dialogue_cache = {}
+    return session
+
+
+def run(call, step, add):
+    session = new_session()
+    out = []
+    for i, t in enumerate(call):
+        speaker = "customer" if i % 2 else "agent"
+        add(session, speaker, t)
+        if speaker == "customer":
+            out.append(step(session))
+    return out
+
+
+def add_turn(session, speaker, text):
+    session.add_turn(speaker, text)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    samples = PLAIN + PII + [rng.choice(PII) + " " + rng.choice(PLAIN) for _ in range(200)]
+    mismatches = sum(legacy_mask_pii(t) != mask_pii(t) for t in samples)
+    for n in (20, 80):
+        call = make_call(n, rng)
+        if run(call, legacy_customer_turn, add_turn) != run(call, new_customer_turn, add_turn):
+            mismatches += 1
+    print(f"{len(samples)} utterances + 2 calls, mismatches vs legacy: {mismatches}\n")
+
+    print(f"{'call turns':>10} {'before us/turn':>16} {'after us/turn':>16}")
+    for n in (20, 60, 120, 240):
+        calls = [make_call(n, rng) for _ in range(10)]
+        row = []
+        for step in (legacy_customer_turn, new_customer_turn):
+            t0 = time.perf_counter()
+            for _ in range(args.rounds):
+                for call in calls:
+                    run(call, step, add_turn)
+            row.append((time.perf_counter() - t0) / (args.rounds * len(calls) * (n // 2)) * 1e6)
+        print(f"{n:>10} {row[0]:>16.2f} {row[1]:>16.2f}")
+
+    t0 = time.perf_counter()
+    for _ in range(args.rounds * 100):
+        for t in samples:
+            legacy_mask_pii(t)
+    before = (time.perf_counter() - t0) / (args.rounds * 100 * len(samples)) * 1e6
+    t0 = time.perf_counter()
+    for _ in range(args.rounds * 100):
+        for t in samples:
+            mask_pii(t)
+    after = (time.perf_counter() - t0) / (args.rounds * 100 * len(samples)) * 1e6
+    print(f"\nmask_pii per utterance (PII-heavy mix): before {before:.2f}us ; after {after:.2f}us")
+
+
+if __name__ == "__main__":
+    main()
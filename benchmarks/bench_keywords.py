@@ -0,0 +1,223 @@
+"""
+턴당 키워드 판정 비교: 기존 `any(k in t ...)` 루프 + 개별 정규식 vs 공용 키워드 엔진(app.utils.keywords)
+
+  - utterance: 발화 1건에 대해 모든 사전(quick_router / Gatekeeper / query / analyze_node / RP)을 판정
+      before = 사전마다 any()/정규식 (변경 전 코드 그대로, 아래 legacy_*), after = 엔진 스캔 1회
+  - call flow: 통화 1건을 재생하며 고객 발화마다 실제 소비자 순서대로 판정
+      (partial 트리거 + query_fingerprint, semantic_route, analyze_node, retrieve_node 의 fingerprint/build_query)
+      before = 소비자마다 발화/대화 전체 재스캔, after = annotate() LRU 공유 + 턴별 annotation 합집합
+  - QA 대표 턴 선택은 여부만 보면 되고 공유할 annotation이 없어 KEYWORD_RE(같은 사전)를 유지 - 그 근거 수치
+  - 모든 사전 카테고리 + 대화 키워드에 대해 두 방식의 판정 결과가 같은지 확인
+
+실행: python benchmarks/bench_keywords.py [--turns 2000] [--rounds 5]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.session import MarketingSession, Turn, mask_pii  # noqa: E402
+from app.utils.keywords import LEXICONS, KeywordEngine, _annotate, annotate, keyword_engine  # noqa: E402
+
+# -------------------------
+# Legacy implementation (변경 전 코드 그대로)
+# -------------------------
+
+FURIOUS_RE = re.compile("|".join(LEXICONS["gatekeeper.furious"]), re.IGNORECASE)
+SENSITIVE_RE = re.compile("|".join(LEXICONS["gatekeeper.sensitive"]), re.IGNORECASE)
+OPPORTUNITY_RE = re.compile("|".join(LEXICONS["gatekeeper.opportunity"]), re.IGNORECASE)
+QA_RE = re.compile("|".join(LEXICONS["qa.pick"]))
+
+
+def legacy_quick_router(t, signals):
+    out = {}
+    for cat in ("router.verification", "router.consent", "router.closing", "router.churn",
+                "router.upsell", "router.complaint"):
+        out[cat] = any(k in t for k in LEXICONS[cat])
+    out["router.db_signal"] = any(any(k in s for k in LEXICONS["router.db_signal"]) for s in signals)
+    return out
+
+
+def legacy_utterance(t, signals):
+    """고객 발화 1건에 대한 판정 (카테고리 -> 결과)"""
+    out = legacy_quick_router(t, signals)
+    out["gatekeeper.furious"] = bool(FURIOUS_RE.search(t))
+    out["gatekeeper.opportunity"] = bool(OPPORTUNITY_RE.search(t))
+    out["gatekeeper.sensitive"] = bool(SENSITIVE_RE.search(t))
+    out["query"] = [k for k in LEXICONS["query"] if k in t]
+    out["analyze.churn"] = "해지" in t or "탈퇴" in t
+    out["analyze.cheap"] = "싸" in t or "저렴" in t
+    out["analyze.alternative"] = any(x in t for x in LEXICONS["analyze.alternative"])
+    for lvl in range(1, 5):
+        out[f"rp.level{lvl}"] = any(k in t for k in LEXICONS[f"rp.level{lvl}"])
+    return out
+
+
+def engine_utterance(t, signals):
+    hits = keyword_engine.scan(t)
+    out = {}
+    for cat in LEXICONS:
+        if cat in ("router.db_signal", "qa.pick"):
+            continue
+        out[cat] = hits.matched(cat) if cat == "query" else hits.has(cat)
+    # quick_router 와 같이 고객 DB 신호는 annotate() (통화 내내 같은 텍스트 -> LRU)
+    out["router.db_signal"] = annotate("\n".join(signals)).has("router.db_signal")
+    return out
+
+
+def legacy_dialogue_text(turns, last_n=14):
+    part = turns[-last_n:] if last_n and len(turns) > last_n else turns
+    lines = []
+    for t in part:
+        role = "고객" if t.speaker == "customer" else "상담원"
+        txt = mask_pii(t.transcript or "")
+        if txt.strip():
+            lines.append(f"{role}: {txt}")
+    return "\n".join(lines).strip()
+
+
+def legacy_query_keywords(session, turns):
+    dialog = legacy_dialogue_text(turns)
+    return [k for k in LEXICONS["query"] if k in dialog]
+
+
+def legacy_customer_turn(session, t):
+    """
+    변경 전: 고객 발화 1건이 처리되는 동안 실행되던 키워드 판정
+    (partial 트리거 + fingerprint, semantic_route, analyze_node, retrieve_node 의 fingerprint/build_query)
+    """
+    OPPORTUNITY_RE.search(t)  # handle_partial_transcript
+    legacy_query_keywords(session, session.turns)  # start_prefetch -> query_fingerprint
+    FURIOUS_RE.search(t)  # semantic_route -> classify_topic
+    OPPORTUNITY_RE.search(t)
+    FURIOUS_RE.search(t)  # semantic_route -> check_safety
+    SENSITIVE_RE.search(t)
+    FURIOUS_RE.search(t)  # analyze_node -> should_skip_marketing
+    SENSITIVE_RE.search(t)
+    "해지" in t or "탈퇴" in t
+    "싸" in t or "저렴" in t
+    any(x in t for x in LEXICONS["analyze.alternative"])
+    legacy_query_keywords(session, session.turns)  # retrieve_node -> take_prefetched fingerprint
+    return legacy_query_keywords(session, session.turns)  # build_query
+
+
+def engine_customer_turn(session, t):
+    gk = annotate(t)
+    gk.has("gatekeeper.opportunity")
+    session._query_keywords(session.turns)
+    for _ in range(3):  # classify_topic / check_safety / should_skip_marketing: 모두 같은 annotation
+        hits = annotate(t)
+        hits.has("gatekeeper.furious")
+        hits.has("gatekeeper.sensitive")
+    hits.has("analyze.churn")
+    hits.has("analyze.cheap")
+    hits.has("analyze.alternative")
+    session._query_keywords(session.turns)
+    return session._query_keywords(session.turns)
+
+
+# -------------------------
+# Fixture
+# -------------------------
+
+FILLER = "네 고객님 그러니까 제가 지금 확인해 보니까 이번 달에 좀 많이 나와서 여쭤보려고 전화 드렸어요".split()
+SIGNALS = ["약정 만료 임박(재약정/기기변경 제안 적기)", "데이터 초과 사용 잦음(상위 요금제 업셀링 기회)", "인터넷 미사용"]
+
+
+def make_turns(n, rng):
+    vocab = sorted({w for words in LEXICONS.values() for w in words if "\\s*" not in w})
+    turns = []
+    for _ in range(n):
+        words = [rng.choice(FILLER) for _ in range(rng.randint(4, 30))]
+        for _ in range(rng.randint(0, 4)):
+            words.insert(rng.randrange(len(words) + 1), rng.choice(vocab))
+        if rng.random() < 0.2:
+            words.insert(rng.randrange(len(words) + 1), rng.choice(["본인  확인", "추가\n요금", "확인해   보겠"]))
+        turns.append(" ".join(words))
+    return turns
+
+
+def bench(label, fn, items, rounds, unit="turn"):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for it in items:
+            fn(it)
+    per = (time.perf_counter() - t0) / (rounds * len(items)) * 1e6
+    print(f"{label:<48} {per:8.2f}us / {unit}")
+    return per
+
+
+def simulate_call(utterances, step):
+    """
+    통화 1건: 상담사/고객 발화가 번갈아 쌓이고, 고객 발화마다 step(session, utterance) 실행
+    """
+    session = MarketingSession.__new__(MarketingSession)
+    session.turns = []
+    out = []
+    for i, t in enumerate(utterances):
+        speaker = "customer" if i % 2 else "agent"
+        session.turns.append(Turn(turn_id=i, speaker=speaker, transcript=t))
+        if speaker == "customer":
+            out.append(step(session, t))
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--call-turns", type=int, default=40)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    turns = make_turns(args.turns, rng)
+    calls = [turns[i:i + args.call_turns] for i in range(0, len(turns), args.call_turns)]
+
+    mismatches = 0
+    for t in turns:
+        if legacy_utterance(t, SIGNALS) != engine_utterance(t, SIGNALS):
+            mismatches += 1
+        if bool(QA_RE.search(t)) != keyword_engine.scan(t).has("qa.pick"):
+            mismatches += 1
+    for call in calls:
+        if simulate_call(call, legacy_customer_turn) != simulate_call(call, engine_customer_turn):
+            mismatches += 1
+    print(f"{len(turns)} utterances / {len(calls)} calls, {len(LEXICONS)} lexicons, mismatches vs legacy: {mismatches}")
+
+    t0 = time.perf_counter()
+    KeywordEngine(LEXICONS)
+    print(f"engine build: {(time.perf_counter() - t0) * 1000:.2f}ms (once per process)\n")
+
+    bench("utterance, all lexicons: any()/regex", lambda t: legacy_utterance(t, SIGNALS), turns, args.rounds, "utterance")
+    bench("utterance, all lexicons: one engine scan", lambda t: engine_utterance(t, SIGNALS), turns, args.rounds, "utterance")
+    print()
+
+    n_customer = sum(len(c) // 2 for c in calls)
+    for label, step in (
+        ("call flow before (per-consumer scans)", legacy_customer_turn),
+        ("call flow after  (shared annotation)", engine_customer_turn),
+    ):
+        _annotate.cache_clear()
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            for call in calls:
+                simulate_call(call, step)
+        per = (time.perf_counter() - t0) / (args.rounds * n_customer) * 1e6
+        print(f"{label:<48} {per:8.2f}us / customer turn")
+    print()
+    bench("QA pick: KEYWORD_RE.search", lambda t: QA_RE.search(t), turns, args.rounds, "utterance")
+    bench("QA pick: keyword_engine.scan().has", lambda t: keyword_engine.scan(t).has("qa.pick"), turns, args.rounds, "utterance")
+
+
+if __name__ == "__main__":
+    main()
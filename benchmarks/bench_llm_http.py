@@ -0,0 +1,197 @@
+"""
+OpenAICompatibleLLM.chat_json 전송 비교: 호출마다 새 httpx.AsyncClient (변경 전) vs 프로세스 공용 keep-alive 풀
+
+  - 로컬 가짜 /chat/completions 서버 (asyncio, HTTP/1.1 keep-alive)
+      새 커넥션마다 --connect-ms 만큼 지연 (원격 LLM의 TCP+TLS 핸드셰이크 흉내)
+      응답 지연 --llm-ms, 일부 요청은 finish_reason=length / 깨진 JSON -> chat_json 의 length 재시도 / JSON 복구 경로
+      --fail-every N 이면 N번째 요청마다 429 (Retry-After: 0) -> 변경 후에는 재시도, 변경 전에는 호출 실패
+  - 출력: 호출당 지연(p50/p95), 서버가 받은 커넥션 수, 실패 호출 수, purpose별 시도/재시도 통계
+  - 로컬 서버는 평문 HTTP라 HTTP/2 협상은 일어나지 않음 (HTTP/2 는 TLS ALPN 이 필요) -> 커넥션 재사용 효과만 측정
+
+실행: python benchmarks/bench_llm_http.py [--calls 200] [--concurrency 8] [--connect-ms 40]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+os.environ.setdefault("LLM_MODEL", "gpt-4o-mini")
+
+# -------------------------
+# Fake OpenAI-compatible server
+# -------------------------
+
+
+class FakeServer:
+    def __init__(self, connect_ms, llm_ms, fail_every):
+        self.connect_ms = connect_ms
+        self.llm_ms = llm_ms
+        self.fail_every = fail_every
+        self.connections = 0
+        self.requests = 0
+
+    def _completion(self, body):
+        prompt = body["messages"][-1]["content"]
+        finish, content = "stop", json.dumps({"ok": True, "n": self.requests})
+        if "[LEN]" in prompt and "[추가 지시]" not in prompt:
+            finish = "length"
+        elif "[BAD]" in prompt and "직전 출력" not in prompt:
+            content = '{"ok": tru'
+        return {"choices": [{"finish_reason": finish, "message": {"content": content}}]}
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        await asyncio.sleep(self.connect_ms / 1000)  # handshake
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                body = json.loads(await reader.readexactly(length))
+                self.requests += 1
+                await asyncio.sleep(self.llm_ms / 1000)
+                if self.fail_every and self.requests % self.fail_every == 0:
+                    status, extra, payload = "429 Too Many Requests", b"Retry-After: 0\r\n", b'{"error":"rate"}'
+                else:
+                    status, extra, payload = "200 OK", b"", json.dumps(self._completion(body)).encode()
+                writer.write(
+                    f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n".encode()
+                    + extra
+                    + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                    + payload
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+# -------------------------
+# Legacy transport (변경 전 chat_json 의 요청 흐름 그대로: 호출마다 새 클라이언트, 재시도 없음)
+# -------------------------
+
+
+async def legacy_chat_json(llm, system_prompt, user_prompt):
+    headers = {"Authorization": f"Bearer {llm.api_key}", "Content-Type": "application/json"}
+    messages = [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+    payload = {"model": llm.model, "messages": messages, "response_format": {"type": "json_object"}}
+    async with httpx.AsyncClient(timeout=60) as cx:
+        url = f"{llm.base_url}/chat/completions"
+        r = await cx.post(url, headers=headers, json=payload)
+        r.raise_for_status()
+        choice = r.json()["choices"][0]
+        content = choice["message"]["content"]
+        if choice.get("finish_reason") == "length":
+            retry = dict(payload, messages=[messages[0], {"role": "user", "content": user_prompt + "\n\n[추가 지시]\n..."}])
+            r2 = await cx.post(url, headers=headers, json=retry)
+            r2.raise_for_status()
+            content = r2.json()["choices"][0]["message"]["content"]
+        try:
+            return llm._extract_json(content)
+        except Exception:
+            repair = dict(payload, messages=[messages[0], {"role": "user", "content": f"직전 출력(일부):\n{content}"}])
+            r3 = await cx.post(url, headers=headers, json=repair)
+            r3.raise_for_status()
+            return llm._extract_json(r3.json()["choices"][0]["message"]["content"])
+
+
+async def run(label, call, prompts, concurrency):
+    sem = asyncio.Semaphore(concurrency)
+    latencies, failures = [], 0
+
+    async def one(p):
+        nonlocal failures
+        async with sem:
+            t0 = time.perf_counter()
+            try:
+                await call("system", p)
+            except Exception:
+                failures += 1
+            latencies.append((time.perf_counter() - t0) * 1000)
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(one(p) for p in prompts))
+    wall = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "label": label,
+        "p50": latencies[len(latencies) // 2],
+        "p95": latencies[int(len(latencies) * 0.95)],
+        "wall": wall,
+        "failures": failures,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--connect-ms", type=float, default=40.0)
+    parser.add_argument("--llm-ms", type=float, default=20.0)
+    parser.add_argument("--fail-every", type=int, default=25)
+    args = parser.parse_args()
+
+    results = []
+    for mode in ("before", "after"):
+        server = FakeServer(args.connect_ms, args.llm_ms, args.fail_every)
+        srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+        port = srv.sockets[0].getsockname()[1]
+        os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+
+        from app.agent.marketing.session import OpenAICompatibleLLM
+        from app.core.config import settings
+        from app.services.llm_http import LLMHttpClient
+        import app.agent.marketing.session as session_mod
+
+        settings.LLM_RETRY_BACKOFF = 0.01
+        llm = OpenAICompatibleLLM()
+        session_mod.llm_http_client = LLMHttpClient()
+        rng = random.Random(7)
+        prompts = [rng.choice(["턴 분석", "턴 분석", "턴 분석", "[LEN] 멘트 생성", "[BAD] 멘트 생성"]) for _ in range(args.calls)]
+
+        if mode == "before":
+            res = await run("before: client per call", lambda s, u: legacy_chat_json(llm, s, u), prompts, args.concurrency)
+        else:
+            res = await run("after:  shared pool", llm.chat_json, prompts, args.concurrency)
+            res["stats"] = session_mod.llm_http_client.describe()
+            await session_mod.llm_http_client.aclose()
+        res["connections"] = server.connections
+        res["requests"] = server.requests
+        results.append(res)
+        srv.close()
+        await srv.wait_closed()
+
+    print(
+        f"{args.calls} chat_json calls, concurrency {args.concurrency}, handshake {args.connect_ms:.0f}ms, "
+        f"llm {args.llm_ms:.0f}ms, 429 every {args.fail_every} requests\n"
+    )
+    for r in results:
+        print(
+            f"{r['label']:<26} p50 {r['p50']:7.1f}ms  p95 {r['p95']:7.1f}ms  wall {r['wall']:6.2f}s  "
+            f"connections {r['connections']:4d}  requests {r['requests']:4d}  failed calls {r['failures']}"
+        )
+    print("\nafter, per purpose:")
+    for purpose, s in results[1]["stats"]["purposes"].items():
+        print(
+            f"  {purpose:<14} calls {s['calls']:4d} attempts {s['attempts']:4d} retries {s['retries']:3d} "
+            f"avg {s['avg_ms']}ms p95 {s['p95_ms']}ms status {s['status']}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+cs_guideline 로컬 사본(LocalVectorIndex) 벤치마크 + 정합성 확인
+
+  - 같은 fixture 컬렉션을 in-memory Qdrant(QdrantClient(":memory:"))에 넣고 LocalVectorIndex로 미러링
+  - semantic / keyword / hybrid(RRF, DBSF) x 카테고리 필터 요청을 양쪽에 보내 top-k id 순서 비교
+  - 요청당 지연: 로컬 사본 vs in-memory Qdrant (+ --rtt-ms 네트워크 왕복 가정치)
+  - sparse modifier=IDF 컬렉션도 확인 (--idf)
+
+실행: python benchmarks/bench_local_index.py [--points 2000] [--rounds 200] [--rtt-ms 15] [--idf]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+from bench_qdrant_async import (  # noqa: E402
+    DIM,
+    QUERY,
+    HashDenseEmbeddings,
+    HashSparseEmbeddings,
+    _points,
+)
+from app.services.local_index import LocalVectorIndex  # noqa: E402
+
+QUERIES = [QUERY, "해지 위약금 얼마나 나오나요", "가족 결합 할인 데이터 쉐어링", "로밍 요금제 추천"]
+
+
+def build_fixture(n: int, idf: bool) -> QdrantClient:
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name="cs_guideline",
+        vectors_config={"dense": models.VectorParams(size=DIM, distance=models.Distance.COSINE)},
+        sparse_vectors_config={
+            "sparse": models.SparseVectorParams(modifier=models.Modifier.IDF if idf else None)
+        },
+    )
+    client.upsert("cs_guideline", points=_points(HashDenseEmbeddings(), HashSparseEmbeddings(), n))
+    return client
+
+
+def requests_for(text: str):
+    dense = HashDenseEmbeddings().embed_query(text)
+    sv = HashSparseEmbeddings().embed_query(text)
+    sparse = models.SparseVector(indices=sv.indices, values=sv.values)
+    out = []
+    for cat in (None, "marketing", "terms", "없는카테고리"):
+        flt = None
+        if cat:
+            flt = models.Filter(
+                must=[models.FieldCondition(key="metadata.category", match=models.MatchValue(value=cat))]
+            )
+        base = dict(collection_name="cs_guideline", query_filter=flt, limit=6, with_payload=True)
+        out.append((f"semantic/{cat}", dict(base, query=dense, using="dense")))
+        out.append((f"keyword/{cat}", dict(base, query=sparse, using="sparse")))
+        for fusion in (models.Fusion.RRF, models.Fusion.DBSF):
+            out.append(
+                (
+                    f"hybrid-{fusion.value}/{cat}",
+                    dict(
+                        base,
+                        prefetch=[
+                            models.Prefetch(using="dense", query=dense, filter=flt, limit=6),
+                            models.Prefetch(using="sparse", query=sparse, filter=flt, limit=6),
+                        ],
+                        query=models.FusionQuery(fusion=fusion),
+                    ),
+                )
+            )
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=15.0)
+    parser.add_argument("--idf", action="store_true")
+    args = parser.parse_args()
+
+    client = build_fixture(args.points, args.idf)
+    index = LocalVectorIndex(client, "cs_guideline")
+    t0 = time.perf_counter()
+    n = index.load()
+    print(f"mirrored {n} points in {(time.perf_counter() - t0) * 1000:.1f}ms (idf={args.idf})\n")
+
+    exact = ties = 0
+    cases = [case for q in QUERIES for case in requests_for(q)]
+    for label, req in cases:
+        remote = [(p.id, round(p.score, 4)) for p in client.query_points(**req).points]
+        local = [(p.id, round(p.score, 4)) for p in index.query_points(**req).points]
+        if remote == local:
+            exact += 1
+        elif [s for _i, s in remote] == [s for _i, s in local]:
+            # 점수열은 같고 동점 문서의 순서/선택만 다름 (Qdrant도 동점 순서를 보장하지 않음)
+            ties += 1
+        else:
+            # hybrid는 prefetch 단계에서 동점 후보를 다르게 고르면 fusion 결과도 달라질 수 있음
+            print(f"  DIFF {label}: qdrant={remote} local={local}")
+    print(f"parity: {exact} exact + {ties} tie-order only / {len(cases)} requests\n")
+
+    for label, fn in (
+        ("in-memory Qdrant query_points", client.query_points),
+        ("LocalVectorIndex.query_points", index.query_points),
+    ):
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            for _label, req in cases[:16]:
+                fn(**req)
+        per = (time.perf_counter() - t0) / (args.rounds * 16) * 1000
+        print(f"{label:<32} {per:8.3f}ms / request")
+    print(f"{'remote Qdrant (assumed RTT)':<32} {args.rtt_ms:8.3f}ms / request + server time")
+
+
+if __name__ == "__main__":
+    main()
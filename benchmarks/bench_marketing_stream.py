@@ -0,0 +1,151 @@
+"""
+마케팅 카드 생성: chat_json (응답 전체 대기, 변경 전) vs chat_json_stream (완성된 필드부터 전달, 변경 후)
+
+  - 로컬 가짜 /chat/completions 서버 (asyncio, HTTP/1.1). BASE_SYSTEM 출력 형식의 카드 JSON 을
+    --chunk-chars 글자씩 --token-ms 간격으로 내보냄 (stream=true 면 SSE, 아니면 전부 만든 뒤 한 번에)
+  - --noise 면 JSON 앞에 코드펜스를 붙여 보냄 (첫 "{" 까지 건너뛰는지 확인)
+  - 출력: 호출 시작부터 recommended_pitch.ment / marketing_proposal.card_title / 최종 객체까지 걸린 시간,
+          스트리밍 결과가 chat_json 결과와 같은지
+
+실행: python benchmarks/bench_marketing_stream.py [--calls 20] [--token-ms 15] [--chunk-chars 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+os.environ.setdefault("LLM_MODEL", "gpt-4o-mini")
+
+CARD = {
+    "marketing_type": "upsell",
+    "reasoning": "데이터 부족 호소 -> 상위 데이터 요금제 매칭",
+    "recommended_pitch": {
+        "needs": "월말 데이터 부족",
+        "recommendation": "5G 데이터 플러스",
+        "comparison": "50GB -> 80GB (+30GB)",
+        "ment": "월 6천원 차이로 데이터 30GB 더 쓰실 수 있습니다.",
+    },
+    "marketing_proposal": {
+        "card_title": "5G 데이터 플러스 제안",
+        "comparison": {
+            "before": {"label": "현재", "desc": "5G 데이터 레귤러", "price_text": "69,000원"},
+            "after": {"label": "제안", "desc": "5G 데이터 플러스", "price_text": "75,000원", "highlight": True},
+        },
+        "arrow_text": "+6,000원",
+        "benefits": ["데이터 80GB", "소진 후 1Mbps 무제한", "U+ 투게더 결합 할인"],
+    },
+}
+FIELDS = (("recommended_pitch", "ment"), ("marketing_proposal", "card_title"))
+
+
+class FakeServer:
+    def __init__(self, token_ms, chunk_chars, noise):
+        self.token_ms = token_ms
+        self.chunk_chars = chunk_chars
+        self.noise = noise
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                length = 0
+                for line in head.split(b"\r\n"):
+                    if line.lower().startswith(b"content-length:"):
+                        length = int(line.split(b":")[1])
+                body = json.loads(await reader.readexactly(length))
+                text = json.dumps(CARD, ensure_ascii=False, indent=1)
+                if self.noise:
+                    text = "```json\n" + text + "\n```"
+                pieces = [text[i:i + self.chunk_chars] for i in range(0, len(text), self.chunk_chars)]
+                if body.get("stream"):
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\nTransfer-Encoding: chunked\r\n\r\n")
+                    for piece in pieces + [None]:
+                        await asyncio.sleep(self.token_ms / 1000)
+                        delta = {"content": piece} if piece is not None else {}
+                        choice = {"delta": delta, "finish_reason": None if piece is not None else "stop"}
+                        event = f"data: {json.dumps({'choices': [choice]}, ensure_ascii=False)}\n\n".encode()
+                        writer.write(f"{len(event):x}\r\n".encode() + event + b"\r\n")
+                        await writer.drain()
+                    done = b"data: [DONE]\n\n"
+                    writer.write(f"{len(done):x}\r\n".encode() + done + b"\r\n0\r\n\r\n")
+                else:
+                    await asyncio.sleep(self.token_ms * (len(pieces) + 1) / 1000)
+                    payload = json.dumps(
+                        {"choices": [{"finish_reason": "stop", "message": {"content": text}}]}, ensure_ascii=False
+                    ).encode()
+                    writer.write(
+                        b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                        + f"Content-Length: {len(payload)}\r\n\r\n".encode()
+                        + payload
+                    )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, asyncio.CancelledError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--token-ms", type=float, default=15.0)
+    parser.add_argument("--chunk-chars", type=int, default=4)
+    parser.add_argument("--noise", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeServer(args.token_ms, args.chunk_chars, args.noise)
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    os.environ["LLM_BASE_URL"] = f"http://127.0.0.1:{srv.sockets[0].getsockname()[1]}/v1"
+
+    from app.agent.marketing.session import OpenAICompatibleLLM
+    from app.services.llm_http import llm_http_client
+
+    llm = OpenAICompatibleLLM()
+    timings = {"before: final": [], "after: ment": [], "after: card_title": [], "after: final": []}
+    mismatches = 0
+    for _ in range(args.calls):
+        t0 = time.perf_counter()
+        expected = await llm.chat_json("system", "카드 생성", temperature=0.3, max_tokens=600)
+        timings["before: final"].append((time.perf_counter() - t0) * 1000)
+
+        async def on_field(path, value):
+            label = "after: ment" if path == FIELDS[0] else "after: card_title"
+            timings[label].append((time.perf_counter() - t0) * 1000)
+
+        t0 = time.perf_counter()
+        result = await llm.chat_json_stream(
+            "system", "카드 생성", temperature=0.3, max_tokens=600, watch=FIELDS, on_field=on_field
+        )
+        timings["after: final"].append((time.perf_counter() - t0) * 1000)
+        mismatches += result != expected
+
+    await llm_http_client.aclose()
+    srv.close()
+    await srv.wait_closed()
+
+    size = len(json.dumps(CARD, ensure_ascii=False, indent=1))
+    print(
+        f"{args.calls} cards, {size} chars in {args.chunk_chars}-char chunks every {args.token_ms:.0f}ms"
+        f"{' (fenced)' if args.noise else ''}\n"
+    )
+    for label, values in timings.items():
+        print(f"{label:<18} p50 {pct(values, 0.5):7.1f}ms  p95 {pct(values, 0.95):7.1f}ms  (n={len(values)})")
+    print(f"\nstreamed result != chat_json result: {mismatches}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+"""
+NotificationManager fan-out 벤치마크
+
+call 이벤트 1건을 브로드캐스트할 때의 비용이
+  - 기존 방식(전체 전송): 접속자 수에 비례
+  - 토픽 라우팅: 해당 tenant 구독자 수에 비례
+임을 확인합니다. (실제 소켓 대신 no-op WebSocket 사용, producer 쪽 송신 큐 적재 비용만 측정)
+
+실행: python benchmarks/bench_notification_fanout.py
+"""
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings 필수값 (벤치마크에서는 외부 연동을 쓰지 않음)
+for key in ["OPENAI_API_KEY", "QDRANT_URL", "QDRANT_API_KEY", "QDRANT_COLLECTION_NAME", "SPRING_API_KEY"]:
+    os.environ.setdefault(key, "bench")
+
+from app.services.broker import InProcessBroker  # noqa: E402
+from app.services.notification_manager import NotificationManager  # noqa: E402
+
+
+class NullWebSocket:
+    async def accept(self):
+        pass
+
+    async def send_json(self, message):
+        pass
+
+    async def send_text(self, data):
+        pass
+
+    async def send_bytes(self, data):
+        pass
+
+    async def close(self):
+        pass
+
+
+async def build_manager(total: int, tenants: int, scoped: bool) -> NotificationManager:
+    manager = NotificationManager(broker=InProcessBroker())
+    with contextlib.redirect_stdout(io.StringIO()):
+        for i in range(total):
+            ws = NullWebSocket()
+            user_id = f"member-{i}"
+            await manager.connect(ws, user_id)
+            if scoped:
+                manager.subscribe(ws, user_id, tenant_name=f"tenant-{i % tenants}")
+    manager.bind_call("call-1", tenant_name="tenant-0")
+    return manager
+
+
+async def measure(manager: NotificationManager, routed: bool, rounds: int = 50) -> float:
+    """
+    producer 쪽 broadcast() 호출 비용만 측정 (writer 태스크의 실제 송신은 제외)
+    """
+    event = {"type": "CALL_UPDATED", "callId": "call-1", "customer_info": {"name": "홍길동"}}
+    elapsed = 0.0
+    for _ in range(rounds):
+        t0 = time.perf_counter()
+        if routed:
+            await manager.broadcast(event, call_id="call-1")
+        else:
+            await manager.broadcast(event)
+        elapsed += time.perf_counter() - t0
+        # 송신 큐가 넘치지 않도록 writer에게 양보
+        await asyncio.sleep(0.001)
+    return elapsed / rounds * 1e6
+
+
+async def close_all(manager: NotificationManager):
+    for senders in list(manager.active_connections.values()):
+        for sender in senders:
+            sender.detach()
+
+
+async def main():
+    tenants = 20
+    print(f"{'connections':>12} {'subscribers':>12} {'broadcast-all(us)':>18} {'routed(us)':>12}")
+    for total in [100, 500, 1000, 2000]:
+        legacy = await build_manager(total, tenants, scoped=False)
+        all_us = await measure(legacy, routed=False)
+        await close_all(legacy)
+
+        scoped = await build_manager(total, tenants, scoped=True)
+        routed_us = await measure(scoped, routed=True)
+        subscribers = len(scoped.topics.get(("tenant", "tenant-0"), ()))
+        await close_all(scoped)
+
+        print(f"{total:>12} {subscribers:>12} {all_us:>18.1f} {routed_us:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
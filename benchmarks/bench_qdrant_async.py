@@ -0,0 +1,262 @@
+"""
+마케팅 staged_category_search 벤치마크: sync(QdrantClient, 순차 12회) vs async(AsyncQdrantClient + gather)
+
+  - wall time: 검색 1회(카테고리 x semantic/keyword/hybrid) 소요 시간
+  - loop lag: 검색하는 동안 같은 이벤트 루프의 5ms 하트비트가 밀린 최대 시간 (= 다른 통화가 멈춘 시간)
+  - encoder calls: 검색 1회당 FastEmbed 인코더 호출 수 (검색어당 dense 1 + sparse 1)
+  - qdrant requests: 검색 1회당 Qdrant 왕복 수 (fusion=client | server | batch 비교)
+  - 두 경로의 RRF 결과(doc 순서/점수)가 같은지 확인
+
+기본은 오프라인 모드: in-memory Qdrant + 해시 임베딩, 요청마다 --rtt-ms 만큼 네트워크 지연, 임베딩마다 --encode-ms 만큼 CPU 지연을 흉내냅니다.
+(오프라인 모드의 async loop lag에는 in-memory Qdrant 자체 연산이 포함됩니다. 원격 서버에서는 그 부분이 네트워크 대기로 바뀝니다.)
+--remote 를 주면 QDRANT_URL/QDRANT_API_KEY 의 실제 cs_guideline + FastEmbed 모델로 측정합니다.
+
+실행: python benchmarks/bench_qdrant_async.py [--rtt-ms 15] [--encode-ms 4] [--rounds 5] [--remote]
+"""
+import argparse
+import asyncio
+import hashlib
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from langchain_core.embeddings import Embeddings  # noqa: E402
+from langchain_qdrant.sparse_embeddings import SparseEmbeddings, SparseVector  # noqa: E402
+from qdrant_client import AsyncQdrantClient, QdrantClient, models  # noqa: E402
+
+from app.agent.marketing.session import RETRIEVAL_STATS, QdrantSearchEngine  # noqa: E402
+
+DIM = 64
+CATEGORIES = ["marketing", "guideline", "terms"]
+QUERY = "약정 끝나면 다른 통신사로 옮길까 해요 요금제 할인 결합 혜택 있나요"
+WORDS = (
+    "요금제 할인 결합 가족 약정 해지 번호이동 데이터 무제한 로밍 위약금 혜택 멤버십 "
+    "인터넷 TV 단말 기기변경 부가서비스 초과요금 쉐어링 워치 태블릿 청소년 시니어"
+).split()
+
+
+def _tokens(text: str):
+    return [t for t in text.split() if t]
+
+
+def _bucket(token: str, n: int) -> int:
+    return int(hashlib.md5(token.encode("utf-8")).hexdigest(), 16) % n
+
+
+class HashDenseEmbeddings(Embeddings):
+    def __init__(self, encode_ms: float = 0.0):
+        self.encode_ms = encode_ms
+
+    def _embed(self, text: str):
+        if self.encode_ms:
+            time.sleep(self.encode_ms / 1000)  # ONNX 추론처럼 GIL을 놓는 CPU 시간
+        v = [0.0] * DIM
+        for t in _tokens(text):
+            v[_bucket(t, DIM)] += 1.0
+        norm = math.sqrt(sum(x * x for x in v)) or 1.0
+        return [x / norm for x in v]
+
+    def embed_query(self, text: str):
+        return self._embed(text)
+
+    def embed_documents(self, texts):
+        return [self._embed(t) for t in texts]
+
+
+class HashSparseEmbeddings(SparseEmbeddings):
+    def __init__(self, encode_ms: float = 0.0):
+        self.encode_ms = encode_ms
+
+    def embed_query(self, text: str) -> SparseVector:
+        if self.encode_ms:
+            time.sleep(self.encode_ms / 1000)
+        counts = {}
+        for t in _tokens(text):
+            i = _bucket(t, 1 << 16)
+            counts[i] = counts.get(i, 0.0) + 1.0
+        idx = sorted(counts)
+        return SparseVector(indices=idx, values=[counts[i] for i in idx])
+
+    def embed_documents(self, texts):
+        return [self.embed_query(t) for t in texts]
+
+
+class LatencyClient:
+    """sync QdrantClient 래퍼: query_points 마다 네트워크 왕복을 흉내 (time.sleep)"""
+
+    def __init__(self, inner: QdrantClient, rtt: float):
+        self._inner = inner
+        self._rtt = rtt
+
+    def query_points(self, *args, **kwargs):
+        time.sleep(self._rtt)
+        return self._inner.query_points(*args, **kwargs)
+
+    def query_batch_points(self, *args, **kwargs):
+        time.sleep(self._rtt)
+        return self._inner.query_batch_points(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+class AsyncLatencyClient:
+    def __init__(self, inner: AsyncQdrantClient, rtt: float):
+        self._inner = inner
+        self._rtt = rtt
+
+    async def query_points(self, *args, **kwargs):
+        await asyncio.sleep(self._rtt)
+        return await self._inner.query_points(*args, **kwargs)
+
+    async def query_batch_points(self, *args, **kwargs):
+        await asyncio.sleep(self._rtt)
+        return await self._inner.query_batch_points(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._inner, name)
+
+
+def _points(dense, sparse, n: int = 300):
+    pts = []
+    for i in range(n):
+        cat = CATEGORIES[i % len(CATEGORIES)]
+        words = [WORDS[(i * 7 + j * j * 3 + i // len(WORDS)) % len(WORDS)] for j in range(6 + i % 9)]
+        text = f"{cat} 문서 {i}: " + " ".join(words)
+        sv = sparse.embed_query(text)
+        pts.append(
+            models.PointStruct(
+                id=i,
+                vector={
+                    "dense": dense.embed_query(text),
+                    "sparse": models.SparseVector(indices=sv.indices, values=sv.values),
+                },
+                payload={
+                    "page_content": text,
+                    "metadata": {"category": cat, "title": f"{cat}-{i}", "source": f"doc{i}.md"},
+                },
+            )
+        )
+    return pts
+
+
+async def build_offline(rtt_ms: float, encode_ms: float) -> QdrantSearchEngine:
+    seed_dense, seed_sparse = HashDenseEmbeddings(), HashSparseEmbeddings()
+    points = _points(seed_dense, seed_sparse)
+    config = dict(
+        collection_name="cs_guideline",
+        vectors_config={"dense": models.VectorParams(size=DIM, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"sparse": models.SparseVectorParams()},
+    )
+
+    sync_client = QdrantClient(":memory:")
+    sync_client.create_collection(**config)
+    sync_client.upsert("cs_guideline", points=points)
+
+    async_client = AsyncQdrantClient(":memory:")
+    await async_client.create_collection(**config)
+    await async_client.upsert("cs_guideline", points=points)
+
+    return QdrantSearchEngine(
+        client=LatencyClient(sync_client, rtt_ms / 1000),
+        async_client=AsyncLatencyClient(async_client, rtt_ms / 1000),
+        dense_embeddings=HashDenseEmbeddings(encode_ms),
+        sparse_embeddings=HashSparseEmbeddings(encode_ms),
+    )
+
+
+def build_remote() -> QdrantSearchEngine:
+    from app.agent.marketing.session import get_shared_qdrant_engine
+
+    return get_shared_qdrant_engine()
+
+
+async def measure(label: str, run, rounds: int):
+    walls, lags = [], []
+    calls_before = RETRIEVAL_STATS["dense_calls"] + RETRIEVAL_STATS["sparse_calls"]
+    requests_before = RETRIEVAL_STATS["qdrant_requests"]
+    for _ in range(rounds):
+        stop = asyncio.Event()
+        max_lag = 0.0
+
+        async def heartbeat():
+            nonlocal max_lag
+            interval = 0.005
+            while not stop.is_set():
+                t = time.perf_counter()
+                await asyncio.sleep(interval)
+                max_lag = max(max_lag, time.perf_counter() - t - interval)
+
+        hb = asyncio.create_task(heartbeat())
+        await asyncio.sleep(0.02)
+        t0 = time.perf_counter()
+        result = await run()
+        walls.append(time.perf_counter() - t0)
+        stop.set()
+        await hb
+        lags.append(max_lag)
+    walls.sort()
+    calls = RETRIEVAL_STATS["dense_calls"] + RETRIEVAL_STATS["sparse_calls"] - calls_before
+    requests = RETRIEVAL_STATS["qdrant_requests"] - requests_before
+    print(
+        f"{label:<34} wall p50 {walls[len(walls) // 2] * 1000:8.1f}ms   "
+        f"max loop lag {max(lags) * 1000:8.1f}ms   encoder calls/search {calls / rounds:.0f}   "
+        f"qdrant requests/search {requests / rounds:.0f}"
+    )
+    return result
+
+
+def _signature(items):
+    return [(it.doc_id, it.metadata.get("_id"), round(it.score, 6), it.category) for it in items]
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rtt-ms", type=float, default=15.0)
+    parser.add_argument("--encode-ms", type=float, default=4.0)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--remote", action="store_true")
+    args = parser.parse_args()
+
+    if args.remote:
+        engine = build_remote()
+        print("mode: remote Qdrant + FastEmbed")
+    else:
+        engine = await build_offline(args.rtt_ms, args.encode_ms)
+        print(f"mode: offline (rtt {args.rtt_ms}ms, encode {args.encode_ms}ms)")
+    print(f"categories: {CATEGORIES} x (semantic, keyword, hybrid)\n")
+
+    async def sync_path():
+        # 기존 retrieve_node: async 노드 안에서 동기 검색을 그대로 호출
+        return engine.staged_category_search(QUERY, final_k=8, per_category_k=6, categories=CATEGORIES)
+
+    async def async_path():
+        return await engine.astaged_category_search(
+            QUERY, final_k=8, per_category_k=6, categories=CATEGORIES
+        )
+
+    before = await measure("sync  staged_category_search", sync_path, args.rounds)
+    after = await measure("async astaged_category_search", async_path, args.rounds)
+    print(f"\nidentical RRF output: {_signature(before) == _signature(after)}\n")
+
+    # fusion 위치별 비교 (async 경로): 왕복 수와 client RRF 대비 top-k 겹침
+    baseline = {it.metadata.get("_id") for it in after}
+    for fusion in ("client", "server", "batch"):
+        engine.fusion = fusion
+        items = await measure(f"async fusion={fusion}", async_path, args.rounds)
+        overlap = len(baseline & {it.metadata.get("_id") for it in items})
+        print(f"{'':<34} top-{len(items)} overlap with client RRF: {overlap}/{len(baseline)}")
+    await engine.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,180 @@
+"""
+마케팅 검색 fusion 단계(_rrf + merge_categories) 마이크로 벤치마크
+
+  - before: 아이템마다 source/title/본문 앞 120자로 문자열 key를 반복 생성하는 기존 구현 (아래 legacy_*)
+  - after : RetrievedItem.uid 를 생성 시 1회 계산 + slot 리스트 누적 (QdrantSearchEngine._rrf)
+  - 한 턴 분량: 카테고리 C개 x (semantic/keyword/hybrid) k_each개 -> 카테고리별 RRF -> 카테고리 가중 RRF + always_include
+  - 두 구현의 결과(doc 순서/점수/카테고리)가 같은지 확인
+
+실행: python benchmarks/bench_rrf.py [--categories 4] [--k-each 8] [--rounds 2000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.session import QdrantSearchEngine, RetrievedItem, safe_str  # noqa: E402
+from app.services.category_catalog import CategoryCatalog  # noqa: E402
+
+CATEGORIES = ["marketing", "guideline", "principle", "terms", "faq", "notice"]
+CAT_WEIGHTS = {"marketing": 1.45, "guideline": 1.15, "principle": 1.05, "terms": 1.0}
+ALWAYS_INCLUDE = {"terms": 2}
+
+
+# -------------------------
+# Legacy implementation (변경 전 코드 그대로)
+# -------------------------
+
+
+def legacy_rrf(lists, weights, final_k=10, rrf_k=60):
+    def uid(it):
+        src = safe_str(it.metadata.get("source"))
+        title = safe_str(it.metadata.get("title"))
+        head = (it.page_content or "")[:120]
+        return f"{src}||{title}||{head}"
+
+    fused = defaultdict(float)
+    best = {}
+    for w, items in zip(weights, lists):
+        for rank, it in enumerate(items, start=1):
+            u = uid(it)
+            fused[u] += float(w) / (rrf_k + rank)
+            if (u not in best) or (it.score > best[u].score):
+                best[u] = it
+
+    ranked = sorted(fused.keys(), key=lambda u: fused[u], reverse=True)
+    out = []
+    for i, u in enumerate(ranked[:final_k], start=1):
+        it = best[u]
+        out.append(
+            RetrievedItem(
+                doc_id=f"DOC{i}",
+                score=it.score,
+                page_content=it.page_content,
+                metadata=it.metadata,
+                category=it.category,
+            )
+        )
+    return out
+
+
+def legacy_merge(per_category, existing, final_k=10):
+    per, ws = [], []
+    for c, items in per_category.items():
+        per.append(items)
+        ws.append(float(CAT_WEIGHTS.get(c, 1.0)))
+    merged = legacy_rrf(per, ws, final_k=max(final_k, sum(ALWAYS_INCLUDE.values())))
+
+    def uid(it):
+        return f"{safe_str(it.metadata.get('source'))}||{safe_str(it.metadata.get('title'))}||{(it.page_content or '')[:120]}"
+
+    forced, seen_u = [], set()
+    for cat, n in ALWAYS_INCLUDE.items():
+        if cat not in existing:
+            continue
+        for it in [x for x in merged if x.category == cat][: int(n)]:
+            u = uid(it)
+            if u not in seen_u:
+                forced.append(it)
+                seen_u.add(u)
+    final, seen = [], set()
+    for it in forced + merged:
+        u = uid(it)
+        if u in seen:
+            continue
+        final.append(it)
+        seen.add(u)
+        if len(final) >= final_k:
+            break
+    return [
+        RetrievedItem(
+            doc_id=f"DOC{i}", score=it.score, page_content=it.page_content, metadata=it.metadata, category=it.category
+        )
+        for i, it in enumerate(final, start=1)
+    ]
+
+
+# -------------------------
+# Fixture
+# -------------------------
+
+
+def make_mode_lists(rng, categories, k_each, pool=40):
+    """카테고리별 3개 모드 결과. 모드끼리 문서가 겹치도록 같은 pool에서 뽑음"""
+    out = {}
+    for c in categories:
+        docs = [
+            (
+                {"source": f"{c}/doc{j}.md", "title": f"{c} 안내 {j}", "category": c},
+                f"{c} 문서 {j} " + "요금제 할인 결합 약정 혜택 안내 " * 20,
+            )
+            for j in range(pool)
+        ]
+        modes = []
+        for _ in range(3):
+            picked = rng.sample(docs, k_each)
+            modes.append(
+                [
+                    RetrievedItem(
+                        doc_id=f"DOC{r}",
+                        score=round(rng.random(), 6),
+                        page_content=text,
+                        metadata=meta,
+                        category=c,
+                    )
+                    for r, (meta, text) in enumerate(picked, start=1)
+                ]
+            )
+        out[c] = modes
+    return out
+
+
+def signature(items):
+    return [(it.doc_id, it.uid, it.score, it.category) for it in items]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--categories", type=int, default=4)
+    parser.add_argument("--k-each", type=int, default=8)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    cats = CATEGORIES[: args.categories]
+    engine = QdrantSearchEngine.__new__(QdrantSearchEngine)  # fusion 단계만 사용 (Qdrant/임베딩 불필요)
+    engine.category_catalog = CategoryCatalog(None, "cs_guideline")
+    engine.category_catalog.counts = {c: 1 for c in cats}
+    turns = [make_mode_lists(rng, cats, args.k_each) for _ in range(50)]
+
+    def run_legacy(turn):
+        per_category = {c: legacy_rrf(m, [1.0, 1.0, 1.2], final_k=args.k_each) for c, m in turn.items()}
+        return legacy_merge(per_category, cats, final_k=8)
+
+    def run_new(turn):
+        per_category = {c: engine._rrf(m, [1.0, 1.0, 1.2], final_k=args.k_each) for c, m in turn.items()}
+        return engine.merge_categories(per_category, final_k=8, cat_weights=CAT_WEIGHTS, always_include=ALWAYS_INCLUDE)
+
+    same = all(signature(run_legacy(t)) == signature(run_new(t)) for t in turns)
+    print(f"{len(cats)} categories x 3 modes x k_each={args.k_each}, identical output: {same}")
+
+    for label, fn in (("before (string keys per loop)", run_legacy), ("after  (precomputed uid + slots)", run_new)):
+        t0 = time.perf_counter()
+        for i in range(args.rounds):
+            fn(turns[i % len(turns)])
+        per = (time.perf_counter() - t0) / args.rounds * 1e6
+        print(f"{label:<34} {per:8.1f}us / turn")
+
+
+if __name__ == "__main__":
+    main()
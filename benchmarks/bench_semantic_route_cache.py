@@ -0,0 +1,174 @@
+"""
+Gatekeeper.semantic_route 앞단 결정 캐시 효과: 여러 통화에 걸쳐 반복되는 고객 발화 스트림을 재생
+
+  - 발화는 자주 나오는 문장 템플릿(빈도 편중) + 조사/띄어쓰기/문장부호/추임새 변형, 직전 상담사 멘트는 몇 가지 중 하나
+  - LLM(gpt-4o-mini) 대신 템플릿별로 정해진 결정을 돌려주는 가짜 클라이언트 (지연은 --llm-ms 로 집계만 하고 실제로 기다리지 않음)
+  - 출력: LLM 호출 수, 캐시 적중률(정확/유사), 절약한 LLM 시간, 임베딩 평균 시간,
+          잘못 적중한 결정 수(다른 템플릿의 결정을 돌려준 경우)
+  - 임베딩: FastEmbed dense 모델 (QDRANT_DENSE_EMBEDDING_MODEL). 모델을 받을 수 없는 환경이면
+    글자 3-gram 해시 임베딩으로 대신 돌리고 그렇게 표시 (적중률/오적중 수치는 실제 모델과 다름)
+
+실행: python benchmarks/bench_semantic_route_cache.py [--utterances 3000] [--threshold 0.92]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+import zlib
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.cache import SemanticCache  # noqa: E402
+from app.agent.marketing.router import Gatekeeper  # noqa: E402
+from app.core.config import settings  # noqa: E402
+
+# (발화 템플릿, LLM 결정)
+TEMPLATES = [
+    ("요금제 바꾸고 싶어요", "marketing", True),
+    ("데이터가 너무 부족해요", "marketing", True),
+    ("요금이 왜 이렇게 많이 나왔어요", "support", True),
+    ("인터넷이랑 결합하면 할인 되나요", "marketing", True),
+    ("약정 언제 끝나는지 알려주세요", "support", True),
+    ("해지하려고 전화했어요", "marketing", True),
+    ("와이파이 비밀번호를 잊어버렸어요", "support", False),
+    ("휴대폰 화면이 안 켜져요", "support", False),
+    ("로그인이 계속 실패해요", "support", False),
+    ("문자 수신이 안 되는데요", "support", False),
+    ("그냥 청구서 주소만 바꿔주세요", "support", False),
+    ("분실 신고 하려고요", "support", False),
+    ("해결됐어요 감사합니다", "neutral", True),
+    ("가족이랑 같이 쓰는 요금제 있나요", "marketing", True),
+    ("넷플릭스 포함된 상품 있어요", "marketing", True),
+    ("통화 품질이 너무 안 좋아요", "complaint", False),
+]
+FILLERS = ["", "저기 ", "아 ", "음 ", "그 ", "네 "]
+ENDINGS = ["", ".", "?", "!", " 좀", "요"]
+CONTEXTS = [
+    "",
+    "네 고객님 무엇을 도와드릴까요?",
+    "확인해 보니 이번 달 데이터를 초과 사용하셨습니다.",
+    "본인 확인 감사합니다. 어떤 부분이 불편하셨나요?",
+]
+
+
+def variant(rng, phrase):
+    text = phrase
+    if rng.random() < 0.4:
+        text = text.replace(" ", "", 1)  # STT 띄어쓰기 차이
+    return rng.choice(FILLERS) + text + rng.choice(ENDINGS)
+
+
+class HashEmbeddings:
+    """글자 3-gram 해시 임베딩 (FastEmbed 모델을 받을 수 없을 때의 대체)"""
+
+    def __init__(self, dim=512):
+        self.dim = dim
+
+    def embed_documents(self, texts):
+        out = []
+        for text in texts:
+            t = "".join(text.split())
+            v = np.zeros(self.dim, dtype=np.float32)
+            for i in range(max(1, len(t) - 2)):
+                v[zlib.crc32(t[i:i + 3].encode()) % self.dim] += 1.0
+            out.append(v.tolist())
+        return out
+
+
+def pick_embeddings():
+    cache = SemanticCache(max_size=1)
+    try:
+        emb = cache._get_embeddings()
+        emb.embed_documents(["임베딩 확인"])
+        return emb, "fastembed"
+    except Exception as e:
+        return HashEmbeddings(), f"char-3gram hash (FastEmbed unavailable: {type(e).__name__})"
+
+
+def fake_client(llm_calls):
+    decisions = {phrase: (intent, opp) for phrase, intent, opp in TEMPLATES}
+
+    async def create(model, messages, **kwargs):
+        prompt = messages[-1]["content"]
+        customer = prompt.split('Customer Input: "', 1)[1].split('"\n', 1)[0]
+        llm_calls.append(customer)
+        template = max(decisions, key=lambda p: sum(w in customer for w in p.split()))
+        intent, opp = decisions[template]
+        content = json.dumps({"intent": intent, "sentiment": "neutral", "marketing_opportunity": opp, "_t": template})
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    return SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--utterances", type=int, default=3000)
+    parser.add_argument("--threshold", type=float, default=0.92)
+    parser.add_argument("--context-threshold", type=float, default=0.85)
+    parser.add_argument("--llm-ms", type=float, default=650.0)
+    args = parser.parse_args()
+
+    embeddings, emb_label = pick_embeddings()
+    rng = random.Random(21)
+    weights = [1.0 / (i + 1) for i in range(len(TEMPLATES))]  # 자주 나오는 발화 편중
+    stream = []
+    for _ in range(args.utterances):
+        phrase = rng.choices(TEMPLATES, weights=weights)[0][0]
+        stream.append((phrase, variant(rng, phrase), rng.choice(CONTEXTS)))
+
+    import builtins
+
+    quiet = builtins.print
+    builtins.print = lambda *a, **k: None  # Router 로그 생략
+    results = {}
+    for label, enabled in (("no cache", False), ("semantic cache", True)):
+        cache = SemanticCache(
+            max_size=2000,
+            threshold=args.threshold,
+            context_threshold=args.context_threshold,
+            ttl=3600.0,
+            embeddings=embeddings,
+        )
+        gk = Gatekeeper(cache=cache)
+        llm_calls = []
+        gk.fast_client = fake_client(llm_calls)
+        wrong = 0
+        t0 = time.perf_counter()
+        settings.SEMANTIC_ROUTE_CACHE_ENABLED = enabled
+        for phrase, text, context in stream:
+            calls_before = len(llm_calls)
+            out = await gk.semantic_route(text, context=context)
+            if len(llm_calls) == calls_before and "_t" in out and out["_t"] != phrase:
+                wrong += 1
+        wall = time.perf_counter() - t0
+        results[label] = (len(llm_calls), wrong, wall, cache.describe())
+    builtins.print = quiet
+
+    print(f"embeddings: {emb_label}")
+    print(f"{args.utterances} customer utterances, {len(TEMPLATES)} templates, {len(CONTEXTS)} agent contexts\n")
+    base_calls = results["no cache"][0]
+    for label, (calls, wrong, wall, stats) in results.items():
+        llm_s = calls * args.llm_ms / 1000
+        print(f"{label:<16} LLM calls {calls:5d}  LLM time {llm_s:8.1f}s  wrong cached decisions {wrong:4d}  cpu {wall:.2f}s")
+    stats = results["semantic cache"][3]
+    print(
+        f"\nhit rate {stats['hit_rate']} (exact {stats['hits_exact']}, semantic {stats['hits_semantic']}), "
+        f"avg embed {stats['avg_embed_ms']}ms, LLM hops removed {base_calls - results['semantic cache'][0]}"
+        f" (~{(base_calls - results['semantic cache'][0]) * args.llm_ms / 1000:.1f}s at {args.llm_ms:.0f}ms)"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
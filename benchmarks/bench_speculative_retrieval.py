@@ -0,0 +1,138 @@
+"""
+고객 턴 지연: 라우팅/분석 LLM -> retrieve 검색 (직렬, 변경 전) vs 분석과 동시에 speculative 검색 (변경 후)
+
+  - 시뮬레이션 통화의 고객 턴을 재생. 분석 LLM 대신 --llm-ms 지연, Qdrant 대신 --search-ms 지연의 가짜 acategory_search
+  - 고객 턴 중 --skip-rate 비율은 마케팅 불필요(분석 후 retrieve 안 함) -> 변경 후에는 speculative 검색이 버려짐
+  - 마케팅 턴은 retrieve_node와 같이 take_prefetched -> 없으면 새로 검색 -> merge_categories(marketing_type 가중치)
+  - 출력: 턴당 지연(p50/p95), Qdrant 검색 수, PREFETCH_STATS speculative_* (사용/폐기/폐기된 검색 시간)
+
+실행: python benchmarks/bench_speculative_retrieval.py [--turns 200] [--llm-ms 700] [--search-ms 250] [--skip-rate 0.4]
+"""
+import argparse
+import asyncio
+import builtins
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "bench")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "bench")
+
+from app.agent.marketing.session import PREFETCH_STATS, CustomerProfile, MarketingSession  # noqa: E402
+
+CUSTOMER_LINES = [
+    "요금제 바꾸고 싶어요",
+    "데이터가 너무 부족해서요",
+    "가족 결합하면 할인 얼마나 돼요",
+    "약정이 언제 끝나는지 궁금해요",
+    "해지하려고 전화했어요",
+    "넷플릭스 포함된 요금제 있나요",
+    "와이파이 비밀번호를 잊어버렸어요",
+]
+AGENT_LINES = [
+    "네 고객님 확인해 보겠습니다.",
+    "현재 5G 데이터 레귤러 요금제 사용 중이십니다.",
+    "잠시만 기다려 주세요.",
+]
+CATS = ["marketing", "guideline", "terms"]
+
+
+class FakeQdrant:
+    def __init__(self, search_ms):
+        self.search_ms = search_ms
+        self.searches = 0
+
+    async def acategory_search(self, query, per_category_k=6, categories=None, fallback_k=8):
+        self.searches += 1
+        await asyncio.sleep(self.search_ms / 1000)
+        return {c: [] for c in categories or CATS}
+
+    def merge_categories(self, per_category, final_k=8, cat_weights=None):
+        return [it for items in per_category.values() for it in items][:final_k]
+
+
+def make_session(qdrant):
+    session = MarketingSession.__new__(MarketingSession)
+    session.customer = CustomerProfile(mobile_plan="5G 데이터 레귤러")
+    session.qdrant = qdrant
+    session.turns = []
+    session._dialogue_cache = {}
+    session._prefetch_cache = None
+    return session
+
+
+async def customer_turn(session, speculative, llm_ms, marketing):
+    fingerprint = session.start_speculative_retrieval() if speculative else None
+    try:
+        await asyncio.sleep(llm_ms / 1000)  # 라우팅 + 분석 LLM
+        if not marketing:
+            return
+        per_category = await session.take_prefetched(CATS)
+        if per_category is None:
+            per_category = await session.qdrant.acategory_search(
+                session.build_query(), per_category_k=6, categories=CATS, fallback_k=8
+            )
+        session.qdrant.merge_categories(per_category, final_k=8, cat_weights={"marketing": 1.45})
+    finally:
+        session.discard_speculative(fingerprint)
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def run(speculative, args):
+    for key in PREFETCH_STATS:
+        PREFETCH_STATS[key] = 0
+    rng = random.Random(24)
+    qdrant = FakeQdrant(args.search_ms)
+    session = make_session(qdrant)
+    latencies = []
+    for i in range(args.turns):
+        session.add_turn("agent", rng.choice(AGENT_LINES), turn_id=f"a{i}")
+        session.add_turn("customer", rng.choice(CUSTOMER_LINES), turn_id=f"c{i}")
+        marketing = rng.random() >= args.skip_rate
+        t0 = time.perf_counter()
+        await customer_turn(session, speculative, args.llm_ms, marketing)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    await asyncio.sleep(0)  # 취소된 검색 정리
+    return latencies, qdrant.searches, dict(PREFETCH_STATS)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--llm-ms", type=float, default=700.0)
+    parser.add_argument("--search-ms", type=float, default=250.0)
+    parser.add_argument("--skip-rate", type=float, default=0.4)
+    args = parser.parse_args()
+
+    quiet = builtins.print
+    builtins.print = lambda *a, **k: None
+    try:
+        results = {label: await run(spec, args) for label, spec in (("serial", False), ("speculative", True))}
+    finally:
+        builtins.print = quiet
+
+    print(
+        f"{args.turns} customer turns, analysis {args.llm_ms:.0f}ms, search {args.search_ms:.0f}ms, "
+        f"no-marketing turns {args.skip_rate:.0%}\n"
+    )
+    for label, (lat, searches, _) in results.items():
+        print(f"{label:<12} p50 {pct(lat, 0.5):7.1f}ms  p95 {pct(lat, 0.95):7.1f}ms  qdrant searches {searches:4d}")
+    stats = results["speculative"][2]
+    print(
+        "\nspeculative: "
+        + ", ".join(f"{k.replace('speculative_', '')} {v}" for k, v in stats.items() if k.startswith("speculative_"))
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
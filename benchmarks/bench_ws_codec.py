@@ -0,0 +1,88 @@
+"""
+WebSocket 프레임 직렬화 벤치마크
+
+  - 수신: stdlib json.loads vs orjson (ws_codec.loads)  -- /agent/check 프레임
+  - 송신: 소켓마다 Starlette send_json(json.dumps) vs EncodedFrame 1회 직렬화 후 N개 소켓 재사용
+  - 크기: JSON 텍스트 vs msgpack 바이너리
+
+실행: python benchmarks/bench_ws_codec.py
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils import ws_codec  # noqa: E402
+
+CHECK_FRAME = json.dumps(
+    {
+        "callId": "call-0001",
+        "speaker": "customer",
+        "transcript": "요금제가 너무 비싸서요 약정 끝나면 다른 통신사로 옮길까 생각 중이에요",
+        "turn_id": 12,
+        "is_final": True,
+    },
+    ensure_ascii=False,
+)
+
+RESULT_EVENT = {
+    "type": "result",
+    "agent_type": "marketing",
+    "turn_id": 12,
+    "results": {
+        "agent_type": "marketing",
+        "next_step": "generate",
+        "recommended_answer": {
+            "ment": "고객님, 현재 사용 패턴이면 5G 슬림 요금제로 바꾸시면 월 1만 2천원 절약됩니다.",
+            "reason": "최근 3개월 데이터 사용량이 제공량의 40% 수준",
+        },
+        "marketing_proposal": [
+            {"card_title": f"5G 슬림 {i}", "price": 45000 + i * 1000, "benefits": ["데이터 10GB", "통화 무제한"]}
+            for i in range(3)
+        ],
+        "work_guide": "전략: 요금절감 (제안: O)",
+    },
+}
+
+
+def stdlib_dumps(message):
+    # Starlette WebSocket.send_json 과 동일한 인코딩
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+def bench(fn, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - t0) / rounds * 1e6
+
+
+def main():
+    rounds = 20000
+    print("[decode] /agent/check frame")
+    print(f"  json.loads      {bench(lambda: json.loads(CHECK_FRAME), rounds):8.2f} us")
+    print(f"  ws_codec.loads  {bench(lambda: ws_codec.loads(CHECK_FRAME), rounds):8.2f} us")
+
+    print("\n[encode] result event broadcast to N sockets (per broadcast)")
+    print(f"  {'sockets':>8} {'send_json x N(us)':>18} {'EncodedFrame(us)':>17}")
+    for n in [1, 5, 20, 100]:
+        legacy = bench(lambda: [stdlib_dumps(RESULT_EVENT) for _ in range(n)], rounds // n)
+
+        def shared():
+            frame = ws_codec.EncodedFrame(RESULT_EVENT)
+            for _ in range(n):
+                frame.text
+
+        print(f"  {n:>8} {legacy:>18.2f} {bench(shared, rounds // n):>17.2f}")
+
+    text_size = len(stdlib_dumps(RESULT_EVENT).encode("utf-8"))
+    print("\n[size] result event")
+    print(f"  json text  {text_size} bytes")
+    if ws_codec.ormsgpack is not None:
+        print(f"  msgpack    {len(ws_codec.dumps_msgpack(RESULT_EVENT))} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+MARKETING_PIPELINE 비교: legacy (semantic_route LLM -> Deep Analysis LLM) vs combined (route_and_analyze LLM 1회)
+
+  - 녹취된 통화(JSONL, 한 줄에 통화 1건)를 재생하며 고객 턴마다 두 파이프라인의 라우팅+분석 단계만 실행
+      {"call_id": "...", "customer": {"mobile_plan": "...", "signals": [...]}, "turns": [{"speaker": "agent|customer", "transcript": "..."}]}
+    파일을 주지 않으면 simulate_call.py 시나리오로 돌림
+  - 턴마다 같은 대화 단계(legacy 결과로 진행)에서 비교 -> 한 번 갈라진 결정이 이후 턴으로 번지지 않음
+  - 출력: 고객 턴당 지연(p50/p95), LLM 호출 수, 결정 일치율(기회 여부 / 다음 단계+마케팅 유형)
+  - 실제 LLM(OPENAI_API_KEY, LLM_BASE_URL/LLM_MODEL)이 필요. 결정 캐시는 기본으로 끔 (--with-cache)
+
+실행: python benchmarks/compare_marketing_pipeline.py [--calls recorded_calls.jsonl] [--verbose]
+"""
+import argparse
+import asyncio
+import builtins
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.agent.marketing.cache import SemanticCache  # noqa: E402
+from app.agent.marketing.nodes import build_analysis_prompt, decide_transition  # noqa: E402
+from app.agent.marketing.prompts import DEEP_ANALYSIS_SYSTEM  # noqa: E402
+from app.agent.marketing.router import Gatekeeper  # noqa: E402
+from app.agent.marketing.session import CustomerProfile, MarketingSession, OpenAICompatibleLLM  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.utils.keywords import annotate  # noqa: E402
+
+SAMPLE_CALL = {
+    "call_id": "simulate_call",
+    "customer": {"mobile_plan": "5G 데이터 레귤러", "contract_remaining_months": 3, "monthly_fee_won": 69000},
+    "turns": [
+        {"speaker": "agent", "transcript": "반갑습니다. LG U+ 고객센터 상담사입니다. 무엇을 도와드릴까요?"},
+        {"speaker": "customer", "transcript": "가족들이랑 통신사를 다 U+로 맞춰서 결합 할인을 좀 받으려고요. 그리고 데이터가 좀 부족한 것 같아서 요금제도 보고 싶어요."},
+        {"speaker": "agent", "transcript": "네, 고객님. 결합과 요금제 변경 모두 도와드리겠습니다. 현재 '5G 데이터 레귤러' 요금제를 사용 중이시네요."},
+        {"speaker": "customer", "transcript": "네 맞아요. 50기가 정도 쓰는 것 같은데, 유튜브를 많이 봐서 그런지 월말 되면 항상 모자라더라고요."},
+        {"speaker": "agent", "transcript": "80GB 제공되는 '5G 데이터 플러스' 요금제로 조정하시면 추가 충전 없이 안정적으로 사용하실 수 있어요."},
+        {"speaker": "customer", "transcript": "오, 80기가면 충분하겠네요. 그럼 가족 결합은 어떻게 하는 게 좋을까요?"},
+        {"speaker": "agent", "transcript": "가족분들 모두 U+ 모바일을 이용 중이시라면 'U+ 투게더 결합'을 추천드립니다."},
+        {"speaker": "customer", "transcript": "제 동생은 알뜰폰 쓰는데 그것도 같이 묶을 수 있나요?"},
+        {"speaker": "agent", "transcript": "네, 알뜰폰의 경우 '참 쉬운 가족 결합'으로 진행하실 수 있습니다."},
+        {"speaker": "customer", "transcript": "좋네요. 그럼 저는 5G 데이터 플러스로 바꾸고, 가족들은 결합으로 다 묶어주세요."},
+        {"speaker": "agent", "transcript": "네, 변경과 결합 상품 가입 처리해 드리겠습니다. 좋은 선택 감사드립니다."},
+        {"speaker": "customer", "transcript": "네 감사합니다. 수고하세요."},
+    ],
+}
+
+
+def load_calls(path):
+    if not path:
+        return [SAMPLE_CALL]
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def wrap(self, fn):
+        async def counted(*args, **kwargs):
+            self.calls += 1
+            return await fn(*args, **kwargs)
+
+        return counted
+
+
+class CountingLLM:
+    """chat_json 호출 수를 세는 얇은 래퍼 (파이프라인별)"""
+
+    def __init__(self, llm, counter):
+        self.chat_json = counter.wrap(llm.chat_json)
+
+
+def make_session(call, llm):
+    fields = set(CustomerProfile.__dataclass_fields__)
+    session = MarketingSession.__new__(MarketingSession)
+    session.customer = CustomerProfile(**{k: v for k, v in (call.get("customer") or {}).items() if k in fields})
+    session.llm = llm
+    session.turns = []
+    session._dialogue_cache = {}
+    return session
+
+
+async def deep_analysis(session, text, stage):
+    # analyze_node 와 같이: 분석 실패면 마케팅 없이 단계 유지
+    try:
+        analysis = await session.llm.chat_json(
+            system_prompt=DEEP_ANALYSIS_SYSTEM, user_prompt=build_analysis_prompt(session, text), temperature=0.0
+        )
+        return decide_transition(stage, analysis, annotate(text))
+    except Exception:
+        return stage, False, "none"
+
+
+async def legacy_turn(session, gk, text, context, stage):
+    route = await gk.semantic_route(text, context=context)
+    if not route.get("marketing_opportunity", False):
+        return route, None
+    return route, await deep_analysis(session, text, stage)
+
+
+async def combined_turn(session, gk, text, context, stage):
+    route = await gk.route_and_analyze(text, context, session.llm, build_analysis_prompt(session, text))
+    if not route.get("marketing_opportunity", False):
+        return route, None
+    if route.get("source") != "llm":
+        # 서비스와 같이: 통합 분석 실패/캐시 적중(라우팅 필드만) -> analyze_node 가 Deep Analysis 로 대체
+        return route, await deep_analysis(session, text, stage)
+    return route, decide_transition(stage, route, annotate(text))
+
+
+def pct(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", help="recorded calls JSONL")
+    parser.add_argument("--with-cache", action="store_true")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    settings.SEMANTIC_ROUTE_CACHE_ENABLED = args.with_cache
+    llm = OpenAICompatibleLLM()
+    counters = {"legacy": Counter(), "combined": Counter()}
+    latencies = {"legacy": [], "combined": []}
+    agree_opp = agree_decision = turns = 0
+    rows = []
+
+    quiet = builtins.print
+    for call in load_calls(args.calls):
+        sessions, gks = {}, {}
+        for name in ("legacy", "combined"):
+            sessions[name] = make_session(call, CountingLLM(llm, counters[name]))
+            gks[name] = Gatekeeper(cache=SemanticCache())
+            if gks[name].fast_client is not None:
+                completions = gks[name].fast_client.chat.completions
+                completions.create = counters[name].wrap(completions.create)
+            sessions[name].gatekeeper = gks[name]
+
+        stage, context = "listening", ""
+        for turn in call["turns"]:
+            speaker = "customer" if turn["speaker"] == "customer" else "agent"
+            for session in sessions.values():
+                session.add_turn(speaker, turn["transcript"])
+            if speaker == "agent":
+                context = turn["transcript"]
+                continue
+
+            text = turn["transcript"]
+            out = {}
+            builtins.print = lambda *a, **k: None
+            try:
+                for name, step in (("legacy", legacy_turn), ("combined", combined_turn)):
+                    t0 = time.perf_counter()
+                    out[name] = await step(sessions[name], gks[name], text, context, stage)
+                    latencies[name].append((time.perf_counter() - t0) * 1000)
+            finally:
+                builtins.print = quiet
+
+            turns += 1
+            (r_old, d_old), (r_new, d_new) = out["legacy"], out["combined"]
+            same_opp = bool(r_old.get("marketing_opportunity")) == bool(r_new.get("marketing_opportunity"))
+            same_decision = (d_old or (stage, False, "none")) == (d_new or (stage, False, "none"))
+            agree_opp += same_opp
+            agree_decision += same_decision
+            rows.append((call.get("call_id"), text, d_old, d_new, r_new.get("source")))
+            if d_old:
+                stage = d_old[0]
+
+    print(f"{turns} customer turns, cache {'on' if args.with_cache else 'off'}\n")
+    for name in ("legacy", "combined"):
+        lat = latencies[name]
+        print(
+            f"{name:<9} p50 {pct(lat, 0.5):8.1f}ms  p95 {pct(lat, 0.95):8.1f}ms  "
+            f"LLM calls {counters[name].calls:4d} ({counters[name].calls / max(turns, 1):.2f}/turn)"
+        )
+    print(
+        f"\nagreement: opportunity {agree_opp}/{turns}, "
+        f"decision (next stage, marketing_needed, marketing_type) {agree_decision}/{turns}"
+    )
+    if args.verbose:
+        for call_id, text, d_old, d_new, source in rows:
+            mark = " " if d_old == d_new else "*"
+            print(f"{mark} [{call_id}] {text[:40]:<40} legacy={d_old} combined={d_new} ({source})")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "test")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "test")
+
+from app.services.broker import InProcessBroker, LocalRedis, RedisBroker  # noqa: E402
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+class FakeClock:
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _workers(key_ttl=None, clock=None):
+    server = LocalRedis(clock=clock) if clock else LocalRedis()
+    return server, RedisBroker(server, key_ttl=key_ttl), RedisBroker(server, key_ttl=key_ttl)
+
+
+def test_publish_delivers_once_per_worker_and_filters_own_echo():
+    async def run():
+        _, a, b = _workers()
+        got = {"a": [], "b": []}
+
+        async def on_a(envelope):
+            got["a"].append(envelope)
+
+        async def on_b(envelope):
+            got["b"].append(envelope)
+
+        a.subscribe("monitor", on_a)
+        b.subscribe("monitor", on_b)
+        await a.start()
+        await b.start()
+
+        await a.publish("monitor", {"call_id": "c1", "n": 1})
+        await b.publish("monitor", {"call_id": "c1", "n": 2})
+        await _settle()
+
+        assert [e["n"] for e in got["a"]] == [1, 2]
+        assert [e["n"] for e in got["b"]] == [2, 1]
+        assert a.stats["received_remote"] == 1 and b.stats["received_remote"] == 1
+        await a.close()
+        await b.close()
+
+    asyncio.run(run())
+
+
+def test_write_behind_is_ordered_and_shared_keys_expire():
+    async def run():
+        clock = FakeClock(1000.0)
+        _, a, b = _workers(key_ttl=60, clock=clock)
+
+        for i in range(3):
+            a.write_behind(a.list_append("call:c1:history", {"i": i}))
+        a.write_behind(a.set_json("call:c1:customer", {"name": "kim"}))
+        await _settle()
+
+        assert [item["i"] for item in await b.list_range("call:c1:history")] == [0, 1, 2]
+        assert await b.get_json("call:c1:customer") == {"name": "kim"}
+
+        clock.now += 61
+        assert await b.list_range("call:c1:history") == []
+        assert await b.get_json("call:c1:customer") is None
+
+    asyncio.run(run())
+
+
+def test_claim_is_taken_by_one_worker_until_ttl():
+    async def run():
+        clock = FakeClock()
+        _, a, b = _workers(clock=clock)
+        assert await a.claim("call:c1:analysis", ttl=30) is True
+        assert await b.claim("call:c1:analysis", ttl=30) is False
+        assert await a.claim("call:c1:analysis", ttl=30) is False
+        clock.now += 31
+        assert await b.claim("call:c1:analysis", ttl=30) is True
+
+    asyncio.run(run())
+
+
+def test_inprocess_claim_uses_injected_clock():
+    async def run():
+        clock = FakeClock()
+        single = InProcessBroker(clock=clock)
+        assert await single.claim("call:c1:analysis", ttl=30) is True
+        assert await single.claim("call:c1:analysis", ttl=30) is False
+        clock.now += 31
+        assert await single.claim("call:c1:analysis", ttl=30) is True
+
+    asyncio.run(run())
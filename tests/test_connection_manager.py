@@ -0,0 +1,103 @@
+import asyncio
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "test")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "test")
+
+from app.services.broker import LocalRedis, RedisBroker  # noqa: E402
+from app.services.call_session_registry import CallSessionRegistry, call_session_registry  # noqa: E402
+from app.services.connection_manager import ConnectionManager  # noqa: E402
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def _workers():
+    server = LocalRedis()
+    return ConnectionManager(broker=RedisBroker(server)), ConnectionManager(broker=RedisBroker(server))
+
+
+def test_source_presence_is_visible_on_other_workers():
+    async def run():
+        source, monitor = _workers()
+        assert await monitor.source_active("c1") is False
+
+        source.bind_source("c1")
+        await _settle()
+        assert await monitor.source_active("c1") is True
+
+        source.unbind_source("c1")
+        await _settle()
+        assert await monitor.source_active("c1") is False
+
+    asyncio.run(run())
+
+
+def test_only_the_source_worker_deletes_shared_call_state():
+    async def run():
+        source, monitor = _workers()
+        source.bind_source("c1")
+        source.add_transcript("c1", {"speaker": "customer", "transcript": "요금제 바꾸고 싶어요"})
+        monitor.set_start_time("c1")
+        await _settle()
+
+        # 모니터 워커의 정리(CALL_ENDED/유휴 만료)는 자기 로컬 상태만 지움
+        monitor.clear_call("c1")
+        await _settle()
+        assert len(await monitor.fetch_history("c1")) == 1
+        assert await monitor.fetch_start_time("c1") is not None
+
+        source.unbind_source("c1")
+        source.clear_call("c1")
+        await _settle()
+        assert await monitor.fetch_history("c1") == []
+        assert await monitor.fetch_start_time("c1") is None
+
+    asyncio.run(run())
+
+
+def test_sweep_keeps_idle_calls_with_open_sockets():
+    async def run():
+        source, _ = _workers()
+        registry = CallSessionRegistry(idle_ttl=60, sweep_interval=60)
+        registry.register("connection_manager", source.clear_call, is_active=source.has_local_sockets)
+        for call_id in ("held", "gone"):
+            registry.touch(call_id)
+            registry.sessions[call_id].last_seen -= 120
+        source.bind_source("held")
+
+        assert await registry.sweep() == 1
+        assert list(registry.sessions) == ["held"]
+        assert registry.stats["skipped_active"] == 1
+
+        source.unbind_source("held")
+        assert await registry.sweep() == 1
+        assert registry.sessions == {}
+
+    asyncio.run(run())
+
+
+def test_remote_monitor_event_refreshes_idle_timer():
+    async def run():
+        server = LocalRedis()
+        monitor = ConnectionManager(broker=RedisBroker(server))
+        source_worker = RedisBroker(server)  # 소스 워커 (이 프로세스의 registry와 무관한 발행자)
+        await monitor.broker.start()
+        call_session_registry.touch("c3")
+        session = call_session_registry.sessions["c3"]
+        session.last_seen -= 120
+        stale = session.last_seen
+
+        await source_worker.publish("monitor", {"call_id": "c3", "message": {"type": "transcript_update"}})
+        await _settle()
+        assert monitor.broker.stats["received_remote"] == 1
+        assert session.last_seen > stale
+        call_session_registry.sessions.pop("c3", None)
+        await monitor.broker.close()
+
+    asyncio.run(run())
@@ -0,0 +1,116 @@
+import os
+
+os.environ.setdefault("OPENAI_API_KEY", "test")
+os.environ.setdefault("QDRANT_URL", "http://localhost:6333")
+os.environ.setdefault("QDRANT_API_KEY", "test")
+os.environ.setdefault("QDRANT_COLLECTION_NAME", "cs_guideline")
+os.environ.setdefault("SPRING_API_KEY", "test")
+
+import numpy as np  # noqa: E402
+import pytest  # noqa: E402
+from qdrant_client import QdrantClient, models  # noqa: E402
+
+from app.services.local_index import LocalVectorIndex, UnsupportedQuery  # noqa: E402
+
+DIM = 16
+VOCAB = 60
+CATEGORIES = ["marketing", "guideline", "terms"]
+
+
+def _vectors(rng: np.random.Generator):
+    dense = rng.normal(size=DIM).tolist()
+    terms = sorted(rng.choice(VOCAB, size=int(rng.integers(3, 9)), replace=False).tolist())
+    sparse = models.SparseVector(indices=terms, values=rng.uniform(0.1, 2.0, size=len(terms)).tolist())
+    return dense, sparse
+
+
+def _fixture(idf: bool):
+    # 연속 난수 벡터 -> 동점이 없어 id 순서까지 비교 가능
+    rng = np.random.default_rng(15)
+    client = QdrantClient(":memory:")
+    client.create_collection(
+        collection_name="cs_guideline",
+        vectors_config={"dense": models.VectorParams(size=DIM, distance=models.Distance.COSINE)},
+        sparse_vectors_config={"sparse": models.SparseVectorParams(modifier=models.Modifier.IDF if idf else None)},
+    )
+    points = []
+    for i in range(240):
+        dense, sparse = _vectors(rng)
+        cat = CATEGORIES[i % len(CATEGORIES)]
+        points.append(
+            models.PointStruct(
+                id=i,
+                vector={"dense": dense, "sparse": sparse},
+                payload={"page_content": f"{cat} 문서 {i}", "metadata": {"category": cat}},
+            )
+        )
+    client.upsert("cs_guideline", points=points)
+    index = LocalVectorIndex(client, "cs_guideline")
+    assert index.load() == len(points)
+    return client, index, [_vectors(rng) for _ in range(4)]
+
+
+def _category(cat):
+    return models.Filter(must=[models.FieldCondition(key="metadata.category", match=models.MatchValue(value=cat))])
+
+
+def _requests(dense, sparse):
+    for cat in (None, "marketing", "없는카테고리"):
+        flt = _category(cat) if cat else None
+        base = dict(collection_name="cs_guideline", query_filter=flt, limit=6, with_payload=True)
+        yield f"dense/{cat}", dict(base, query=dense, using="dense")
+        yield f"sparse/{cat}", dict(base, query=sparse, using="sparse")
+        for fusion in (models.Fusion.RRF, models.Fusion.DBSF):
+            prefetch = [
+                models.Prefetch(using="dense", query=dense, filter=flt, limit=12),
+                models.Prefetch(using="sparse", query=sparse, filter=flt, limit=12),
+            ]
+            yield f"{fusion.value}/{cat}", dict(base, prefetch=prefetch, query=models.FusionQuery(fusion=fusion))
+
+
+def _ranked(response):
+    return [(p.id, round(p.score, 4)) for p in response.points]
+
+
+@pytest.mark.parametrize("idf", [False, True], ids=["sparse", "sparse+idf"])
+def test_query_points_matches_in_memory_qdrant(idf):
+    client, index, queries = _fixture(idf)
+    for dense, sparse in queries:
+        for label, req in _requests(dense, sparse):
+            remote = client.query_points(**req)
+            local = index.query_points(**req)
+            assert _ranked(local) == _ranked(remote), label
+            if req["query_filter"] is not None:
+                assert all(p.payload["metadata"]["category"] == "marketing" for p in local.points), label
+    assert index.stats["unsupported"] == 0
+
+
+@pytest.mark.parametrize(
+    "flt",
+    [
+        models.Filter(must_not=[models.FieldCondition(key="metadata.category", match=models.MatchValue(value="terms"))]),
+        models.Filter(should=[models.FieldCondition(key="metadata.category", match=models.MatchValue(value="terms"))]),
+        models.Filter(must=[models.FieldCondition(key="metadata.category", match=models.MatchAny(any=["terms"]))]),
+        models.Filter(must=[models.FieldCondition(key="metadata.source", match=models.MatchValue(value="faq"))]),
+        models.Filter(
+            must=[
+                models.FieldCondition(key="metadata.category", match=models.MatchValue(value="terms")),
+                models.FieldCondition(key="metadata.category", match=models.MatchValue(value="marketing")),
+            ]
+        ),
+    ],
+    ids=["must_not", "should", "match_any", "other_key", "two_conditions"],
+)
+def test_unsupported_filters_fall_back_to_remote(flt):
+    from app.agent.marketing.session import QdrantSearchEngine
+
+    _, index, queries = _fixture(idf=False)
+    dense, _ = queries[0]
+    req = dict(collection_name="cs_guideline", query=dense, using="dense", query_filter=flt, limit=6)
+    with pytest.raises(UnsupportedQuery):
+        index.query_points(**req)
+
+    # 검색 엔진은 UnsupportedQuery면 로컬 결과 없음(None) -> 원격 Qdrant로 보냄
+    engine = QdrantSearchEngine.__new__(QdrantSearchEngine)
+    engine.local_index = index
+    assert engine._local_query(req) is None